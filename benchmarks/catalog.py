@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic catalogs for benchmarks, cached on disk.
+
+A catalog is fully determined by its scale and seed: the same arguments
+always produce the same users, songs, titles and playlists, so timings from
+different runs and machines compare like for like. Built databases are
+kept in CATALOG_DIR under a name that encodes every parameter (and the
+schema version), so only the first run at a scale pays for the build.
+
+    python benchmarks/catalog.py                 # build (or find) the 10k catalog
+    python benchmarks/catalog.py --scale 1m
+    python benchmarks/catalog.py --songs 50000 --users 5000 --playlist-entries 200000
+"""
+
+import hashlib
+import os
+import random
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.db.engine import create_db_engine
+from lib.db.migrations import SCHEMA_VERSION
+from lib.models.base import Base
+from lib.models.models import POSITION_GAP
+from lib.models import models  # noqa: F401  (registers the tables on Base)
+from lib.search import REBUILD_SEARCH_INDEX_SQL, SEARCH_INDEX_SCHEMA
+
+CATALOG_DIR = os.environ.get('MUSIC_BENCH_CATALOGS', os.path.join(project_root, 'benchmarks', 'catalogs'))
+
+# Bump when the generated data changes, so cached catalogs are rebuilt
+GENERATOR_VERSION = 1
+
+SCALES = {
+    '10k': {'songs': 10_000, 'users': 1_000, 'playlist_entries': 100_000},
+    '100k': {'songs': 100_000, 'users': 100_000, 'playlist_entries': 1_000_000},
+    '1m': {'songs': 1_000_000, 'users': 100_000, 'playlist_entries': 1_000_000},
+}
+
+DEFAULT_SEED = 42
+
+SONGS_PER_ALBUM = 10
+ALBUMS_PER_ARTIST = 3
+GENRE_COUNT = 40
+SONGS_PER_PLAYLIST = 100
+VOCABULARY_SIZE = 5000
+
+# Every generated user's password is f"{PASSWORD_PREFIX}{user id}"
+PASSWORD_PREFIX = 'password'
+
+# Rows per executemany call while building
+INSERT_BATCH_SIZE = 50_000
+
+def vocabulary(rng, size=VOCABULARY_SIZE):
+    """Pronounceable made-up words; the first few are the most common in titles"""
+    consonants = 'bdfghklmnprstvwz'
+    vowels = 'aeiou'
+    words = set()
+    while len(words) < size:
+        syllables = rng.randint(1, 3)
+        words.add(''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables)))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+def common_word(seed=DEFAULT_SEED):
+    """The most frequent title word of a catalog, for search benchmarks"""
+    return vocabulary(random.Random(seed))[0]
+
+def catalog_path(songs, users, playlist_entries, seed=DEFAULT_SEED):
+    name = f"catalog-{songs}s-{users}u-{playlist_entries}e-seed{seed}-v{GENERATOR_VERSION}-schema{SCHEMA_VERSION}.db"
+    return os.path.join(CATALOG_DIR, name)
+
+def _batches(rows, size=INSERT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _title(rng, words):
+    # Skewed towards the start of the vocabulary, so a few words are common
+    # (the first is in roughly one title in four) and most are rare
+    count = rng.randint(1, 4)
+    return ' '.join(words[int(len(words) * rng.random() ** 4)] for _ in range(count)).title()
+
+def build_catalog(path, songs, users, playlist_entries, seed=DEFAULT_SEED, progress=None):
+    """Write a synthetic catalog to path (replacing it) and return path"""
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    artist_count = max(1, songs // (SONGS_PER_ALBUM * ALBUMS_PER_ARTIST))
+    album_count = max(1, songs // SONGS_PER_ALBUM)
+    playlist_count = max(1, playlist_entries // SONGS_PER_PLAYLIST)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    for leftover in (temporary, temporary + '-wal', temporary + '-shm'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    engine = create_db_engine('bulk-load', temporary)
+    Base.metadata.create_all(engine)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+
+        def insert(table, columns, rows):
+            placeholders = ', '.join('?' for _ in columns)
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+            for batch in _batches(rows):
+                cursor.executemany(sql, batch)
+            if progress:
+                progress(f"{table} written")
+
+        insert('users', ('id', 'username', 'email', 'password_hash', 'is_admin'), (
+            (i, f"user{i}", f"user{i}@example.com",
+             hashlib.sha256(f"{PASSWORD_PREFIX}{i}".encode()).hexdigest(), i == 1)
+            for i in range(1, users + 1)
+        ))
+        insert('genres', ('id', 'name'), ((i, f"Genre {i}") for i in range(1, GENRE_COUNT + 1)))
+        insert('artists', ('id', 'name', 'bio'), (
+            (i, f"{_title(rng, words)} {i}", None) for i in range(1, artist_count + 1)
+        ))
+        insert('albums', ('id', 'title', 'release_year', 'artist_id'), (
+            (i, _title(rng, words), rng.randint(1960, 2025), (i - 1) // ALBUMS_PER_ARTIST % artist_count + 1)
+            for i in range(1, album_count + 1)
+        ))
+        album_artist = [None] + [(i - 1) // ALBUMS_PER_ARTIST % artist_count + 1 for i in range(1, album_count + 1)]
+        insert('songs', ('id', 'title', 'duration', 'file_path', 'artist_id', 'album_id', 'genre_id'), (
+            (i, _title(rng, words), float(rng.randint(90, 420)), f"/Files/synthetic/{i}.mp3",
+             album_artist[album], album, rng.randint(1, GENRE_COUNT) if rng.random() > 0.05 else None)
+            for i, album in ((i, (i - 1) // SONGS_PER_ALBUM % album_count + 1) for i in range(1, songs + 1))
+        ))
+        insert('playlists', ('id', 'name', 'description', 'user_id'), (
+            (i, f"Playlist {i}", None, rng.randint(1, users)) for i in range(1, playlist_count + 1)
+        ))
+
+        per_playlist = min(songs, max(1, playlist_entries // playlist_count))
+
+        def entries():
+            for playlist_id in range(1, playlist_count + 1):
+                for rank, song_id in enumerate(rng.sample(range(1, songs + 1), per_playlist), 1):
+                    yield playlist_id, song_id, rank * POSITION_GAP
+
+        insert('playlist_songs', ('playlist_id', 'song_id', 'position'), entries())
+
+        # Index after loading: one bulk build instead of a trigger per song
+        cursor.executescript(SEARCH_INDEX_SCHEMA)
+        cursor.execute(REBUILD_SEARCH_INDEX_SQL)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.commit()
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        cursor.close()
+    finally:
+        connection.close()
+        engine.dispose()
+
+    os.replace(temporary, path)
+    for leftover in (temporary + '-wal', temporary + '-shm'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    return path
+
+def get_catalog(songs, users, playlist_entries, seed=DEFAULT_SEED, progress=None):
+    """Path of a cached catalog with these parameters, building it if needed"""
+    path = catalog_path(songs, users, playlist_entries, seed)
+    if not os.path.exists(path):
+        build_catalog(path, songs, users, playlist_entries, seed, progress)
+    return path
+
+def scale_params(args):
+    """Catalog parameters from --scale, overridden by any explicit counts"""
+    params = dict(SCALES[args.scale])
+    for name in params:
+        value = getattr(args, name)
+        if value is not None:
+            params[name] = value
+    return params
+
+def add_catalog_arguments(parser):
+    parser.add_argument("--scale", choices=sorted(SCALES), default='10k')
+    parser.add_argument("--songs", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--playlist-entries", dest='playlist_entries', type=int)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a synthetic benchmark catalog")
+    add_catalog_arguments(parser)
+    parser.add_argument("--rebuild", action="store_true", help="build even if a cached copy exists")
+    args = parser.parse_args()
+
+    params = scale_params(args)
+    path = catalog_path(seed=args.seed, **params)
+    if args.rebuild or not os.path.exists(path):
+        started = time.perf_counter()
+        build_catalog(path, seed=args.seed, progress=print, **params)
+        print(f"Built in {time.perf_counter() - started:.1f}s")
+    print(f"{path} ({os.path.getsize(path) / 1e6:,.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Time every public lib.helpers function against a synthetic catalog.
+
+Runs each helper on a scratch copy of a cached catalog from
+benchmarks/catalog.py (so write helpers never change the cached file),
+with the catalog cache cleared before every call so the database path is
+what gets measured. The suite runs in several interleaved passes, so a
+slow spell on a busy machine hits one pass of every case rather than all
+rounds of one; in each pass a case is called until it has run MIN_ROUNDS
+times and MIN_TIME seconds have passed. The min/median/mean/p95 over all
+rounds are written to a JSON results file. Given a baseline file, the
+fastest rounds (the least noisy statistic on a busy machine) are compared
+and any case slower by more than --threshold is reported as a regression
+(and the script exits with status 1). Baselines are only comparable on the
+machine that recorded them, so none are committed: --save-baseline writes
+one to benchmarks/baselines/ (ignored by git) before a change, and
+--compare checks against it after.
+
+    python benchmarks/helpers_suite.py                              # 10k catalog
+    python benchmarks/helpers_suite.py --scale 100k --output results.json
+    python benchmarks/helpers_suite.py --save-baseline
+    python benchmarks/helpers_suite.py --compare benchmarks/baselines/helpers-10k.json
+"""
+
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import sqlalchemy
+
+from lib import helpers
+from lib.cache import catalog_cache
+from lib.db.engine import create_db_engine
+from benchmarks.catalog import (
+    PASSWORD_PREFIX, add_catalog_arguments, common_word, get_catalog, scale_params, vocabulary
+)
+
+BASELINE_DIR = os.path.join(project_root, 'benchmarks', 'baselines')
+
+PASSES = 3
+MIN_ROUNDS = 3  # per pass
+MAX_ROUNDS = 200  # over all passes
+MIN_TIME = 0.2  # seconds per case and pass
+
+# Statistic compared against the baseline
+COMPARE_BY = 'min'
+
+# A case is flagged when it takes this many times the baseline's time...
+DEFAULT_THRESHOLD = 1.5
+# ...and at least this much slower in absolute terms, to ignore timer noise
+NOISE_FLOOR = 0.0002  # seconds
+
+def consume(iterator):
+    """Drain a streaming helper, returning how many items it yielded"""
+    return sum(1 for _ in iterator)
+
+def build_cases(params, seed):
+    """(name, call) pairs; call takes the round number (1..MAX_ROUNDS, 0 for
+    the warm-up) and runs the helper once.
+
+    Playlists written to by the write helpers are created here, untimed, so
+    each write case starts from the same state whatever ran before it.
+    """
+    songs, users = params['songs'], params['users']
+    words = vocabulary(random.Random(seed))
+    common, rare = common_word(seed), words[len(words) // 10]
+    artist_id, genre_id, user_id = 1, 1, max(1, users // 2)
+    playlist_id = 1
+    page = helpers.get_all_songs_page(None, 20)
+
+    def fresh_playlist(name, song_ids=()):
+        _, new_id = helpers.create_playlist(1, name)
+        if song_ids:
+            helpers.add_songs_to_playlist(new_id, list(song_ids))
+        return new_id
+
+    # Song ids cycle through the catalog so every round touches a new song
+    def song(round_number, offset=0):
+        return (round_number * 7919 + offset) % songs + 1
+
+    append_target = fresh_playlist("bench: append")
+    bulk_target = fresh_playlist("bench: append many")
+    insert_target = fresh_playlist("bench: insert", range(1, 1001))
+    move_target = fresh_playlist("bench: move", range(1, 1001))
+    remove_target = fresh_playlist("bench: remove", range(1, MAX_ROUNDS + 2))
+
+    return [
+        ("register_user", lambda i: helpers.register_user(f"bench{i}", f"bench{i}@example.com", "secret")),
+        ("login_user", lambda i: helpers.login_user(f"user{user_id}", f"{PASSWORD_PREFIX}{user_id}")),
+        ("get_user_by_id", lambda i: helpers.get_user_by_id(user_id)),
+
+        ("search_songs (common word)", lambda i: helpers.search_songs(common)),
+        ("search_songs (rare word)", lambda i: helpers.search_songs(rare)),
+        ("search_songs_page", lambda i: helpers.search_songs_page(common, None, 20)),
+        ("iter_search_songs", lambda i: consume(helpers.iter_search_songs(common))),
+
+        ("get_all_songs", lambda i: helpers.get_all_songs()),
+        ("get_all_songs_page (first)", lambda i: helpers.get_all_songs_page(None, 20)),
+        ("get_all_songs_page (next)", lambda i: helpers.get_all_songs_page(page[1], 20)),
+        ("iter_all_songs", lambda i: consume(helpers.iter_all_songs())),
+        ("iter_all_song_batches", lambda i: consume(helpers.iter_all_song_batches())),
+        ("get_song_file_path", lambda i: helpers.get_song_file_path(song(i))),
+
+        ("get_all_artists", lambda i: helpers.get_all_artists()),
+        ("get_artist_songs", lambda i: helpers.get_artist_songs(artist_id)),
+        ("get_artist_songs_page", lambda i: helpers.get_artist_songs_page(artist_id, None, 20)),
+        ("iter_artist_songs", lambda i: consume(helpers.iter_artist_songs(artist_id))),
+
+        ("get_all_genres", lambda i: helpers.get_all_genres()),
+        ("get_songs_by_genre", lambda i: helpers.get_songs_by_genre(genre_id)),
+        ("get_songs_by_genre_page", lambda i: helpers.get_songs_by_genre_page(genre_id, None, 20)),
+        ("iter_songs_by_genre", lambda i: consume(helpers.iter_songs_by_genre(genre_id))),
+
+        ("get_user_playlists", lambda i: helpers.get_user_playlists(user_id)),
+        ("get_playlist_songs", lambda i: helpers.get_playlist_songs(playlist_id)),
+        ("get_playlist_songs_page", lambda i: helpers.get_playlist_songs_page(playlist_id, None, 20)),
+        ("iter_playlist_songs", lambda i: consume(helpers.iter_playlist_songs(playlist_id))),
+
+        ("create_playlist", lambda i: helpers.create_playlist(user_id, f"bench {i}")),
+        ("add_song_to_playlist", lambda i: helpers.add_song_to_playlist(append_target, song(i))),
+        ("add_songs_to_playlist (25)", lambda i: helpers.add_songs_to_playlist(
+            bulk_target, [song(i, offset) for offset in range(0, 25 * 104729, 104729)])),
+        ("insert_song_at", lambda i: helpers.insert_song_at(insert_target, song(i, 1000), 500)),
+        ("move_songs", lambda i: helpers.move_songs(move_target, [song(i) % 1000 + 1], (i * 37) % 1000)),
+        ("remove_songs_from_playlist", lambda i: helpers.remove_songs_from_playlist(remove_target, [i + 1])),
+        ("rebalance_playlist", lambda i: helpers.rebalance_playlist(move_target)),
+    ]
+
+def measure(call, timings, max_rounds):
+    """Append timings of call until MIN_ROUNDS and MIN_TIME are both reached.
+
+    Round numbers continue from earlier passes, so write helpers never
+    repeat an argument. The garbage collector is kept out of the timed
+    calls, like timeit does, so one case does not pay for another's garbage.
+    """
+    rounds = 0
+    gc.collect()
+    started = time.perf_counter()
+    while len(timings) < max_rounds and (rounds < MIN_ROUNDS or time.perf_counter() - started < MIN_TIME):
+        catalog_cache.clear()
+        gc.disable()
+        try:
+            call_started = time.perf_counter()
+            call(len(timings) + 1)
+            timings.append(time.perf_counter() - call_started)
+        finally:
+            gc.enable()
+        rounds += 1
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        'rounds': len(timings),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        'stdev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_suite(params, seed, only=None, passes=PASSES, progress=None):
+    """Benchmark every case on a scratch copy of the catalog; returns the results document"""
+    catalog = get_catalog(seed=seed, progress=progress, **params)
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, 'catalog.db')
+        shutil.copyfile(catalog, path)
+        engine = create_db_engine(db_path=path)
+        helpers.engine = engine
+        helpers.SessionLocal.configure(bind=engine)
+        try:
+            cases = [(name, call) for name, call in build_cases(params, seed)
+                     if not only or any(word in name for word in only)]
+            for name, call in cases:
+                result = call(0)  # warm-up
+                if isinstance(result, tuple) and result[0] is False:
+                    raise RuntimeError(f"{name} failed: {result[1]}")
+
+            timings = {name: [] for name, _ in cases}
+            for number in range(1, passes + 1):
+                for name, call in cases:
+                    measure(call, timings[name], MAX_ROUNDS * number // passes)
+                if progress:
+                    progress(f"Pass {number} of {passes} done")
+        finally:
+            engine.dispose()
+
+    results = {name: summarize(case_timings) for name, case_timings in timings.items()}
+    if progress:
+        progress(f"\n{'helper':<32}{'min':>12}{'median':>12}{'rounds':>8}")
+        for name, result in results.items():
+            progress(f"{name:<32}{result['min'] * 1000:>10.3f}ms{result['median'] * 1000:>10.3f}ms{result['rounds']:>8}")
+
+    return {
+        'meta': {
+            'catalog': dict(params, seed=seed),
+            'passes': passes,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'sqlalchemy': sqlalchemy.__version__,
+            'machine': f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        },
+        'results': results,
+    }
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print current timings next to the baseline's; returns the regressed case names"""
+    if baseline['meta']['catalog'] != current['meta']['catalog']:
+        print(f"Warning: baseline catalog {baseline['meta']['catalog']} differs from {current['meta']['catalog']}")
+
+    regressions = []
+    print(f"\n{'helper (' + COMPARE_BY + ')':<32}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<32}{'-':>12}{result[COMPARE_BY] * 1000:>10.3f}ms{'new':>10}")
+            continue
+        ratio = result[COMPARE_BY] / before[COMPARE_BY] if before[COMPARE_BY] else float('inf')
+        regressed = ratio > threshold and result[COMPARE_BY] - before[COMPARE_BY] > NOISE_FLOOR
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32}{before[COMPARE_BY] * 1000:>10.3f}ms{result[COMPARE_BY] * 1000:>10.3f}ms"
+              f"{(ratio - 1) * 100:>+9.0f}%{'   <-- regression' if regressed else ''}")
+    return regressions
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the lib.helpers functions")
+    add_catalog_arguments(parser)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write results to benchmarks/baselines/helpers-<scale>.json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio that counts as a regression (default: %(default)s)")
+    parser.add_argument("--only", nargs="+", help="run only cases whose name contains one of these")
+    parser.add_argument("--passes", type=int, default=PASSES, help="interleaved passes over the suite")
+    args = parser.parse_args()
+
+    params = scale_params(args)
+    print(f"Catalog: {params['songs']:,} songs, {params['users']:,} users, "
+          f"{params['playlist_entries']:,} playlist entries (seed {args.seed})\n")
+    current = run_suite(params, args.seed, args.only, args.passes, progress=print)
+
+    outputs = [args.output] if args.output else []
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        outputs.append(os.path.join(BASELINE_DIR, f"helpers-{args.scale}.json"))
+    for output in outputs:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(current, file, indent=2)
+            file.write('\n')
+        print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            regressions = compare(current, json.load(file), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold}x: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Count the SQL statements each song-listing helper issues per call.
+
+Builds throwaway catalogs of increasing size and points lib.helpers at each
+one in turn. A helper without N+1 lazy loads issues the same number of
+statements whether the catalog holds ten songs or ten thousand.
+
+    python benchmarks/query_counts.py
+"""
+
+import os
+import sys
+import tempfile
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import event
+
+from lib import helpers
+from lib.cache import catalog_cache
+from lib.db.engine import create_db_engine
+from lib.models.base import Base
+from lib.models import models  # noqa: F401  (registers the tables on Base)
+
+CATALOG_SIZES = [10, 100, 1000, 10000]
+
+def build_catalog(path, song_count):
+    """Create a database with song_count songs spread over a few artists"""
+    engine = create_db_engine(db_path=path)
+    Base.metadata.create_all(engine)
+
+    artist_count = max(1, song_count // 10)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, email, password_hash) VALUES (1, 'bench', 'bench@example.com', 'x')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO genres (id, name) VALUES (?, ?)",
+            [(i, f"Genre {i}") for i in range(1, 6)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO artists (id, name) VALUES (?, ?)",
+            [(i, f"Artist {i}") for i in range(1, artist_count + 1)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO albums (id, title, artist_id) VALUES (?, ?, ?)",
+            [(i, f"Album {i}", i) for i in range(1, artist_count + 1)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO songs (id, title, duration, file_path, artist_id, album_id, genre_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (i, f"Song {i}", 180.0, f"/Files/song_{i}.mp3",
+                 (i % artist_count) + 1, (i % artist_count) + 1, (i % 5) + 1 if i % 7 else None)
+                for i in range(1, song_count + 1)
+            ]
+        )
+        conn.exec_driver_sql("INSERT INTO playlists (id, name, user_id) VALUES (1, 'Bench', 1)")
+        conn.exec_driver_sql(
+            "INSERT INTO playlist_songs (playlist_id, song_id, position) VALUES (1, ?, ?)",
+            [(i, i) for i in range(1, song_count + 1)]
+        )
+    return engine
+
+def count_statements(engine, func, *args):
+    """Call func and return how many statements it sent to the engine"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        func(*args)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return len(statements)
+
+def main():
+    cases = [
+        ("get_all_songs", helpers.get_all_songs, ()),
+        ("search_songs", helpers.search_songs, ("song",)),
+        ("get_artist_songs", helpers.get_artist_songs, (1,)),
+        ("get_songs_by_genre", helpers.get_songs_by_genre, (1,)),
+        ("get_playlist_songs", helpers.get_playlist_songs, (1,)),
+    ]
+
+    results = {name: [] for name, _, _ in cases}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in CATALOG_SIZES:
+            engine = build_catalog(os.path.join(tmp, f"catalog_{size}.db"), size)
+            helpers.engine = engine
+            helpers.SessionLocal.configure(bind=engine)
+            for name, func, args in cases:
+                func(*args)  # warm up: builds the search index on first use
+                catalog_cache.clear()  # count the database path, not cache hits
+                results[name].append(count_statements(engine, func, *args))
+            engine.dispose()
+
+    print(f"{'helper':<22}" + "".join(f"{size:>10}" for size in CATALOG_SIZES))
+    for name, counts in results.items():
+        flat = "" if len(set(counts)) == 1 else "   <-- grows with catalog size"
+        print(f"{name:<22}" + "".join(f"{count:>10}" for count in counts) + flat)
+
+if __name__ == "__main__":
+    main()
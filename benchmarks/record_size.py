@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Compare memory per row and construction time of SongRecord against dict rows.
+
+Builds 100,000 rows in each representation from the same source tuples and
+reports bytes per row (tracemalloc) and construction time per row. The
+columnar SongBatch form is measured too.
+
+    python benchmarks/record_size.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.records import SONG_FIELDS, SongRecord, SongBatch
+
+ROW_COUNT = 100000
+
+def source_rows():
+    """Rows as they come back from the database"""
+    return [
+        (i, f"Song {i}", f"Artist {i % 500}", f"Album {i % 2000}",
+         "Hip Hop", 180.0 + i % 60, f"/Files/song_{i}.mp3")
+        for i in range(ROW_COUNT)
+    ]
+
+def as_dicts(rows):
+    return [
+        {
+            'id': row[0],
+            'title': row[1],
+            'artist': row[2],
+            'album': row[3],
+            'genre': row[4],
+            'duration': row[5],
+            'file_path': row[6]
+        }
+        for row in rows
+    ]
+
+def as_records(rows):
+    make = SongRecord._make
+    return [make(row) for row in rows]
+
+def as_batch(rows):
+    return SongBatch(*(list(column) for column in zip(*rows)))
+
+def measure(build, rows):
+    """Return (bytes per row, microseconds per row) for build(rows)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(rows)
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / len(rows), elapsed / len(rows) * 1e6
+
+def main():
+    rows = source_rows()
+    print(f"{ROW_COUNT} rows, fields: {', '.join(SONG_FIELDS)}\n")
+    print(f"{'representation':<16}{'bytes/row':>12}{'us/row':>10}")
+    for name, build in [("dict", as_dicts), ("SongRecord", as_records), ("SongBatch", as_batch)]:
+        bytes_per_row, us_per_row = measure(build, rows)
+        print(f"{name:<16}{bytes_per_row:>12.0f}{us_per_row:>10.3f}")
+
+if __name__ == "__main__":
+    main()
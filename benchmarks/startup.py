@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Measure CLI startup: time to the first menu, and what gets imported.
+
+Each scenario runs in a fresh interpreter RUNS times (after one warm-up run
+that writes the bytecode cache) and the wall time from spawn to exit is
+reported; for run.py the clock stops when the main menu's prompt appears.
+With a daemon running, a first query through it is measured as well.
+Then `python -X importtime` shows the top-level imports behind a module,
+slowest first, to spot a heavy dependency creeping back into the startup
+path.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --module lib.helpers
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNS = 10
+
+# What a scripted invocation or health check should cost at most
+STARTUP_TARGET = 0.100  # seconds
+
+# Printed at the end of the main menu, right before it waits for input
+MENU_PROMPT = b"Select option"
+
+SCENARIOS = [
+    ("python -c pass", ["-c", "pass"]),
+    ("import lib.cli", ["-c", "import lib.cli"]),
+    ("import lib.helpers", ["-c", "import lib.helpers"]),
+    ("first query", ["-c", "from lib.helpers import get_all_genres; get_all_genres()"]),
+]
+
+# Measured too when a daemon (python run.py daemon) is running
+DAEMON_SCENARIO = ("first query (daemon)", [
+    "-c", "from lib.daemon import connect_to_daemon; connect_to_daemon().get_all_genres()"
+])
+
+TOP_IMPORTS = 12
+
+def child_environment():
+    """The current environment, but letting children write .pyc files like a normal install"""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['TERM'] = env.get('TERM') or 'dumb'
+    return env
+
+def time_command(args, env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=project_root, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+def time_to_first_menu(env):
+    """Seconds from starting run.py until its main menu asks for input"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'run.py'], cwd=project_root, env=env,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b''
+    while MENU_PROMPT not in output:
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            process.wait()
+            raise RuntimeError("run.py exited before showing its menu")
+        output += chunk
+    elapsed = time.perf_counter() - started
+    process.communicate(b"0\n")
+    return elapsed
+
+def import_breakdown(module, env):
+    """(module, cumulative seconds, nesting depth) for every import behind module"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=project_root, env=env, capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(cumulative) / 1e6, depth))
+    return imports
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI startup time")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--module", default="lib.cli", help="module whose imports are broken down")
+    args = parser.parse_args()
+
+    env = child_environment()
+    measurements = [(name, lambda command=command: time_command(command, env)) for name, command in SCENARIOS]
+    measurements.insert(2, ("run.py to first menu", lambda: time_to_first_menu(env)))
+    sys.path.insert(0, project_root)
+    from lib.daemon import connect_to_daemon
+    client = connect_to_daemon()
+    if client is not None:
+        client.close()
+        name, command = DAEMON_SCENARIO
+        measurements.append((name, lambda: time_command(command, env)))
+
+    print(f"{'scenario':<24}{'min':>10}{'median':>10}   (target {STARTUP_TARGET * 1000:.0f} ms)")
+    for name, measure in measurements:
+        measure()  # warm-up: writes .pyc files and the OS file cache
+        timings = [measure() for _ in range(args.runs)]
+        median = statistics.median(timings)
+        verdict = '' if name == "python -c pass" else ('ok' if median <= STARTUP_TARGET else 'over')
+        print(f"{name:<24}{min(timings) * 1000:>8.1f}ms{median * 1000:>8.1f}ms   {verdict}")
+
+    print(f"\nTop-level imports of {args.module} (python -X importtime):")
+    imports = import_breakdown(args.module, env)
+    top_level = sorted((item for item in imports if item[2] == 0), key=lambda item: item[1], reverse=True)
+    for name, seconds, _ in top_level[:TOP_IMPORTS]:
+        print(f"  {seconds * 1000:>8.1f}ms  {name}")
+    sqlalchemy = any(name.split('.')[0] == 'sqlalchemy' for name, _, _ in imports)
+    print(f"\n{len(imports)} modules imported in total; SQLAlchemy {'is' if sqlalchemy else 'is not'} among them")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Load-test the audio streaming endpoint.
+
+Opens N concurrent connections that each stream one song (whole file, or
+random byte ranges with --ranges) and reports time-to-first-byte
+percentiles, aggregate throughput and server CPU time per stream. Without
+--url it starts lib/server.py against the current database and picks the
+first song whose audio file exists.
+
+    python benchmarks/stream_load.py
+    python benchmarks/stream_load.py --streams 10 100 1000 --ranges
+    python benchmarks/stream_load.py --url http://127.0.0.1:8000 --song 6
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+READ_SIZE = 1 << 16
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def find_streamable_song():
+    """First song whose audio file is on disk"""
+    from lib import helpers
+    from lib.scanner import disk_path
+
+    for song in helpers.iter_all_songs():
+        if song.file_path and os.path.exists(disk_path(song.file_path) or ''):
+            return song.id
+    return None
+
+def start_server():
+    """Run lib/server.py on a free port; returns (process, base url)"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(project_root, 'lib', 'server.py'), '--port', str(port)],
+        stdout=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, f"http://127.0.0.1:{port}"
+
+async def stream_once(host, port, path, byte_range, listener=0):
+    """Fetch one stream; returns (time to first byte, bytes received).
+
+    Each listener number sends its own User-Agent, so the server counts the
+    streams as that many listeners (see HOT_FILE_LISTENERS in lib/server.py).
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    range_header = f"Range: bytes={byte_range[0]}-{byte_range[1]}\r\n" if byte_range else ""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: stream-load/{listener}\r\n"
+                 f"{range_header}Connection: close\r\n\r\n".encode())
+
+    first = await reader.read(READ_SIZE)
+    ttfb = time.perf_counter() - started
+    if not first.startswith((b'HTTP/1.1 200', b'HTTP/1.1 206')):
+        writer.close()
+        raise RuntimeError(first.split(b'\r\n', 1)[0].decode())
+
+    received = len(first)
+    while True:
+        chunk = await reader.read(READ_SIZE)
+        if not chunk:
+            break
+        received += len(chunk)
+    writer.close()
+    return ttfb, received
+
+async def run_level(host, port, path, streams, file_size, ranges):
+    """Run one concurrency level and return its measurements"""
+    byte_ranges = [None] * streams
+    if ranges:
+        byte_ranges = []
+        for _ in range(streams):
+            start = random.randrange(file_size)
+            byte_ranges.append((start, min(file_size - 1, start + random.randrange(READ_SIZE, 8 * READ_SIZE))))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(stream_once(host, port, path, byte_range, listener) for listener, byte_range in enumerate(byte_ranges)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+
+    ok = [result for result in results if not isinstance(result, BaseException)]
+    ttfbs = [ttfb for ttfb, _ in ok] or [0.0]
+    return {
+        'ok': len(ok),
+        'errors': len(results) - len(ok),
+        'p50': percentile(ttfbs, 0.50),
+        'p99': percentile(ttfbs, 0.99),
+        'mbps': sum(received for _, received in ok) * 8 / elapsed / 1e6,
+        'elapsed': elapsed,
+    }
+
+def process_cpu_seconds(pid):
+    """User + system CPU time of a process, from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the audio streaming endpoint")
+    parser.add_argument("--url", help="running server, e.g. http://127.0.0.1:8000 (default: start one)")
+    parser.add_argument("--song", type=int, help="song id to stream (default: first with a file)")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--ranges", action="store_true", help="request random 64-512 KB ranges")
+    args = parser.parse_args()
+
+    song_id = args.song or find_streamable_song()
+    if song_id is None:
+        sys.exit("No song has an audio file on disk; run lib/scanner.py first.")
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server()
+    host, port = urlsplit(url).hostname, urlsplit(url).port or 80
+    path = f"/api/songs/{song_id}/stream"
+
+    try:
+        _, file_size = asyncio.run(stream_once(host, port, path, None))  # warm the file cache
+        print(f"Streaming song {song_id} ({file_size / 1e6:.1f} MB) from {url}"
+              f"{' as random ranges' if args.ranges else ''}\n")
+        print(f"{'streams':>8}{'ok':>8}{'errors':>8}{'ttfb p50':>11}{'ttfb p99':>11}{'Mbit/s':>10}{'cpu ms/stream':>15}")
+        for streams in args.streams:
+            cpu_before = process_cpu_seconds(process.pid) if process else None
+            result = asyncio.run(run_level(host, port, path, streams, file_size, args.ranges))
+            cpu_after = process_cpu_seconds(process.pid) if process else None
+            cpu = '-'
+            if cpu_before is not None and cpu_after is not None and result['ok']:
+                cpu = f"{(cpu_after - cpu_before) * 1000 / result['ok']:.2f}"
+            print(f"{streams:>8}{result['ok']:>8}{result['errors']:>8}"
+                  f"{result['p50'] * 1000:>9.1f}ms{result['p99'] * 1000:>9.1f}ms"
+                  f"{result['mbps']:>10,.0f}{cpu:>15}")
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Compare peak memory of get_all_songs against the iter_all_songs generator.
+
+Walks every song of throwaway catalogs of increasing size and records the
+peak Python allocation (tracemalloc) for each approach. The list-building
+helper grows with the catalog; the streaming one should stay flat.
+
+    python benchmarks/streaming_memory.py
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib import helpers
+from benchmarks.query_counts import build_catalog
+
+CATALOG_SIZES = [1000, 10000, 100000]
+
+def peak_bytes(walk):
+    """Run walk() and return the peak traced allocation in bytes"""
+    tracemalloc.start()
+    try:
+        walk()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def walk_list():
+    for song in helpers.get_all_songs():
+        pass
+
+def walk_stream():
+    for song in helpers.iter_all_songs():
+        pass
+
+def main():
+    print(f"{'songs':>8}{'get_all_songs':>18}{'iter_all_songs':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in CATALOG_SIZES:
+            engine = build_catalog(os.path.join(tmp, f"catalog_{size}.db"), size)
+            helpers.engine = engine
+            helpers.SessionLocal.configure(bind=engine)
+
+            # Warm up mapper configuration and statement caches first
+            walk_stream()
+            list_peak = peak_bytes(walk_list)
+            stream_peak = peak_bytes(walk_stream)
+            print(f"{size:>8}{list_peak / 1024:>15.0f} KB{stream_peak / 1024:>15.0f} KB")
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
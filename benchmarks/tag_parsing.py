@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Measure the header-only tag reader and check its durations.
+
+Parses every audio file in public/Files repeatedly and reports files per
+second, next to a baseline that reads each file in full (the cost any
+parser pays if it touches the audio payload). Then compares the computed
+durations with the hand-entered values in public/db.json.
+
+    python benchmarks/tag_parsing.py
+"""
+
+import json
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.scanner import MEDIA_ROOT, WEB_ROOT, walk_media
+from lib.tags import read_tags
+
+ROUNDS = 200
+
+def read_whole_file(path):
+    """Baseline: pull the whole file into memory"""
+    with open(path, 'rb') as file:
+        return len(file.read())
+
+def files_per_second(func, paths, rounds=ROUNDS):
+    """Call func on every path, rounds times over, and return the rate"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for path in paths:
+            func(path)
+    return rounds * len(paths) / (time.perf_counter() - started)
+
+def format_duration(seconds):
+    if seconds is None:
+        return '-'
+    seconds = round(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def main():
+    paths = sorted(path for path, _, _ in walk_media(MEDIA_ROOT))
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    print(f"{len(paths)} files, {total_bytes / 1e6:.1f} MB in {MEDIA_ROOT}\n")
+
+    tag_rate = files_per_second(read_tags, paths)
+    full_rate = files_per_second(read_whole_file, paths, rounds=max(1, ROUNDS // 10))
+    print(f"{'reader':<22}{'files/s':>12}")
+    print(f"{'read_tags (mmap)':<22}{tag_rate:>12,.0f}")
+    print(f"{'full file read':<22}{full_rate:>12,.0f}   ({tag_rate / full_rate:.0f}x slower)")
+
+    with open(os.path.join(WEB_ROOT, 'db.json'), encoding='utf-8') as file:
+        catalog = json.load(file)
+
+    print(f"\n{'file':<34}{'format':>8}{'db.json':>10}{'parsed':>10}{'diff':>8}")
+    for entry in catalog:
+        path = os.path.join(WEB_ROOT, entry['file'].lstrip('./'))
+        if not os.path.exists(path):
+            continue
+        tags = read_tags(path)
+        expected = sum(int(part) * 60 ** i for i, part in enumerate(reversed(entry['duration'].split(':'))))
+        diff = tags['duration'] - expected if tags['duration'] is not None else None
+        flag = '' if diff is not None and abs(diff) <= 1 else '   <-- mismatch'
+        print(f"{os.path.basename(path)[:32]:<34}{tags['format']:>8}{entry['duration']:>10}"
+              f"{format_duration(tags['duration']):>10}{'' if diff is None else f'{diff:+.0f}s':>8}{flag}")
+
+if __name__ == "__main__":
+    main()
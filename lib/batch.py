@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Non-interactive subcommands for scripts and pipelines.
+
+    python run.py songs --genre "Hip Hop" --format ndjson
+    python run.py search kendrick --limit 20
+    python run.py search love --format ndjson | python run.py playlist add 7 --songs-from -
+
+Listings stream straight from the iter_* helpers to stdout, so memory stays
+flat however big the catalog is, and output stops early without error when
+the reader goes away (| head). --format json (the default) writes one JSON
+array; --format ndjson writes one record per line. Song IDs for `playlist
+add` and `playlist remove` can be given as arguments or read from a file or
+stdin, one per line, either bare IDs or NDJSON records with an "id" field,
+so the output of one command feeds the next. They are applied
+WRITE_BATCH_SIZE at a time, one transaction each. Writes go through a
+running music daemon (python run.py daemon) when there is one, so its
+cached playlists stay current; --local makes them in this process.
+
+Commands print helper failures to stderr and exit with status 1.
+"""
+
+import json
+import os
+import sys
+from contextlib import contextmanager
+from itertools import islice
+
+# Song IDs per add_songs_to_playlist / remove_songs_from_playlist call
+WRITE_BATCH_SIZE = 1000
+
+OUTPUT_FORMATS = ('json', 'ndjson')
+
+class CommandError(Exception):
+    """A batch command cannot go on; the message is shown on stderr"""
+
+def write_records(records, output_format, out=None):
+    """Stream records to out as a JSON array or as NDJSON; returns the count"""
+    out = out or sys.stdout
+    # Records are flat, so to_dict() is all the conversion they need;
+    # default=str covers timestamps, as lib.records.to_plain does
+    encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+    count = 0
+    if output_format == 'ndjson':
+        for record in records:
+            out.write(encode(_plain(record)) + '\n')
+            count += 1
+        return count
+
+    out.write('[')
+    for record in records:
+        out.write(',\n' if count else '\n')
+        out.write(encode(_plain(record)))
+        count += 1
+    out.write('\n]\n' if count else ']\n')
+    return count
+
+def _plain(record):
+    return record.to_dict() if hasattr(record, 'to_dict') else record
+
+def read_song_ids(values, source=None):
+    """Yield song IDs from the command line, then from source ('-' is stdin).
+
+    Each line of source is a song ID or a JSON object with an "id" field;
+    blank lines are skipped.
+    """
+    for value in values:
+        yield _song_id(value)
+    if source is None:
+        return
+
+    lines = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    line = json.loads(line).get('id')
+                except ValueError:
+                    raise CommandError(f"Line {number}: not valid JSON") from None
+            yield _song_id(line, number)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+def _song_id(value, line_number=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        where = f"Line {line_number}: " if line_number else ""
+        raise CommandError(f"{where}{value!r} is not a song ID") from None
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _resolve(value, records, kind):
+    """The ID of a genre or artist given by ID or by name (any case)"""
+    if value.isdigit():
+        return int(value)
+    matches = [record['id'] for record in records if record['name'].lower() == value.lower()]
+    if not matches:
+        raise CommandError(f"No {kind} named {value!r}")
+    return matches[0]
+
+@contextmanager
+def write_helpers(args):
+    """lib.helpers, or a client for the running daemon unless --local is given.
+
+    A daemon caches the catalog and only drops the entries a write changes
+    when the write runs inside it, so writes made next to it in this process
+    would leave it serving stale playlists.
+    """
+    from lib.daemon import DaemonError, connect_to_daemon
+
+    client = None if args.local else connect_to_daemon(args.socket)
+    if client is None:
+        from lib import helpers
+        yield helpers
+        return
+    try:
+        yield client
+    except DaemonError as e:
+        raise CommandError(str(e)) from None
+    finally:
+        client.close()
+
+def _limit(records, limit):
+    return records if limit is None else islice(records, limit)
+
+def songs_command(args):
+    from lib import helpers
+
+    if args.genre is not None:
+        records = helpers.iter_songs_by_genre(_resolve(args.genre, helpers.get_all_genres(), 'genre'))
+    elif args.artist is not None:
+        records = helpers.iter_artist_songs(_resolve(args.artist, helpers.get_all_artists(), 'artist'))
+    elif args.playlist is not None:
+        records = helpers.iter_playlist_songs(args.playlist)
+    else:
+        records = helpers.iter_all_songs()
+    write_records(_limit(records, args.limit), args.format)
+    return 0
+
+def search_command(args):
+    from lib import helpers
+
+    records = helpers.iter_search_songs(' '.join(args.query))
+    write_records(_limit(records, args.limit), args.format)
+    return 0
+
+def artists_command(args):
+    from lib import helpers
+
+    write_records(helpers.get_all_artists(), args.format)
+    return 0
+
+def genres_command(args):
+    from lib import helpers
+
+    write_records(helpers.get_all_genres(), args.format)
+    return 0
+
+def playlists_command(args):
+    from lib import helpers
+
+    if helpers.get_user_by_id(args.user) is None:
+        raise CommandError(f"No user with ID {args.user}")
+    write_records(helpers.get_user_playlists(args.user), args.format)
+    return 0
+
+def playlist_create_command(args):
+    with write_helpers(args) as helpers:
+        if helpers.get_user_by_id(args.user) is None:
+            raise CommandError(f"No user with ID {args.user}")
+        success, result = helpers.create_playlist(args.user, args.name, args.description)
+    if not success:
+        raise CommandError(result)
+    write_records([{'id': result, 'name': args.name, 'description': args.description}], args.format)
+    return 0
+
+def playlist_show_command(args):
+    from lib import helpers
+
+    write_records(_limit(helpers.iter_playlist_songs(args.playlist_id), args.limit), args.format)
+    return 0
+
+def _playlist_update_command(args, helper_name):
+    """Apply the named helper to the playlist WRITE_BATCH_SIZE song IDs at a time.
+
+    One result is written per batch. Exits with status 1 if no batch
+    changed anything, as the helpers report for a single call.
+    """
+    if args.songs_from is None and not args.song_ids:
+        raise CommandError("No song IDs given; list them or use --songs-from")
+
+    def results():
+        for chunk in _chunks(read_song_ids(args.song_ids, args.songs_from), WRITE_BATCH_SIZE):
+            success, message = update(args.playlist_id, chunk)
+            outcomes.append(success)
+            yield {'playlist_id': args.playlist_id, 'songs': len(chunk), 'success': success, 'message': message}
+
+    outcomes = []
+    with write_helpers(args) as helpers:
+        update = getattr(helpers, helper_name)
+        write_records(results(), args.format)
+    if not any(outcomes):
+        print("Nothing changed in the playlist", file=sys.stderr)
+        return 1
+    return 0
+
+def playlist_add_command(args):
+    return _playlist_update_command(args, 'add_songs_to_playlist')
+
+def playlist_remove_command(args):
+    return _playlist_update_command(args, 'remove_songs_from_playlist')
+
+def run_command(args):
+    """Run the subcommand chosen on the command line and return its exit status"""
+    try:
+        status = args.handler(args)
+        sys.stdout.flush()
+        return status
+    except CommandError as e:
+        sys.stdout.flush()
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader stopped early (| head); silence the flush at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+
+def add_batch_commands(commands):
+    """Register the batch subcommands on the CLI's subparsers"""
+    import argparse
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--format", choices=OUTPUT_FORMATS, default='json',
+                        help="a JSON array (default) or one JSON record per line")
+    listing = argparse.ArgumentParser(add_help=False, parents=[output])
+    listing.add_argument("--limit", type=int, help="stop after this many songs")
+
+    songs = commands.add_parser("songs", parents=[listing], help="list songs, optionally by genre, artist or playlist")
+    source = songs.add_mutually_exclusive_group()
+    source.add_argument("--genre", help="genre name or ID")
+    source.add_argument("--artist", help="artist name or ID")
+    source.add_argument("--playlist", type=int, help="playlist ID")
+    songs.set_defaults(handler=songs_command)
+
+    search = commands.add_parser("search", parents=[listing], help="search songs, best matches first")
+    search.add_argument("query", nargs='+')
+    search.set_defaults(handler=search_command)
+
+    commands.add_parser("artists", parents=[output], help="list artists").set_defaults(handler=artists_command)
+    commands.add_parser("genres", parents=[output], help="list genres").set_defaults(handler=genres_command)
+
+    playlists = commands.add_parser("playlists", parents=[output], help="list a user's playlists")
+    playlists.add_argument("--user", type=int, required=True, help="user ID")
+    playlists.set_defaults(handler=playlists_command)
+
+    playlist = commands.add_parser("playlist", help="show or change one playlist")
+    actions = playlist.add_subparsers(dest="action", required=True)
+
+    create = actions.add_parser("create", parents=[output], help="create a playlist")
+    create.add_argument("name")
+    create.add_argument("--user", type=int, required=True, help="owner's user ID")
+    create.add_argument("--description", default="")
+    create.set_defaults(handler=playlist_create_command)
+
+    show = actions.add_parser("show", parents=[listing], help="list a playlist's songs in order")
+    show.add_argument("playlist_id", type=int)
+    show.set_defaults(handler=playlist_show_command)
+
+    for name, handler, verb in (("add", playlist_add_command, "append songs to"),
+                                ("remove", playlist_remove_command, "remove songs from")):
+        update = actions.add_parser(name, parents=[output], help=f"{verb} a playlist")
+        update.add_argument("playlist_id", type=int)
+        update.add_argument("song_ids", nargs='*', metavar="song_id")
+        update.add_argument("--songs-from", metavar="FILE",
+                            help="read song IDs or NDJSON songs from FILE, or stdin for -")
+        update.set_defaults(handler=handler)
@@ -0,0 +1,302 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Defaults for the catalog cache in front of the read helpers
+CATALOG_CACHE_SIZE = 512
+CATALOG_CACHE_TTL = 300  # seconds
+
+# Defaults for the audio chunk cache in front of streamed files
+CHUNK_SIZE = 256 * 1024
+CHUNK_CACHE_BUDGET = 64 * 1024 * 1024  # bytes
+CHUNK_PROTECTED_SHARE = 0.8  # of the budget, for chunks read more than once
+
+_MISSING = object()
+
+class TTLCache:
+    """A bounded, thread-safe LRU cache whose entries also expire after ttl seconds.
+
+    Keys are tuples whose first element names the cached helper, e.g.
+    ('artist_songs', 7), so every entry of one helper can be dropped at once
+    with invalidate_all('artist_songs').
+    """
+
+    def __init__(self, maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *key):
+        """Drop one entry, e.g. invalidate('playlist_songs', playlist_id)"""
+        with self._lock:
+            if self._entries.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def invalidate_all(self, name, *args):
+        """Drop every entry cached for the helper called name, or only those
+        whose key goes on with args, e.g. invalidate_all('playlist_songs_page', 7)"""
+        prefix = (name,) + args
+        with self._lock:
+            stale = [key for key in self._entries if key[:len(prefix)] == prefix]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current size as a dictionary"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+class ChunkCache:
+    """A thread-safe cache of fixed-size file chunks bounded by a byte budget.
+
+    Entries are keyed by (file key, chunk index); the file key should change
+    whenever the file does, e.g. (path, etag). Eviction is a segmented LRU:
+    new chunks enter a probation segment and move to a protected segment
+    (at most protected_share of the budget) when read again, so one-off
+    reads of cold files only ever displace other cold chunks. The cached
+    payload never exceeds budget bytes.
+    """
+
+    def __init__(self, budget=CHUNK_CACHE_BUDGET, chunk_size=CHUNK_SIZE, protected_share=CHUNK_PROTECTED_SHARE):
+        self.budget = budget
+        self.chunk_size = chunk_size
+        self.protected_share = protected_share
+        self._probation = OrderedDict()  # (file key, index) -> bytes, oldest first
+        self._protected = OrderedDict()
+        self._chunks = {}  # file key -> set of cached chunk indexes
+        self._lock = threading.Lock()
+        self.size = 0
+        self.protected_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.hit_bytes = 0
+        self.miss_bytes = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, index):
+        """Return the cached chunk, or None on a miss"""
+        entry = (key, index)
+        with self._lock:
+            data = self._protected.get(entry)
+            if data is not None:
+                self._protected.move_to_end(entry)
+            else:
+                data = self._probation.pop(entry, None)
+                if data is None:
+                    self.misses += 1
+                    return None
+                # Second read: promote, demoting protected chunks if it is full
+                self._protected[entry] = data
+                self.protected_size += len(data)
+                while self.protected_size > self.budget * self.protected_share and len(self._protected) > 1:
+                    demoted, demoted_data = self._protected.popitem(last=False)
+                    self.protected_size -= len(demoted_data)
+                    self._probation[demoted] = demoted_data
+            self.hits += 1
+            self.hit_bytes += len(data)
+            return data
+
+    def put(self, key, index, data):
+        """Cache a chunk in the probation segment, evicting to stay within budget"""
+        if len(data) > self.budget:
+            return
+        entry = (key, index)
+        with self._lock:
+            if entry in self._probation or entry in self._protected:
+                return
+            self._probation[entry] = data
+            self._chunks.setdefault(key, set()).add(index)
+            self.size += len(data)
+            self._shrink(self.budget)
+
+    def read(self, key, fd, index):
+        """Return a chunk of an open file, reading and caching it on a miss"""
+        data = self.get(key, index)
+        return data if data is not None else self.load(key, fd, index)
+
+    def load(self, key, fd, index):
+        """Read a chunk from an open file and cache it; call after a miss"""
+        data = os.pread(fd, self.chunk_size, index * self.chunk_size)
+        with self._lock:
+            self.miss_bytes += len(data)
+        if data:
+            self.put(key, index, data)
+        return data
+
+    def chunk_range(self, start, end):
+        """Indexes of the chunks holding bytes start..end inclusive"""
+        return range(start // self.chunk_size, end // self.chunk_size + 1)
+
+    def resize(self, budget):
+        """Change the byte budget, evicting at once if it shrank"""
+        with self._lock:
+            self.budget = budget
+            self._shrink(budget)
+
+    def invalidate(self, key):
+        """Drop every cached chunk of one file"""
+        with self._lock:
+            for index in self._chunks.pop(key, ()):
+                for segment in (self._probation, self._protected):
+                    data = segment.pop((key, index), None)
+                    if data is not None:
+                        self.size -= len(data)
+                        if segment is self._protected:
+                            self.protected_size -= len(data)
+                        self.invalidations += 1
+
+    def clear(self):
+        """Drop every chunk"""
+        with self._lock:
+            self.invalidations += len(self._probation) + len(self._protected)
+            self._probation.clear()
+            self._protected.clear()
+            self._chunks.clear()
+            self.size = self.protected_size = 0
+
+    def _shrink(self, budget):
+        # Probation goes first; protected chunks only once it is empty
+        while self.size > budget:
+            segment = self._probation or self._protected
+            (key, index), data = segment.popitem(last=False)
+            self.size -= len(data)
+            if segment is self._protected:
+                self.protected_size -= len(data)
+            indexes = self._chunks[key]
+            indexes.discard(index)
+            if not indexes:
+                del self._chunks[key]
+            self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss counters and memory use as a dictionary"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            transferred = self.hit_bytes + self.miss_bytes
+            return {
+                'chunks': len(self._probation) + len(self._protected),
+                'files': len(self._chunks),
+                'bytes': self.size,
+                'protected_bytes': self.protected_size,
+                'budget': self.budget,
+                'chunk_size': self.chunk_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'byte_hit_ratio': self.hit_bytes / transferred if transferred else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+# Shared by every cached helper in lib.helpers
+catalog_cache = TTLCache()
+
+def cached(name, cache=catalog_cache):
+    """Read-through cache decorator for list-returning helpers.
+
+    The cache key is (name, *args). Callers get a fresh copy of the cached
+    list, so mutating a result never corrupts the cache. The undecorated
+    function stays reachable as wrapper.uncached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = (name,) + args
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args)
+                cache.set(key, value)
+            return list(value)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+def cached_first_page(name, cache=catalog_cache):
+    """Read-through cache decorator for the *_page helpers.
+
+    Only the first page (after=None) is cached, keyed on (name, *the other
+    arguments), since that is the page every listing opens on; later pages
+    depend on a cursor and are fetched as they are asked for. Callers get a
+    fresh copy of the cached songs. The undecorated function stays
+    reachable as wrapper.uncached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            if arguments.pop('after') is not None:
+                return func(*args, **kwargs)
+
+            key = (name,) + tuple(arguments.values())
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.set(key, value)
+            songs, next_cursor = value
+            return list(songs), next_cursor
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -1,19 +1,65 @@
 import os
 import sys
-from lib.helpers import (
-    register_user, login_user, get_user_by_id, search_songs, get_all_songs,
-    get_all_artists, get_artist_songs, get_user_playlists, create_playlist,
-    add_song_to_playlist, get_playlist_songs, get_all_genres, get_songs_by_genre
-)
+
+# Songs shown per screen in paged listings
+PAGE_SIZE = 10
+
+def parse_selection(text):
+    """Parse a multi-select answer such as "1,4,7-12" into a list of numbers.
+
+    Numbers keep the order they were typed in, without repeats. Raises
+    ValueError if the text is not a list of numbers and ranges.
+    """
+    numbers = []
+    for part in text.replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = int(start), int(end)
+            if start > end:
+                start, end = end, start
+            numbers.extend(range(start, end + 1))
+        else:
+            numbers.append(int(part))
+    return list(dict.fromkeys(numbers))
 
 class MusicStreamingCLI:
-    def __init__(self):
+    def __init__(self, helpers=None, use_daemon=True, socket_path=None):
         self.current_user = None
         self.running = True
+        # lib.helpers, or a lib.daemon.DaemonClient that forwards the same
+        # calls to a running daemon; chosen on first use
+        self._helpers = helpers
+        self.use_daemon = use_daemon
+        self.socket_path = socket_path
+
+    @property
+    def helpers(self):
+        """The helpers, picked on first use so the menu appears before anything heavy loads.
+
+        A running daemon (python run.py daemon) is used when there is one;
+        otherwise lib.helpers is imported here.
+        """
+        if self._helpers is None:
+            if self.use_daemon:
+                from lib.daemon import connect_to_daemon
+                self._helpers = connect_to_daemon(self.socket_path)
+            if self._helpers is None:
+                from lib import helpers
+                self._helpers = helpers
+        return self._helpers
 
     def clear_screen(self):
-        """Clear the terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        """Clear the terminal screen; a no-op when output is not a terminal"""
+        if not sys.stdout.isatty():
+            return
+        if os.name == 'nt':
+            os.system('cls')
+        else:
+            # Clear the screen and move home, without starting a `clear` process
+            sys.stdout.write("\033[H\033[2J")
+            sys.stdout.flush()
 
     def print_header(self):
         """Print the application header"""
@@ -37,6 +83,76 @@ class MusicStreamingCLI:
         """Pause and wait for user input"""
         input("\n  Press Enter to continue...")
 
+    def print_song(self, number, song, show_artist=True, show_genre=True):
+        """Print one entry of a song listing"""
+        duration_str = f"{song['duration']}s" if song['duration'] else "Unknown"
+        print(f"{number:2d}.  {song['title']}")
+        if show_artist:
+            print(f"     Artist: {song['artist']}")
+        print(f"     Album: {song['album']}")
+        if show_genre:
+            print(f"     Genre: {song['genre']}")
+        print(f"      Duration: {duration_str}")
+        print()
+
+    def page_songs(self, title, fetch_page, empty_message, select_prompt=None,
+                   show_artist=True, show_genre=True):
+        """Show a song listing one page at a time.
+
+        fetch_page(after) returns a (songs, next_cursor) tuple. The cursor of
+        every page shown so far is kept, so going back a page is one keyset
+        query rather than a re-read from the start. When select_prompt is
+        given the user may pick songs on the current page with a selection
+        such as "1,4,7-12"; the picked songs are returned as a list.
+        """
+        cursors = [None]
+        
+        while True:
+            songs, next_cursor = fetch_page(cursors[-1])
+            
+            self.clear_screen()
+            print(title)
+            
+            if not songs:
+                print(empty_message)
+                return []
+            
+            first_number = (len(cursors) - 1) * PAGE_SIZE + 1
+            print(f"Page {len(cursors)}:\n")
+            
+            for i, song in enumerate(songs, first_number):
+                self.print_song(i, song, show_artist, show_genre)
+            
+            actions = []
+            if select_prompt:
+                actions.append(select_prompt)
+            if next_cursor is not None:
+                actions.append("'n' for next page")
+            if len(cursors) > 1:
+                actions.append("'p' for previous page")
+            
+            if not actions:
+                return []
+            
+            choice = self.get_input(", ".join(actions) + " (or press Enter to continue)").lower()
+            
+            if choice == 'n' and next_cursor is not None:
+                cursors.append(next_cursor)
+            elif choice == 'p' and len(cursors) > 1:
+                cursors.pop()
+            elif select_prompt and choice[:1].isdigit():
+                try:
+                    numbers = parse_selection(choice)
+                except ValueError:
+                    print(" Invalid selection")
+                    return []
+                return [
+                    songs[number - first_number] for number in numbers
+                    if 0 <= number - first_number < len(songs)
+                ]
+            else:
+                return []
+
     def show_main_menu(self):
         """Show the main menu"""
         self.clear_screen()
@@ -74,12 +190,12 @@ class MusicStreamingCLI:
         email = self.get_input("Enter email")
         password = self.get_input("Enter password")
         
-        success, result = register_user(username, email, password)
+        success, result = self.helpers.register_user(username, email, password)
         
         if success:
             print(f"User {username} registered successfully!")
             # Auto-login after registration
-            login_success, user_data = login_user(username, password)
+            login_success, user_data = self.helpers.login_user(username, password)
             if login_success:
                 self.current_user = user_data
                 print(f"Welcome, {user_data['username']}!")
@@ -98,7 +214,7 @@ class MusicStreamingCLI:
         username = self.get_input("Enter username")
         password = self.get_input("Enter password")
         
-        success, result = login_user(username, password)
+        success, result = self.helpers.login_user(username, password)
         
         if success:
             self.current_user = result
@@ -133,33 +249,17 @@ class MusicStreamingCLI:
 
     def browse_music(self):
         """Browse all music"""
-        self.clear_screen()
-        print("===  MUSIC LIBRARY ===")
+        select_prompt = "Enter song numbers to add to playlist (e.g. 1,4,7-9)" if self.current_user else None
         
-        songs = get_all_songs()
+        songs = self.page_songs(
+            "===  MUSIC LIBRARY ===",
+            lambda after: self.helpers.get_all_songs_page(after, PAGE_SIZE),
+            "No songs found in the library.",
+            select_prompt
+        )
         
-        if not songs:
-            print("No songs found in the library.")
-            self.pause()
-            return
-        
-        print(f"Found {len(songs)} songs:\n")
-        
-        for i, song in enumerate(songs, 1):
-            duration_str = f"{song['duration']}s" if song['duration'] else "Unknown"
-            print(f"{i:2d}.  {song['title']}")
-            print(f"     Artist: {song['artist']}")
-            print(f"     Album: {song['album']}")
-            print(f"     Genre: {song['genre']}")
-            print(f"      Duration: {duration_str}")
-            print()
-        
-        if self.current_user:
-            choice = self.get_input("Enter song number to add to playlist (or press Enter to continue)")
-            if choice.isdigit():
-                song_index = int(choice) - 1
-                if 0 <= song_index < len(songs):
-                    self.add_to_playlist_menu(songs[song_index]['id'])
+        if songs:
+            self.add_to_playlist_menu([song['id'] for song in songs])
         
         self.pause()
 
@@ -180,29 +280,15 @@ class MusicStreamingCLI:
             self.pause()
             return
         
-        songs = search_songs(query)
-        
-        if not songs:
-            print(f"No songs found matching '{query}'")
-            self.pause()
-            return
-        
-        print(f"\nFound {len(songs)} songs matching '{query}':\n")
-        
-        for i, song in enumerate(songs, 1):
-            duration_str = f"{song['duration']}s" if song['duration'] else "Unknown"
-            print(f"{i:2d}.  {song['title']}")
-            print(f"     Artist: {song['artist']}")
-            print(f"     Album: {song['album']}")
-            print(f"     Genre: {song['genre']}")
-            print(f"      Duration: {duration_str}")
-            print()
+        songs = self.page_songs(
+            f"===  SONGS MATCHING '{query}' ===",
+            lambda after: self.helpers.search_songs_page(query, after, PAGE_SIZE),
+            f"No songs found matching '{query}'",
+            "Enter song numbers to add to playlist (e.g. 1,4,7-9)"
+        )
         
-        choice = self.get_input("Enter song number to add to playlist (or press Enter to continue)")
-        if choice.isdigit():
-            song_index = int(choice) - 1
-            if 0 <= song_index < len(songs):
-                self.add_to_playlist_menu(songs[song_index]['id'])
+        if songs:
+            self.add_to_playlist_menu([song['id'] for song in songs])
         
         self.pause()
 
@@ -211,7 +297,7 @@ class MusicStreamingCLI:
         self.clear_screen()
         print("===  ARTISTS ===")
         
-        artists = get_all_artists()
+        artists = self.helpers.get_all_artists()
         
         if not artists:
             print("No artists found.")
@@ -236,31 +322,19 @@ class MusicStreamingCLI:
 
     def show_artist_songs(self, artist_id, artist_name):
         """Show songs by a specific artist"""
-        self.clear_screen()
-        print(f"===  SONGS BY {artist_name.upper()} ===")
-        
-        songs = get_artist_songs(artist_id)
-        
-        if not songs:
-            print(f"No songs found for {artist_name}")
-            return
-        
-        print(f"Found {len(songs)} songs:\n")
-        
-        for i, song in enumerate(songs, 1):
-            duration_str = f"{song['duration']}s" if song['duration'] else "Unknown"
-            print(f"{i:2d}.  {song['title']}")
-            print(f"     Album: {song['album']}")
-            print(f"     Genre: {song['genre']}")
-            print(f"      Duration: {duration_str}")
-            print()
+        self.page_songs(
+            f"===  SONGS BY {artist_name.upper()} ===",
+            lambda after: self.helpers.get_artist_songs_page(artist_id, after, PAGE_SIZE),
+            f"No songs found for {artist_name}",
+            show_artist=False
+        )
 
     def browse_genres(self):
         """Browse all genres"""
         self.clear_screen()
         print("===  GENRES ===")
         
-        genres = get_all_genres()
+        genres = self.helpers.get_all_genres()
         
         if not genres:
             print("No genres found.")
@@ -282,25 +356,12 @@ class MusicStreamingCLI:
 
     def show_genre_songs(self, genre_id, genre_name):
         """Show songs in a specific genre"""
-        self.clear_screen()
-        print(f"===  {genre_name.upper()} SONGS ===")
-        
-        songs = get_songs_by_genre(genre_id)
-        
-        if not songs:
-            print(f"No songs found in {genre_name} genre")
-            self.pause()
-            return
-        
-        print(f"Found {len(songs)} songs:\n")
-        
-        for i, song in enumerate(songs, 1):
-            duration_str = f"{song['duration']}s" if song['duration'] else "Unknown"
-            print(f"{i:2d}.  {song['title']}")
-            print(f"     Artist: {song['artist']}")
-            print(f"     Album: {song['album']}")
-            print(f"      Duration: {duration_str}")
-            print()
+        self.page_songs(
+            f"===  {genre_name.upper()} SONGS ===",
+            lambda after: self.helpers.get_songs_by_genre_page(genre_id, after, PAGE_SIZE),
+            f"No songs found in {genre_name} genre",
+            show_genre=False
+        )
         
         self.pause()
 
@@ -314,7 +375,7 @@ class MusicStreamingCLI:
         self.clear_screen()
         print("===  MY PLAYLISTS ===")
         
-        playlists = get_user_playlists(self.current_user['id'])
+        playlists = self.helpers.get_user_playlists(self.current_user['id'])
         
         if not playlists:
             print("You don't have any playlists yet.")
@@ -341,25 +402,11 @@ class MusicStreamingCLI:
 
     def show_playlist_songs(self, playlist_id, playlist_name):
         """Show songs in a playlist"""
-        self.clear_screen()
-        print(f"===  {playlist_name.upper()} ===")
-        
-        songs = get_playlist_songs(playlist_id)
-        
-        if not songs:
-            print("This playlist is empty.")
-            return
-        
-        print(f"Playlist contains {len(songs)} songs:\n")
-        
-        for song in songs:
-            duration_str = f"{song['duration']}s" if song['duration'] else "Unknown"
-            print(f"{song['position']:2d}.  {song['title']}")
-            print(f"     Artist: {song['artist']}")
-            print(f"     Album: {song['album']}")
-            print(f"     Genre: {song['genre']}")
-            print(f"      Duration: {duration_str}")
-            print()
+        self.page_songs(
+            f"===  {playlist_name.upper()} ===",
+            lambda after: self.helpers.get_playlist_songs_page(playlist_id, after, PAGE_SIZE),
+            "This playlist is empty."
+        )
 
     def create_new_playlist(self):
         """Create a new playlist"""
@@ -379,7 +426,7 @@ class MusicStreamingCLI:
         
         description = self.get_input("Enter playlist description (optional)")
         
-        success, result = create_playlist(self.current_user['id'], name, description)
+        success, result = self.helpers.create_playlist(self.current_user['id'], name, description)
         
         if success:
             print(f" Playlist '{name}' created successfully!")
@@ -388,9 +435,9 @@ class MusicStreamingCLI:
         
         self.pause()
 
-    def add_to_playlist_menu(self, song_id):
-        """Show menu to add song to playlist"""
-        playlists = get_user_playlists(self.current_user['id'])
+    def add_to_playlist_menu(self, song_ids):
+        """Show menu to add the selected songs to a playlist"""
+        playlists = self.helpers.get_user_playlists(self.current_user['id'])
         
         if not playlists:
             print("\n You don't have any playlists yet.")
@@ -410,7 +457,7 @@ class MusicStreamingCLI:
             playlist_index = int(choice) - 1
             if 0 <= playlist_index < len(playlists):
                 playlist_id = playlists[playlist_index]['id']
-                success, message = add_song_to_playlist(playlist_id, song_id)
+                success, message = self.helpers.add_songs_to_playlist(playlist_id, song_ids)
                 if success:
                     print(f" {message}")
                 else:
@@ -467,10 +514,33 @@ class MusicStreamingCLI:
                 print(f"\n An error occurred: {str(e)}")
                 self.pause()
 
-def main():
+def main(argv=None):
     """Entry point for the CLI application"""
-    app = MusicStreamingCLI()
-    app.run()
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        # The common case skips argparse, to show the menu sooner
+        MusicStreamingCLI().run()
+        return
+
+    import argparse
+    from lib.batch import add_batch_commands, run_command
+    from lib.daemon import add_daemon_arguments, daemon_main
+
+    parser = argparse.ArgumentParser(description="Music Streaming CLI")
+    parser.add_argument("--local", action="store_true", help="do not use a running music daemon")
+    parser.add_argument("--socket", help="music daemon socket (default: per user and database)")
+    commands = parser.add_subparsers(dest="command")
+    daemon_parser = commands.add_parser("daemon", help="keep the helpers loaded and serve them over a Unix socket")
+    add_daemon_arguments(daemon_parser)
+    add_batch_commands(commands)
+    args = parser.parse_args(argv)
+
+    if args.command == "daemon":
+        sys.exit(daemon_main(args))
+    if args.command is not None:
+        sys.exit(run_command(args))
+
+    MusicStreamingCLI(use_daemon=not args.local, socket_path=args.socket).run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
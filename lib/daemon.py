@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""A long-running helpers process behind a Unix socket, and its thin client.
+
+`python run.py daemon` imports lib.helpers once, warms the engine, the
+mappers, the search index and the catalog cache, and then answers helper
+calls on a Unix socket. `python run.py` finds a running daemon and
+forwards every helper call the CLI makes to it. Each call then costs a
+socket round trip instead of an interpreter paying for SQLAlchemy, a new
+connection pool and a cold page cache.
+
+The protocol is one JSON object per line each way:
+
+    {"op": "call", "name": "get_all_genres", "args": [], "kwargs": {}}
+    {"ok": true, "result": [{"id": 1, "name": "Rock"}]}
+
+Records arrive as dictionaries and tuples as lists, which the CLI reads the
+same way. Calls run on a thread pool, so any number of terminals can share
+one daemon, and only the helpers in DAEMON_HELPERS can be called. Before
+each call the daemon checks PRAGMA data_version and drops its catalog cache
+if anything else (a scan, an import, a --local write) has committed since,
+so it never answers from a cache older than the database. The
+socket is created with owner-only permissions, and a lock file keeps a
+second daemon off the same database.
+
+The client side only imports json and socket, never SQLAlchemy.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+SOCKET_ENV = 'MUSIC_DAEMON_SOCKET'
+
+# Helper threads; SQLite serializes writers, so a few are plenty
+DAEMON_WORKERS = 4
+
+# Seconds a client waits for a reply before giving up
+DAEMON_TIMEOUT = 30.0
+
+# Helpers a client may call. The iter_* helpers are left out: they stream
+# and have no single result to send back.
+DAEMON_HELPERS = frozenset({
+    'register_user', 'login_user', 'get_user_by_id',
+    'search_songs', 'search_songs_page',
+    'get_all_songs', 'get_all_songs_page', 'get_song_file_path',
+    'get_all_artists', 'get_artist_songs', 'get_artist_songs_page',
+    'get_all_genres', 'get_songs_by_genre', 'get_songs_by_genre_page',
+    'get_user_playlists', 'get_playlist_songs', 'get_playlist_songs_page',
+    'create_playlist', 'add_song_to_playlist', 'add_songs_to_playlist',
+    'remove_songs_from_playlist', 'insert_song_at', 'move_songs', 'rebalance_playlist',
+    'invalidate_catalog_cache',
+})
+
+class DaemonError(Exception):
+    """Raised when the daemon cannot be reached or a call fails in it"""
+
+def database_path():
+    """The database the app would open; the same default as lib/db/engine.py,
+    worked out here so the client does not have to import SQLAlchemy"""
+    return os.path.abspath(
+        os.environ.get('MUSIC_DB_PATH', os.path.join(project_root, 'lib', 'db', 'music_streaming.db'))
+    )
+
+def default_socket_path():
+    """Per-user socket path for the current database"""
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    database = hashlib.blake2b(database_path().encode(), digest_size=6).hexdigest()
+    return os.path.join(runtime_dir, f"music-daemon-{os.getuid()}-{database}.sock")
+
+class DaemonClient:
+    """Calls helpers in a running daemon as if they were lib.helpers functions.
+
+    client.get_all_genres() sends one request and waits for its reply. A
+    lost connection raises DaemonError; the next call reconnects.
+    """
+
+    def __init__(self, socket_path=None, timeout=DAEMON_TIMEOUT):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._socket = None
+        self._file = None
+
+    def connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        try:
+            connection.connect(self.socket_path)
+        except OSError:
+            connection.close()
+            raise
+        self._socket = connection
+        self._file = connection.makefile('rwb')
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._file.close()
+                self._socket.close()
+            finally:
+                self._socket = None
+                self._file = None
+
+    def request(self, op, **fields):
+        """Send one request and return its result, raising DaemonError on failure"""
+        try:
+            if self._socket is None:
+                self.connect()
+            self._file.write(json.dumps(dict(fields, op=op), separators=(',', ':')).encode() + b'\n')
+            self._file.flush()
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("the daemon closed the connection")
+        except OSError as e:
+            # Not retried: the call may already have run
+            self.close()
+            raise DaemonError(f"Lost connection to the music daemon: {e}") from None
+
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise DaemonError(reply.get('error') or "The daemon reported an unknown error")
+        return reply.get('result')
+
+    def call(self, name, *args, **kwargs):
+        return self.request('call', name=name, args=args, kwargs=kwargs)
+
+    def __getattr__(self, name):
+        if name in DAEMON_HELPERS:
+            def forward(*args, **kwargs):
+                return self.call(name, *args, **kwargs)
+            forward.__name__ = name
+            return forward
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def ping(self):
+        return self.request('ping')
+
+    def stats(self):
+        return self.request('stats')
+
+    def shutdown(self):
+        return self.request('shutdown')
+
+def connect_to_daemon(socket_path=None):
+    """A connected DaemonClient, or None if no daemon is listening"""
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    client = DaemonClient(socket_path)
+    try:
+        return client.connect()
+    except OSError:
+        return None
+
+def _warm_up(helpers):
+    """Pay every first-use cost before the first client call"""
+    from sqlalchemy.orm import configure_mappers
+    from lib.search import ensure_search_index
+
+    configure_mappers()
+    ensure_search_index(helpers.engine)
+    helpers.get_all_artists()
+    helpers.get_all_genres()
+    helpers.get_all_songs_page()
+
+def _change_watcher(path, cache):
+    """A function that clears cache when the database has changed since its last call.
+
+    PRAGMA data_version on one connection of its own changes whenever any
+    other connection commits, in this process or another, so writes the
+    daemon did not make itself are caught too. Returns whether it cleared.
+    """
+    import sqlite3
+
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    last = [connection.execute("PRAGMA data_version").fetchone()[0]]
+
+    def check():
+        version = connection.execute("PRAGMA data_version").fetchone()[0]
+        if version == last[0]:
+            return False
+        last[0] = version
+        cache.clear()
+        return True
+
+    check.close = connection.close
+    return check
+
+def serve(socket_path=None, workers=DAEMON_WORKERS, progress=print):
+    """Run the daemon until SIGINT, SIGTERM or a shutdown request"""
+    import asyncio
+    import fcntl
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import partial
+
+    started = time.perf_counter()
+    from lib import helpers
+    from lib.cache import catalog_cache
+    from lib.records import to_plain
+
+    socket_path = socket_path or default_socket_path()
+    lock_file = open(f"{socket_path}.lock", 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise DaemonError(f"A music daemon is already running on {socket_path}")
+
+    _warm_up(helpers)
+    progress(f"Loaded and warmed up in {time.perf_counter() - started:.2f}s")
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='music-daemon')
+    database_changed = _change_watcher(database_path(), catalog_cache)
+    counters = {'requests': 0, 'errors': 0, 'clients': 0, 'reloads': 0}
+    started_at = time.time()
+
+    async def dispatch(request, stop):
+        op = request.get('op')
+        if op == 'call':
+            name = request.get('name')
+            if name not in DAEMON_HELPERS:
+                raise DaemonError(f"{name!r} cannot be called through the daemon")
+            if database_changed():
+                counters['reloads'] += 1
+            call = partial(getattr(helpers, name), *request.get('args', ()), **request.get('kwargs', {}))
+            return to_plain(await asyncio.get_running_loop().run_in_executor(executor, call))
+        if op == 'ping':
+            return {'pid': os.getpid(), 'database': database_path(), 'uptime': time.time() - started_at}
+        if op == 'stats':
+            return dict(counters, catalog_cache=catalog_cache.stats())
+        if op == 'shutdown':
+            stop.set()
+            return {'pid': os.getpid()}
+        raise DaemonError(f"Unknown request {op!r}")
+
+    async def main():
+        stop = asyncio.Event()
+        connections = {}  # handler task -> writer
+
+        async def handle(reader, writer):
+            counters['clients'] += 1
+            connections[asyncio.current_task()] = writer
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    counters['requests'] += 1
+                    try:
+                        reply = {'ok': True, 'result': await dispatch(json.loads(line), stop)}
+                    except Exception as e:
+                        counters['errors'] += 1
+                        message = str(e) if isinstance(e, DaemonError) else f"{type(e).__name__}: {e}"
+                        reply = {'ok': False, 'error': message}
+                    writer.write(json.dumps(reply, separators=(',', ':')).encode() + b'\n')
+                    await writer.drain()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                connections.pop(asyncio.current_task(), None)
+                counters['clients'] -= 1
+                writer.close()
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+        # We hold the lock, so a socket file left behind is from a dead daemon
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(handle, path=socket_path)
+        finally:
+            os.umask(umask)
+        progress(f"Music daemon {os.getpid()} listening on {socket_path} for {database_path()}")
+
+        async with server:
+            await stop.wait()
+            server.close()
+            # Closing a connection ends its handler at the next read
+            handlers = list(connections)
+            for writer in connections.values():
+                writer.close()
+            if handlers:
+                await asyncio.wait(handlers, timeout=DAEMON_TIMEOUT)
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown(wait=True)
+        database_changed.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        lock_file.close()
+        progress("Music daemon stopped")
+
+def daemon_main(args):
+    """The `run.py daemon` subcommand"""
+    if args.stop or args.status:
+        client = connect_to_daemon(args.socket)
+        if client is None:
+            print(f"No music daemon is listening on {args.socket or default_socket_path()}")
+            return 1
+        try:
+            if args.stop:
+                print(f"Stopping music daemon {client.shutdown()['pid']}")
+            else:
+                status = client.ping()
+                stats = client.stats()
+                print(f"Music daemon {status['pid']} for {status['database']}, up {status['uptime']:.0f}s: "
+                      f"{stats['requests']:,} requests, {stats['errors']:,} errors, {stats['clients']} clients; "
+                      f"catalog cache dropped {stats['reloads']:,} times for outside writes, "
+                      f"catalog cache hit ratio {stats['catalog_cache'].get('hit_ratio', 0):.0%}")
+        finally:
+            client.close()
+        return 0
+
+    try:
+        serve(args.socket, args.workers)
+    except DaemonError as e:
+        print(e)
+        return 1
+    return 0
+
+def add_daemon_arguments(parser):
+    import argparse
+
+    # SUPPRESS: given before the subcommand (run.py --socket S daemon), the
+    # CLI's own --socket must not be reset to None by this one
+    parser.add_argument("--socket", default=argparse.SUPPRESS,
+                        help="Unix socket path (default: per user and database)")
+    parser.add_argument("--workers", type=int, default=DAEMON_WORKERS, help="threads for helper calls")
+    parser.add_argument("--stop", action="store_true", help="stop the running daemon")
+    parser.add_argument("--status", action="store_true", help="show the running daemon's status")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve lib.helpers to CLI clients over a Unix socket")
+    add_daemon_arguments(parser)
+    parser.set_defaults(socket=None)
+    sys.exit(daemon_main(parser.parse_args()))
@@ -0,0 +1,142 @@
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+
+from lib.db.instrumentation import instrument_from_environment
+
+# Default database location; MUSIC_DB_PATH points the whole app somewhere else
+DB_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.abspath(
+    os.environ.get('MUSIC_DB_PATH', os.path.join(DB_DIR, 'music_streaming.db'))
+)
+DATABASE_URL = f"sqlite:///{DB_PATH}"
+
+# Connection profiles. "pool" is passed to create_engine; "pragmas" are run
+# on every new DBAPI connection, in order, before the pool hands it out.
+PROFILES = {
+    # The CLI, helpers and debug tools: many short reads, occasional writes
+    'interactive': {
+        'pool': {
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_pre_ping': True,
+        },
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -16000,      # KiB, i.e. 16 MB of page cache
+            'mmap_size': 268435456,    # 256 MB
+            'temp_store': 'MEMORY',
+            'busy_timeout': 5000,      # ms
+        },
+    },
+    # setup.py, seeding and importers: one writer, large transactions.
+    # synchronous=OFF is safe here because a failed load is simply re-run.
+    'bulk-load': {
+        'pool': {
+            'pool_size': 1,
+            'max_overflow': 0,
+            'pool_pre_ping': False,
+        },
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'OFF',
+            'cache_size': -262144,     # 256 MB
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 30000,
+        },
+    },
+    # Reports and inspection: never writes, so it never touches the journal mode
+    'read-only': {
+        'pool': {
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_pre_ping': True,
+        },
+        'pragmas': {
+            'query_only': 'ON',
+            'cache_size': -16000,
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 5000,
+        },
+    },
+}
+
+DEFAULT_PROFILE = 'interactive'
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def _pragma_listener(pragmas):
+    """Build a 'connect' event handler that applies pragmas to a new connection"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+def create_db_engine(profile=DEFAULT_PROFILE, db_path=None, **engine_options):
+    """Create a new engine for the database using a named connection profile.
+
+    engine_options override the profile's pool settings, e.g. pool_size=20.
+    Most callers want the shared engine from get_engine() instead.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown database profile '{profile}', expected one of {sorted(PROFILES)}")
+
+    settings = PROFILES[profile]
+    db_path = os.path.abspath(db_path or DB_PATH)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+    options = dict(settings['pool'])
+    options.update(engine_options)
+    engine = create_engine(f"sqlite:///{db_path}", **options)
+    event.listen(engine, 'connect', _pragma_listener(settings['pragmas']))
+    return engine
+
+def get_engine(profile=DEFAULT_PROFILE, db_path=None):
+    """Return the shared, pooled engine for a profile and database file.
+
+    The first writable engine for a file brings an older schema up to date
+    (see lib/db/migrations.py). With MUSIC_SQL_PROFILE set, its statements
+    are timed (see lib/db/instrumentation.py).
+    """
+    # Imported here: migrations need the models, whose base imports this module
+    from lib.db.migrations import migrate
+
+    key = (profile, os.path.abspath(db_path or DB_PATH))
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = create_db_engine(profile, key[1])
+                if profile != 'read-only':
+                    migrate(engine)
+                instrument_from_environment(engine)
+                _engines[key] = engine
+    return engine
+
+def raw_connection(profile=DEFAULT_PROFILE, db_path=None):
+    """Check out a pooled sqlite3 connection for code that works with raw SQL.
+
+    The connection carries the profile's pragmas. close() returns it to the
+    pool instead of closing the file.
+    """
+    return get_engine(profile, db_path).raw_connection()
+
+def dispose_engines(db_path=None):
+    """Close every pooled connection, for all databases or just one file.
+
+    Call this before deleting or replacing a database file.
+    """
+    with _engines_lock:
+        for key in list(_engines):
+            if db_path is None or key[1] == os.path.abspath(db_path):
+                _engines.pop(key).dispose()
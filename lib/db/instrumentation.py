@@ -0,0 +1,349 @@
+"""Opt-in per-statement SQL timing, attributed to the helper that ran it.
+
+instrument(engine) hooks the engine's before/after cursor execute events;
+every statement is then recorded in query_profile under its fingerprint
+(the SQL with literals and IN lists collapsed, so calls differing only in
+arguments aggregate together), with its duration, the rows it changed and
+the lib.helpers function it came from. Nothing is attached, and nothing
+costs anything, until instrument() or log_slow_queries() is called.
+
+Set MUSIC_SQL_PROFILE=1 to instrument the shared engines from startup, or
+MUSIC_SQL_PROFILE=<file.json> to also dump the profile there on exit.
+
+log_slow_queries(engine) (or MUSIC_SLOW_QUERY_MS=<threshold>) keeps a
+persistent log of statements slower than a threshold instead, for
+lib/debug.py to replay under EXPLAIN QUERY PLAN:
+
+    MUSIC_SQL_PROFILE=profile.json python run.py
+    MUSIC_SLOW_QUERY_MS=50 python lib/server.py
+"""
+
+import datetime
+import heapq
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import weakref
+
+from sqlalchemy import event
+
+PROFILE_ENV = 'MUSIC_SQL_PROFILE'
+SLOW_QUERY_MS_ENV = 'MUSIC_SLOW_QUERY_MS'
+SLOW_QUERY_LOG_ENV = 'MUSIC_SLOW_QUERY_LOG'
+
+# Slow-query log defaults: next to the database, statements over 100 ms
+DEFAULT_SLOW_QUERY_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slow_queries.log')
+DEFAULT_SLOW_QUERY_SECONDS = 0.1
+
+# The log is rotated to <path>.1 past this size
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Durations kept per fingerprint for percentiles (reservoir sampled beyond this)
+MAX_SAMPLES = 1000
+
+# Slowest single executions kept
+SLOWEST_KEPT = 50
+
+# Statements from this module are attributed to the public function running them
+HELPERS_MODULE = 'lib.helpers'
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(statement):
+    """The statement with literals replaced by ? and IN lists collapsed"""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _IN_LIST.sub('IN (...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+def calling_helper():
+    """Name of the outermost lib.helpers function on the stack.
+
+    Statements issued outside the helpers are attributed to the first
+    caller outside SQLAlchemy, as module.function.
+    """
+    helper = None
+    caller = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        name = frame.f_code.co_name
+        if module == HELPERS_MODULE and not name.startswith(('_', '<')):
+            helper = name
+        elif caller is None and helper is None and not module.startswith(('sqlalchemy', __name__)):
+            caller = f"{module}.{name}"
+        frame = frame.f_back
+    return helper or caller or 'unknown'
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+class _Timings:
+    """Count, total and a bounded sample of durations"""
+
+    __slots__ = ('count', 'total', 'max', 'rows', 'samples', 'breakdown')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = []
+        self.breakdown = {}  # helper (or statement) -> executions
+
+    def add(self, duration, rows, source, rng):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if rows > 0:
+            self.rows += rows
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(duration)
+        else:
+            slot = rng.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = duration
+        self.breakdown[source] = self.breakdown.get(source, 0) + 1
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': percentile(ordered, 0.50),
+            'p95': percentile(ordered, 0.95),
+            'p99': percentile(ordered, 0.99),
+            'max': self.max,
+            'rows': self.rows,
+        }
+
+class QueryProfile:
+    """Aggregated statement timings by fingerprint and by helper. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._sequence = itertools.count()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._statements = {}
+            self._helpers = {}
+            self._slowest = []  # min-heap of (duration, sequence, fingerprint, helper)
+            self.started = time.time()
+
+    def record(self, statement, duration, rows, helper, executemany=False):
+        key = fingerprint(statement)
+        if executemany:
+            key = f"{key} -- executemany"
+        with self._lock:
+            timings = self._statements.get(key)
+            if timings is None:
+                timings = self._statements[key] = _Timings()
+            timings.add(duration, rows, helper, self._rng)
+
+            timings = self._helpers.get(helper)
+            if timings is None:
+                timings = self._helpers[helper] = _Timings()
+            timings.add(duration, rows, key, self._rng)
+
+            entry = (duration, next(self._sequence), key, helper)
+            if len(self._slowest) < SLOWEST_KEPT:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def report(self, top=None):
+        """Return the profile as a dictionary, each list sorted by total time.
+
+        top limits the statement, helper and slowest-execution lists.
+        """
+        with self._lock:
+            statements = [
+                dict(timings.summary(), statement=key, helpers=dict(timings.breakdown))
+                for key, timings in self._statements.items()
+            ]
+            helpers = [
+                dict(timings.summary(), helper=name, statements=len(timings.breakdown))
+                for name, timings in self._helpers.items()
+            ]
+            slowest = [
+                {'seconds': duration, 'statement': key, 'helper': helper}
+                for duration, _, key, helper in sorted(self._slowest, reverse=True)
+            ]
+            started = self.started
+
+        statements.sort(key=lambda entry: entry['total'], reverse=True)
+        helpers.sort(key=lambda entry: entry['total'], reverse=True)
+        return {
+            'started': datetime.datetime.fromtimestamp(started, datetime.timezone.utc).isoformat(timespec='seconds'),
+            'executions': sum(entry['count'] for entry in statements),
+            'seconds': sum(entry['total'] for entry in statements),
+            'statements': statements[:top],
+            'helpers': helpers[:top],
+            'slowest': slowest[:top],
+        }
+
+    def dump(self, path, top=None):
+        """Write report() to path as JSON"""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(top), file, indent=2)
+            file.write('\n')
+        return path
+
+class SlowQueryLog:
+    """Appends statements slower than a threshold to a file, one JSON object per line.
+
+    Each line has the time, duration, calling helper, the statement as run
+    and how many parameters it took; parameter values are never written,
+    so the log is safe to collect from production. The file is rotated to
+    <path>.1 when it passes SLOW_QUERY_LOG_MAX_BYTES.
+    """
+
+    def __init__(self, path=None, threshold=DEFAULT_SLOW_QUERY_SECONDS):
+        self.path = os.path.abspath(path or DEFAULT_SLOW_QUERY_LOG)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+    def write(self, statement, parameters, duration, helper, executemany=False):
+        entry = {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'ms': round(duration * 1000, 3),
+            'helper': helper,
+            'statement': statement,
+            'parameters': None if executemany or parameters is None else len(parameters),
+            'executemany': executemany,
+        }
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) > SLOW_QUERY_LOG_MAX_BYTES:
+                    os.replace(self.path, self.path + '.1')
+            except OSError:
+                pass
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+
+def read_slow_query_log(path=None):
+    """Yield the entries of a slow-query log, skipping lines that do not parse"""
+    with open(path or DEFAULT_SLOW_QUERY_LOG, encoding='utf-8') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get('statement'):
+                yield entry
+
+# The process-wide profile every instrumented engine records into
+query_profile = QueryProfile()
+
+# What each hooked engine records: {'profile': bool, 'slow_log': SlowQueryLog or None}
+_hooks = weakref.WeakKeyDictionary()
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - connection.info['query_start_time'].pop()
+    hooks = _hooks.get(connection.engine)
+    if not hooks:
+        return
+    slow_log = hooks['slow_log']
+    slow = slow_log is not None and duration >= slow_log.threshold
+    if not hooks['profile'] and not slow:
+        return
+    helper = calling_helper()
+    if hooks['profile']:
+        # sqlite3 reports -1 for SELECTs, so rows counts changed rows only
+        query_profile.record(statement, duration, cursor.rowcount, helper, executemany)
+    if slow:
+        slow_log.write(statement, parameters, duration, helper, executemany)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    starts = exception_context.connection.info.get('query_start_time') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+def _update_hooks(engine, **changes):
+    """Change what engine records, attaching or removing the listeners as needed"""
+    hooks = _hooks.get(engine) or {'profile': False, 'slow_log': None}
+    hooks.update(changes)
+    attached = event.contains(engine, 'after_cursor_execute', _after_cursor_execute)
+    if hooks['profile'] or hooks['slow_log']:
+        _hooks[engine] = hooks
+        if not attached:
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+    else:
+        _hooks.pop(engine, None)
+        if attached:
+            event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.remove(engine, 'handle_error', _handle_error)
+
+def is_instrumented(engine):
+    return bool(_hooks.get(engine, {}).get('profile'))
+
+def instrument(engine):
+    """Start recording every statement engine runs into query_profile"""
+    _update_hooks(engine, profile=True)
+    return query_profile
+
+def uninstrument(engine):
+    """Stop recording engine's statements; the profile so far is kept"""
+    _update_hooks(engine, profile=False)
+
+def log_slow_queries(engine, path=None, threshold=DEFAULT_SLOW_QUERY_SECONDS):
+    """Append engine's statements slower than threshold seconds to a log file"""
+    slow_log = SlowQueryLog(path, threshold)
+    _update_hooks(engine, slow_log=slow_log)
+    return slow_log
+
+def stop_logging_slow_queries(engine):
+    _update_hooks(engine, slow_log=None)
+
+_dump_registered = False
+
+def _enabled(setting):
+    return setting.lower() not in ('', '0', 'false', 'no', 'off')
+
+def instrument_from_environment(engine):
+    """Apply MUSIC_SQL_PROFILE and MUSIC_SLOW_QUERY_MS to a new engine.
+
+    MUSIC_SQL_PROFILE instruments it (dumping on exit if the value is a
+    .json path); MUSIC_SLOW_QUERY_MS logs statements slower than that many
+    milliseconds to MUSIC_SLOW_QUERY_LOG.
+    """
+    global _dump_registered
+    setting = os.environ.get(PROFILE_ENV, '')
+    if _enabled(setting):
+        instrument(engine)
+        if setting.lower().endswith('.json') and not _dump_registered:
+            import atexit
+            atexit.register(query_profile.dump, setting)
+            _dump_registered = True
+
+    # 0 logs every statement
+    threshold = os.environ.get(SLOW_QUERY_MS_ENV, '').strip()
+    if threshold:
+        try:
+            log_slow_queries(engine, os.environ.get(SLOW_QUERY_LOG_ENV), float(threshold) / 1000)
+        except ValueError:
+            print(f"Ignoring {SLOW_QUERY_MS_ENV}={threshold!r}: expected a number of milliseconds", file=sys.stderr)
@@ -0,0 +1,130 @@
+import os
+import sys
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from lib.models.models import POSITION_GAP
+
+# Schema migrations for existing databases, tracked in PRAGMA user_version.
+# Each entry is (version, description, statements). Fresh databases built by
+# setup.py or init_db already contain every change and are stamped with
+# SCHEMA_VERSION, so only older files run these.
+MIGRATIONS = [
+    (1, "foreign-key and ordering indexes", [
+        "CREATE INDEX IF NOT EXISTS ix_songs_artist_id ON songs (artist_id)",
+        "CREATE INDEX IF NOT EXISTS ix_songs_album_id ON songs (album_id)",
+        "CREATE INDEX IF NOT EXISTS ix_songs_genre_id ON songs (genre_id)",
+        "CREATE INDEX IF NOT EXISTS ix_albums_artist_id ON albums (artist_id)",
+        "CREATE INDEX IF NOT EXISTS ix_playlists_user_id ON playlists (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_playlist_songs_playlist_position ON playlist_songs (playlist_id, position)",
+        "CREATE INDEX IF NOT EXISTS ix_playlist_songs_song_id ON playlist_songs (song_id)",
+    ]),
+    (2, "unique song per playlist", [
+        # Keep the earliest copy of any song listed twice in one playlist
+        """
+        DELETE FROM playlist_songs WHERE id NOT IN (
+            SELECT MIN(id) FROM playlist_songs GROUP BY playlist_id, song_id
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_playlist_songs_playlist_song ON playlist_songs (playlist_id, song_id)",
+    ]),
+    (3, "sparse playlist positions", [
+        # Renumber every playlist POSITION_GAP, 2 * POSITION_GAP, ... keeping
+        # the current order, with the same spacing the helpers insert at
+        f"""
+        UPDATE playlist_songs SET position = ranked.rank * {POSITION_GAP}
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY playlist_id ORDER BY position, id) AS rank
+            FROM playlist_songs
+        ) AS ranked
+        WHERE playlist_songs.id = ranked.id
+        """,
+    ]),
+    (4, "media scan manifest", [
+        """
+        CREATE TABLE IF NOT EXISTS media_files (
+            path VARCHAR(1024) NOT NULL PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            song_id INTEGER REFERENCES songs (id)
+        )
+        """,
+    ]),
+    (5, "audio seek index", [
+        """
+        CREATE TABLE IF NOT EXISTS seek_indexes (
+            song_id INTEGER NOT NULL PRIMARY KEY REFERENCES songs (id),
+            format VARCHAR(8) NOT NULL,
+            file_size INTEGER NOT NULL,
+            duration FLOAT NOT NULL,
+            audio_end INTEGER NOT NULL,
+            times BLOB NOT NULL,
+            offsets BLOB NOT NULL
+        )
+        """,
+    ]),
+    (6, "media content hashes", [
+        "ALTER TABLE media_files ADD COLUMN prehash VARCHAR(32)",
+        "ALTER TABLE media_files ADD COLUMN content_hash VARCHAR(64)",
+        "CREATE INDEX IF NOT EXISTS ix_media_files_content_hash ON media_files (content_hash)",
+    ]),
+    (7, "song cover images", [
+        "ALTER TABLE songs ADD COLUMN cover_image VARCHAR(255)",
+    ]),
+    (8, "seek table mtimes", [
+        # Tables stored before this have none and are rebuilt on next use
+        "ALTER TABLE seek_indexes ADD COLUMN mtime_ns INTEGER",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(connection):
+    """Read the schema version stored in the database file"""
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+def stamp_schema_version(connection, version=SCHEMA_VERSION):
+    """Record that the database schema is at version"""
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+def has_catalog_tables(connection):
+    """Check whether the database already contains the application tables"""
+    row = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'songs'"
+    ).first()
+    return row is not None
+
+def migrate(engine, verbose=False):
+    """Apply every migration newer than the database's schema version.
+
+    Empty databases are left alone; whoever creates the tables stamps the
+    version. Returns the list of versions applied.
+    """
+    applied = []
+    with engine.begin() as connection:
+        if not has_catalog_tables(connection):
+            return applied
+
+        current = get_schema_version(connection)
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            if verbose:
+                print(f"Applying migration {version}: {description}")
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+            stamp_schema_version(connection, version)
+            applied.append(version)
+    return applied
+
+if __name__ == "__main__":
+    from lib.db.engine import DB_PATH, create_db_engine
+
+    print(f"Database location: {DB_PATH}")
+    applied = migrate(create_db_engine(), verbose=True)
+    if applied:
+        print(f"Database migrated to schema version {applied[-1]}.")
+    else:
+        print("Database schema is up to date.")
@@ -2,8 +2,11 @@
 
 import os
 import sys
-import sqlite3
 import hashlib
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
@@ -23,6 +26,8 @@ else:
     sys.path.insert(0, project_root)
     lib_dir = os.path.join(project_root, 'lib')
 
+from lib.search import FTS_TABLE
+
 print(f"Script location: {script_dir}")
 print(f"Project root: {project_root}")
 print(f"Lib directory: {lib_dir}")
@@ -64,6 +69,21 @@ else:
     DB_PATH = os.path.join(DB_DIR, 'music_streaming.db')
     DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+def raw_connection(profile, db_path):
+    """A pooled connection from lib/db/engine.py with the profile's pragmas.
+
+    Imported here, not at the top: without a working SQLAlchemy the script
+    must still start, so the SQLAlchemy Import check can report why. The
+    other checks then fall back to plain sqlite3 (read-only for 'read-only').
+    """
+    try:
+        from lib.db.engine import raw_connection as pooled_connection
+    except Exception:
+        if profile == 'read-only':
+            return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        return sqlite3.connect(db_path)
+    return pooled_connection(profile, db_path)
+
 def print_header(title):
     """Print a formatted header"""
     print("\n" + "=" * 60)
@@ -155,7 +175,7 @@ def check_paths_and_find_database():
             print(f"   {db_file}")
             # Check if it's our music streaming database
             try:
-                conn = sqlite3.connect(db_file)
+                conn = raw_connection('read-only', db_file)
                 cursor = conn.cursor()
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
                 if cursor.fetchone():
@@ -215,20 +235,22 @@ def check_database_connection():
         return False
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = raw_connection('read-only', DB_PATH)
         cursor = conn.cursor()
         
         # Test basic query
         cursor.execute("SELECT sqlite_version()")
         version = cursor.fetchone()[0]
         print(f" SQLite version: {version}")
+        conn.close()
         
-        # Check if we can create a temporary table
-        cursor.execute("CREATE TEMPORARY TABLE test_table (id INTEGER)")
-        cursor.execute("DROP TABLE test_table")
+        # Check write access without writing: a check must not migrate the
+        # database or change its journal mode. SQLite also needs to create
+        # its journal files next to the database.
+        if not os.access(DB_PATH, os.W_OK) or not os.access(os.path.dirname(os.path.abspath(DB_PATH)), os.W_OK):
+            print(" Database is not writable")
+            return False
         print(" Database is writable")
-        
-        conn.close()
         return True
         
     except Exception as e:
@@ -245,7 +267,7 @@ def check_table_structure():
         return False
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = raw_connection('read-only', DB_PATH)
         cursor = conn.cursor()
         
         # Get all tables
@@ -302,7 +324,7 @@ def check_data_integrity():
         return False
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = raw_connection('read-only', DB_PATH)
         cursor = conn.cursor()
         
         # Check users table
@@ -394,7 +416,7 @@ def test_authentication():
         return False
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = raw_connection('read-only', DB_PATH)
         cursor = conn.cursor()
         
         # Test users
@@ -491,15 +513,16 @@ def test_sqlalchemy_import():
         
         # Test database session creation
         print("\nTesting database session...")
-        session = get_db_session()
-        print(" Database session created")
-        
-        # Test a simple query
-        users = session.query(User).all()
-        print(f" Found {len(users)} users via SQLAlchemy")
-        
-        session.close()
-        print(" Session closed successfully")
+        with inspection_helpers():
+            session = get_db_session()
+            print(" Database session created")
+            
+            # Test a simple query
+            users = session.query(User).all()
+            print(f" Found {len(users)} users via SQLAlchemy")
+            
+            session.close()
+            print(" Session closed successfully")
         
         return True
         
@@ -537,36 +560,40 @@ def test_helper_functions():
                 )
                 print(" Imported from helpers with lib path")
         
-        # Test login
-        print_section("Testing login function")
-        success, result = login_user("Winnie", "MARINE")
-        if success:
-            print(" Login successful")
-            print(f"User data: {result}")
-        else:
-            print(f" Login failed: {result}")
-        
-        # Test get all songs
-        print_section("Testing get_all_songs")
-        songs = get_all_songs()
-        print(f" Found {len(songs)} songs")
-        if songs:
-            print("Sample song:")
-            print(f"  {songs[0]}")
-        
-        # Test get all artists
-        print_section("Testing get_all_artists")
-        artists = get_all_artists()
-        print(f" Found {len(artists)} artists")
-        if artists:
-            print("Sample artist:")
-            print(f"  {artists[0]}")
-        
-        # Test search
-        print_section("Testing search_songs")
-        search_results = search_songs("Satan")
-        print(f" Search for 'Satan' returned {len(search_results)} results")
-        
+        with inspection_helpers() as engine:
+            # Test login
+            print_section("Testing login function")
+            success, result = login_user("Winnie", "MARINE")
+            if success:
+                print(" Login successful")
+                print(f"User data: {result}")
+            else:
+                print(f" Login failed: {result}")
+            
+            # Test get all songs
+            print_section("Testing get_all_songs")
+            songs = get_all_songs()
+            print(f" Found {len(songs)} songs")
+            if songs:
+                print("Sample song:")
+                print(f"  {songs[0]}")
+            
+            # Test get all artists
+            print_section("Testing get_all_artists")
+            artists = get_all_artists()
+            print(f" Found {len(artists)} artists")
+            if artists:
+                print("Sample artist:")
+                print(f"  {artists[0]}")
+            
+            # Test search; building a missing index is a write
+            print_section("Testing search_songs")
+            if has_search_index(engine):
+                search_results = search_songs("Satan")
+                print(f" Search for 'Satan' returned {len(search_results)} results")
+            else:
+                print(" Skipped: the search index is built on the first search")
+            
         return True
         
     except Exception as e:
@@ -585,7 +612,7 @@ def show_detailed_song_info():
         return False
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = raw_connection('read-only', DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -626,6 +653,476 @@ def show_detailed_song_info():
         print(f" Detailed song info failed: {str(e)}")
         return False
 
+def find_table_scans(plan_rows):
+    """Return the EXPLAIN QUERY PLAN steps that read a whole table without an index"""
+    scans = []
+    for row in plan_rows:
+        detail = row[-1]
+        if detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE" not in detail:
+            scans.append(detail)
+    return scans
+
+# Clauses whose conditions could use an index: everything after ON or WHERE
+# up to the next clause keyword
+CONDITION_CLAUSE = re.compile(
+    r"\b(?:ON|WHERE)\b(.*?)(?=\b(?:LEFT|RIGHT|INNER|CROSS|JOIN|WHERE|GROUP|ORDER|LIMIT|HAVING|UNION)\b|$)",
+    re.IGNORECASE | re.DOTALL
+)
+ORDER_CLAUSE = re.compile(r"\bORDER\s+BY\b(.*?)(?=\b(?:LIMIT|UNION)\b|\)|$)", re.IGNORECASE | re.DOTALL)
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+NOT_AN_ALIAS = {
+    'on', 'where', 'join', 'left', 'right', 'inner', 'cross', 'group', 'order', 'limit',
+    'set', 'values', 'using', 'select', 'union', 'having', 'as'
+}
+EQUALITY_OPERATORS = ('=', 'IN', 'IS')
+
+def table_aliases(statement):
+    """Map every table name and alias in a statement to its table"""
+    aliases = {}
+    for table, alias in TABLE_REFERENCE.findall(statement):
+        aliases[table] = table
+        if alias and alias.lower() not in NOT_AN_ALIAS:
+            aliases[alias] = table
+    return aliases
+
+def column_references(text, names, single_table):
+    """(column, operator) pairs in text comparing a column of names to a value.
+
+    Only comparisons with parameters and literals count: join keys do not
+    help a table that is scanned as the outer loop. Unqualified columns
+    count too when the statement reads a single table.
+    """
+    if not names:
+        return []
+    qualifier = rf"(?:{'|'.join(map(re.escape, names))})\."
+    prefix = rf"(?:{qualifier})?" if single_table else qualifier
+    operator = r"(=|<=|>=|<>|!=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b|\bIS\b)"
+    value = r"(?:\?|:\w|'|-?\d|\(|NULL\b|NOT\s+NULL\b)"
+    references = [
+        (column, op.upper())
+        for column, op in re.findall(rf"(?<![\w.]){prefix}(\w+)\s*{operator}\s*(?={value})", text, re.IGNORECASE)
+    ]
+    # The value on the left, e.g. ? < s.duration
+    references += [
+        (column, '=' if op == '=' else '<')
+        for op, column in re.findall(rf"(?:\?|-?\d+(?:\.\d+)?)\s*(=|<=|>=|<|>)\s*{qualifier}(\w+)", text)
+    ]
+    return references
+
+def suggest_index(cursor, statement, table, for_order=False):
+    """Suggest an index on table for a statement, or explain why there is none.
+
+    A heuristic: columns of table compared for equality in ON/WHERE come
+    first, then either the ORDER BY columns (for a temp B-tree) or one
+    range-compared column. Returns a line of advice.
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = {row[1]: row[5] for row in cursor.fetchall()}  # name -> primary key position
+    if not columns:
+        return f"{table} is not a table in this database"
+    aliases = table_aliases(statement)
+    names = [name for name, target in aliases.items() if target == table]
+    single_table = len(set(aliases.values())) == 1
+    
+    conditions = ' '.join(CONDITION_CLAUSE.findall(statement))
+    equality, ranges = [], []
+    for column, op in column_references(conditions, names, single_table):
+        if column not in columns or columns[column]:
+            continue
+        target = equality if op in EQUALITY_OPERATORS else ranges
+        if column not in equality and column not in target:
+            target.append(column)
+    
+    suggested = list(equality)
+    if for_order:
+        order = ' '.join(ORDER_CLAUSE.findall(statement))
+        ordered = [
+            column for column in re.findall(r"(?<![\w])(?:\w+\.)?(\w+)", order)
+            if column in columns and column not in suggested
+            and (single_table or re.search(rf"(?:{'|'.join(names)})\.{column}\b", order))
+        ]
+        suggested += ordered
+    elif ranges:
+        suggested.append(ranges[0])
+    if not suggested:
+        return f"no indexable condition on {table} found; the scan may be inherent to the query"
+    
+    cursor.execute(f"PRAGMA index_list({table})")
+    for index in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"PRAGMA index_info({index})")
+        indexed = [row[2] for row in sorted(cursor.fetchall())]
+        if indexed[:len(suggested)] == suggested:
+            return (f"{index} already covers ({', '.join(suggested)}) but was not used; "
+                    f"try ANALYZE, or check for functions or casts on the column")
+    return f"CREATE INDEX ix_{table}_{'_'.join(suggested)} ON {table} ({', '.join(suggested)})"
+
+def explain_statement(cursor, statement, parameter_count=0):
+    """EXPLAIN QUERY PLAN a statement with NULL parameters.
+
+    Returns (plan details, problems, index suggestions). Problems are full
+    table scans and temp B-trees.
+    """
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", (None,) * (parameter_count or 0))
+    plan = cursor.fetchall()
+    aliases = table_aliases(statement)
+    problems, suggestions = [], []
+    
+    for detail in find_table_scans(plan):
+        problems.append(f"TABLE SCAN: {detail}")
+        words = detail.split()
+        name = words[2] if len(words) > 2 and words[1] == "TABLE" else words[1]
+        if "AS" in words:
+            name = words[words.index("AS") + 1]
+        if name in aliases and not aliases[name].startswith("sqlite_"):
+            suggestions.append(suggest_index(cursor, statement, aliases[name]))
+    
+    for row in plan:
+        if row[-1].startswith("USE TEMP B-TREE"):
+            problems.append(f"TEMP B-TREE: {row[-1]}")
+            if "ORDER BY" in row[-1]:
+                order = ' '.join(ORDER_CLAUSE.findall(statement))
+                tables = {aliases[name] for name in re.findall(r"(\w+)\.\w+", order) if name in aliases}
+                if not tables and len(set(aliases.values())) == 1:
+                    tables = set(aliases.values())
+                for table in sorted(tables):
+                    suggestions.append(suggest_index(cursor, statement, table, for_order=True))
+    
+    # Drop an index whose columns lead another suggestion on the same table
+    indexes = [(line, re.match(r"CREATE INDEX \w+ ON (\w+) \((.*)\)$", line)) for line in dict.fromkeys(suggestions)]
+    suggestions = [
+        line for line, match in indexes
+        if not match or not any(
+            other is not match and other.group(1) == match.group(1)
+            and other.group(2).startswith(match.group(2) + ", ")
+            for _, other in indexes if other
+        )
+    ]
+    return [row[-1] for row in plan], problems, suggestions
+
+@contextmanager
+def read_only_helpers():
+    """Run lib.helpers on the read-only engine for the duration of a check.
+
+    The helpers' default engine migrates the database and switches it to
+    WAL on first use, which an inspection tool must never do.
+    """
+    from lib import helpers
+    from lib.db.engine import get_engine
+    
+    previous = helpers.SessionLocal.kw.get('bind')
+    engine = get_engine('read-only', DB_PATH)
+    helpers.SessionLocal.configure(bind=engine)
+    try:
+        yield engine
+    finally:
+        helpers.SessionLocal.configure(bind=previous)
+
+@contextmanager
+def scratch_copy_helpers():
+    """Run lib.helpers on a migrated copy of the database for a check.
+
+    For a database whose schema is older than the models: the helpers cannot
+    query it as it is, and migrating it is not a check's job.
+    """
+    import tempfile
+    from lib import helpers
+    from lib.cache import catalog_cache
+    from lib.db.engine import dispose_engines, get_engine
+    from lib.search import ensure_search_index
+    
+    previous = helpers.SessionLocal.kw.get('bind')
+    with tempfile.TemporaryDirectory() as directory:
+        copy_path = os.path.join(directory, os.path.basename(DB_PATH))
+        source = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+        target = sqlite3.connect(copy_path)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        
+        engine = get_engine(db_path=copy_path)
+        helpers.SessionLocal.configure(bind=engine)
+        try:
+            # Built here so search is checked too, as the app would build it
+            ensure_search_index(engine)
+            yield engine
+        finally:
+            helpers.SessionLocal.configure(bind=previous)
+            catalog_cache.clear()
+            dispose_engines(copy_path)
+
+@contextmanager
+def inspection_helpers():
+    """Run lib.helpers for a check without changing the database.
+
+    The helpers' default engine would migrate it and switch it to WAL, so
+    they run read-only, or on a migrated copy when the schema is older than
+    the models. Yields the engine the helpers are bound to.
+    """
+    from lib.db.migrations import SCHEMA_VERSION
+    
+    version = schema_version()
+    if version >= SCHEMA_VERSION:
+        with read_only_helpers() as engine:
+            yield engine
+        return
+    print(f" Schema version {version} of {SCHEMA_VERSION}: checking a migrated copy")
+    with scratch_copy_helpers() as engine:
+        yield engine
+
+def has_search_index(engine):
+    """Whether the full-text search index has been built yet"""
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first() is not None
+
+def schema_version():
+    """The database's PRAGMA user_version, read without migrating it"""
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def helper_calls(cursor):
+    """Read-only helper calls with real IDs, for the query checks.
+
+    Returns (helper name, function, arguments, whether a full scan is expected).
+    """
+    from lib import helpers
+    
+    def first_id(table):
+        cursor.execute(f"SELECT MIN(id) FROM {table}")
+        return cursor.fetchone()[0] or 1
+    
+    artist_id = first_id("artists")
+    genre_id = first_id("genres")
+    user_id = first_id("users")
+    playlist_id = first_id("playlists")
+    
+    # The first search builds the full-text index, which is a write
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,))
+    searches = [("search_songs", helpers.search_songs, ("a",), False)] if cursor.fetchone() else []
+    
+    return [
+        ("login_user", helpers.login_user, ("admin", "admin123"), False),
+        ("get_user_by_id", helpers.get_user_by_id, (user_id,), False),
+        *searches,
+        ("get_all_songs", helpers.get_all_songs, (), True),
+        ("get_all_songs_page", helpers.get_all_songs_page, (None, 20), True),
+        ("get_all_artists", helpers.get_all_artists, (), True),
+        ("get_artist_songs", helpers.get_artist_songs, (artist_id,), False),
+        ("get_all_genres", helpers.get_all_genres, (), True),
+        ("get_songs_by_genre", helpers.get_songs_by_genre, (genre_id,), False),
+        ("get_user_playlists", helpers.get_user_playlists, (user_id,), False),
+        ("get_playlist_songs", helpers.get_playlist_songs, (playlist_id,), False),
+    ]
+
+def check_query_plans():
+    """Run EXPLAIN QUERY PLAN over each helper's queries and flag table scans"""
+    print_header("QUERY PLAN CHECK")
+    
+    if not os.path.exists(DB_PATH):
+        print(f" Database file not found: {DB_PATH}")
+        print("Please run 'python setup.py' first to create the database.")
+        return False
+    
+    try:
+        from sqlalchemy import event
+        from lib.cache import catalog_cache
+        
+        unexpected = 0
+        # An old schema is checked on a migrated copy, so the plans use the
+        # indexes the app would have
+        with inspection_helpers() as engine:
+            conn = engine.raw_connection()
+            cursor = conn.cursor()
+            cases = helper_calls(cursor)
+            if not any(name == "search_songs" for name, _, _, _ in cases):
+                print(" search_songs skipped: the search index is built on the first search")
+            
+            for name, func, args, scan_expected in cases:
+                statements = []
+                
+                def capture(connection, dbapi_cursor, statement, parameters, context, executemany):
+                    if statement.lstrip().upper().startswith("SELECT") and "sqlite_master" not in statement:
+                        statements.append((statement, parameters))
+                
+                catalog_cache.clear()
+                event.listen(engine, "before_cursor_execute", capture)
+                try:
+                    func(*args)
+                finally:
+                    event.remove(engine, "before_cursor_execute", capture)
+                
+                print_section(name)
+                for statement, parameters in statements:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                    plan = cursor.fetchall()
+                    for row in plan:
+                        print(f"  {row[-1]}")
+                    
+                    scans = find_table_scans(plan)
+                    if scans and scan_expected:
+                        print("  (full scan expected: this helper lists a whole table)")
+                    elif scans:
+                        unexpected += len(scans)
+                        for detail in scans:
+                            print(f"   TABLE SCAN: {detail}")
+            
+            conn.close()
+        
+        print_section("Summary")
+        if unexpected:
+            print(f" {unexpected} unexpected table scan(s) found")
+            return False
+        print(" No unexpected table scans")
+        return True
+        
+    except Exception as e:
+        print(f" Query plan check failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+# Times each helper is called by the SQL profile, for its percentiles
+PROFILE_ROUNDS = 20
+
+# Rows shown per table of the SQL profile
+PROFILE_TOP = 10
+
+def profile_helper_queries(dump_path=None):
+    """Time every statement the helpers run and report the slowest"""
+    print_header("SQL QUERY PROFILE")
+    
+    if not os.path.exists(DB_PATH):
+        print(f" Database file not found: {DB_PATH}")
+        print("Please run 'python setup.py' first to create the database.")
+        return False
+    
+    try:
+        from lib import helpers
+        from lib.cache import catalog_cache
+        
+        with inspection_helpers() as engine:
+            conn = engine.raw_connection()
+            cases = helper_calls(conn.cursor())
+            conn.close()
+            
+            profile = helpers.start_query_profile()
+            try:
+                for name, func, args, _ in cases:
+                    for _ in range(PROFILE_ROUNDS):
+                        catalog_cache.clear()
+                        func(*args)
+            finally:
+                helpers.stop_query_profile()
+        
+        report = profile.report(PROFILE_TOP)
+        print(f"{report['executions']:,} statements in {report['seconds'] * 1000:.1f} ms "
+              f"({PROFILE_ROUNDS} calls of each helper; times cover execution, not fetching rows)")
+        
+        print_section("By helper")
+        print(f"{'helper':<24}{'stmts':>7}{'distinct':>9}{'total ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for entry in report['helpers']:
+            print(f"{entry['helper']:<24}{entry['count']:>7}{entry['statements']:>9}{entry['total'] * 1000:>10.2f}"
+                  f"{entry['p50'] * 1000:>9.3f}{entry['p95'] * 1000:>9.3f}{entry['p99'] * 1000:>9.3f}")
+        
+        print_section(f"Top {PROFILE_TOP} statements by total time")
+        for entry in report['statements']:
+            print(f"{entry['count']:>5} x  total {entry['total'] * 1000:.2f} ms  p50 {entry['p50'] * 1000:.3f}  "
+                  f"p95 {entry['p95'] * 1000:.3f}  p99 {entry['p99'] * 1000:.3f} ms  ({', '.join(entry['helpers'])})")
+            print(f"        {entry['statement'][:160]}")
+        
+        print_section("Slowest executions")
+        for entry in report['slowest']:
+            print(f"{entry['seconds'] * 1000:>8.3f} ms  {entry['helper']:<22} {entry['statement'][:90]}")
+        
+        if dump_path:
+            profile.dump(dump_path)
+            print(f"\n Full profile written to {dump_path}")
+        return True
+        
+    except Exception as e:
+        print(f" SQL profile failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def analyze_slow_queries(log_path=None):
+    """Replay each statement in the slow-query log under EXPLAIN QUERY PLAN"""
+    from lib.db.instrumentation import DEFAULT_SLOW_QUERY_LOG, fingerprint, read_slow_query_log
+    
+    log_path = log_path or os.environ.get('MUSIC_SLOW_QUERY_LOG') or DEFAULT_SLOW_QUERY_LOG
+    print_header("SLOW QUERY ANALYSIS")
+    print(f"Log: {log_path}")
+    
+    if not os.path.exists(log_path):
+        print(" No slow-query log found.")
+        print("Set MUSIC_SLOW_QUERY_MS (e.g. 50) while running the app to record one.")
+        return True
+    if not os.path.exists(DB_PATH):
+        print(f" Database file not found: {DB_PATH}")
+        return False
+    
+    # Statements that differ only in literals are analyzed once
+    groups = {}
+    for entry in read_slow_query_log(log_path):
+        group = groups.setdefault(fingerprint(entry['statement']), {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'helpers': set(), 'entry': entry
+        })
+        group['count'] += 1
+        group['total_ms'] += entry.get('ms', 0.0)
+        group['helpers'].add(entry.get('helper') or 'unknown')
+        if entry.get('ms', 0.0) >= group['max_ms']:
+            group['max_ms'] = entry.get('ms', 0.0)
+            group['entry'] = entry
+    
+    if not groups:
+        print(" The log has no entries.")
+        return True
+    
+    conn = raw_connection('read-only', DB_PATH)
+    cursor = conn.cursor()
+    flagged = 0
+    suggestions = []
+    try:
+        for group in sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True):
+            entry = group['entry']
+            print_section(f"{group['count']} x, max {group['max_ms']:.1f} ms, total {group['total_ms']:.1f} ms "
+                          f"({', '.join(sorted(group['helpers']))})")
+            print(f"  {' '.join(entry['statement'].split())[:300]}")
+            if entry.get('executemany'):
+                print("  (executemany batch: not replayed)")
+                continue
+            if not re.match(r"\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", entry['statement'], re.IGNORECASE):
+                print("  (not a query: not replayed)")
+                continue
+            try:
+                plan, problems, advice = explain_statement(cursor, entry['statement'], entry.get('parameters'))
+            except Exception as e:
+                print(f"  Could not replay: {e}")
+                continue
+            for detail in plan:
+                print(f"    {detail}")
+            for problem in problems:
+                print(f"   {problem}")
+            for line in advice:
+                print(f"   Index advice: {line}")
+            if problems:
+                flagged += 1
+                suggestions.extend(line for line in advice if line.startswith("CREATE INDEX"))
+    finally:
+        conn.close()
+    
+    print_section("Summary")
+    print(f" {len(groups)} distinct slow statement(s), {flagged} with table scans or temp B-trees")
+    for line in dict.fromkeys(suggestions):
+        print(f"   {line};")
+    return True
+
 def execute_custom_query():
     """Execute a custom SQL query"""
     print_header("CUSTOM SQL QUERY")
@@ -636,7 +1133,7 @@ def execute_custom_query():
         return
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = raw_connection('interactive', DB_PATH)
         cursor = conn.cursor()
         
         print("Enter your SQL query (or 'exit' to return):")
@@ -645,16 +1142,26 @@ def execute_custom_query():
         if query.lower() == 'exit':
             return
         
+        if query.lower().startswith('select'):
+            _, problems, advice = explain_statement(cursor, query)
+            for problem in problems:
+                print(f" {problem}")
+            for line in advice:
+                print(f" Index advice: {line}")
+        
+        started = time.perf_counter()
         cursor.execute(query)
         
         if query.lower().startswith('select'):
             results = cursor.fetchall()
-            print(f"\nResults ({len(results)} rows):")
+            elapsed = time.perf_counter() - started
+            print(f"\nResults ({len(results)} rows in {elapsed * 1000:.1f} ms):")
             for row in results:
                 print(row)
         else:
             conn.commit()
-            print(" Query executed successfully")
+            elapsed = time.perf_counter() - started
+            print(f" Query executed successfully in {elapsed * 1000:.1f} ms")
         
         conn.close()
         
@@ -675,7 +1182,8 @@ def run_all_tests():
         ("Authentication", test_authentication),
         ("SQLAlchemy Import", test_sqlalchemy_import),
         ("Helper Functions", test_helper_functions),
-        ("Song Information", show_detailed_song_info)
+        ("Song Information", show_detailed_song_info),
+        ("Query Plans", check_query_plans)
     ]
     
     results = {}
@@ -718,6 +1226,9 @@ def interactive_debug():
         print("6. Show song details")
         print("7. Execute custom SQL query")
         print("8. Check paths and find database")
+        print("9. Check query plans for table scans")
+        print("10. Profile helper SQL statements")
+        print("11. Analyze the slow-query log")
         print("0. Exit")
         
         choice = input("\n🔧 Select option: ").strip()
@@ -741,6 +1252,13 @@ def interactive_debug():
             execute_custom_query()
         elif choice == "8":
             check_paths_and_find_database()
+        elif choice == "9":
+            check_query_plans()
+        elif choice == "10":
+            dump_path = input("Save the full profile as JSON (path, or Enter to skip): ").strip()
+            profile_helper_queries(dump_path or None)
+        elif choice == "11":
+            analyze_slow_queries()
         else:
             print(" Invalid option")
         
@@ -750,6 +1268,12 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--auto":
         # Run all tests automatically
         run_all_tests()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--profile":
+        # Profile the helpers' SQL, optionally saving it: --profile [profile.json]
+        profile_helper_queries(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--slow-queries":
+        # Explain the logged slow statements: --slow-queries [slow_queries.log]
+        analyze_slow_queries(sys.argv[2] if len(sys.argv) > 2 else None)
     else:
         # Interactive mode
         interactive_debug()
\ No newline at end of file
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Find (and optionally merge) media files with identical content.
+
+Works from the media_files manifest kept by lib/scanner.py, in three
+narrowing passes so most files are never read in full:
+
+1. group files by size; a file with a unique size has no duplicate
+2. for same-size files, hash the size plus the first and last
+   PREHASH_BLOCK bytes (the prehash)
+3. for files whose prehashes also collide, hash the whole file through
+   mmap in HASH_BLOCK slices
+
+Both hashes are stored on the manifest row, and the scanner clears them
+when a file's size or mtime changes, so a re-run only reads new or changed
+files. Hashing runs on a process pool for large batches.
+
+    python lib/dedupe.py            # report duplicate files and songs
+    python lib/dedupe.py --merge    # fold duplicate songs into one
+"""
+
+import hashlib
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.scanner import POOL_THRESHOLD, WRITE_BATCH_SIZE
+
+# Bytes read from each end of a file for the prehash
+PREHASH_BLOCK = 64 * 1024
+
+# Bytes fed to the full hash at a time from the mapped file
+HASH_BLOCK = 8 * 1024 * 1024
+
+# Files handed to a worker at a time
+POOL_CHUNK_SIZE = 16
+
+def prehash(path):
+    """Hash of a file's size, first and last PREHASH_BLOCK bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb', buffering=0) as file:
+        size = os.fstat(file.fileno()).st_size
+        digest.update(size.to_bytes(8, 'little'))
+        digest.update(os.pread(file.fileno(), PREHASH_BLOCK, 0))
+        if size > PREHASH_BLOCK:
+            digest.update(os.pread(file.fileno(), PREHASH_BLOCK, max(size - PREHASH_BLOCK, PREHASH_BLOCK)))
+    return digest.hexdigest()
+
+def content_hash(path):
+    """Hash of a file's whole content, read through mmap"""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if hasattr(data, 'madvise'):
+                data.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(data) as view:
+                for offset in range(0, len(data), HASH_BLOCK):
+                    digest.update(view[offset:offset + HASH_BLOCK])
+    return digest.hexdigest()
+
+def hash_file(job):
+    """Hash one file; runs in a worker.
+
+    job is (path, kind) with kind 'prehash' or 'content_hash'. Returns
+    (path, size, mtime_ns, digest, error) with the stat taken before reading,
+    so the caller can tell whether the manifest row still describes the file.
+    """
+    path, kind = job
+    try:
+        stat = os.stat(path)
+        digest = prehash(path) if kind == 'prehash' else content_hash(path)
+    except (OSError, ValueError) as e:
+        return path, None, None, None, str(e)
+    return path, stat.st_size, stat.st_mtime_ns, digest, None
+
+def hash_all(jobs, workers=None):
+    """Yield hash_file() results, on a process pool for large batches"""
+    if len(jobs) < POOL_THRESHOLD or workers == 1:
+        for job in jobs:
+            yield hash_file(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(hash_file, jobs, chunksize=POOL_CHUNK_SIZE)
+
+def _group(rows, key):
+    """Lists of rows sharing a key, keeping only keys with two or more rows"""
+    groups = {}
+    for row in rows:
+        value = key(row)
+        if value is not None:
+            groups.setdefault(value, []).append(row)
+    return [group for group in groups.values() if len(group) > 1]
+
+def _hash_missing(cursor, rows, kind, workers, stats, progress):
+    """Fill in one hash column for the rows that lack it, writing in batches"""
+    slot, counter = (0, 'prehashed') if kind == 'prehash' else (1, 'hashed')
+    missing = [row for row in rows if row['hashes'][slot] is None]
+    if not missing:
+        return
+    by_path = {row['path']: row for row in missing}
+
+    cursor.execute("BEGIN IMMEDIATE")
+    pending = 0
+    for done, (path, size, mtime_ns, digest, error) in enumerate(
+            hash_all([(row['path'], kind) for row in missing], workers), 1):
+        row = by_path[path]
+        if error or (size, mtime_ns) != (row['size'], row['mtime_ns']):
+            # Unreadable, or changed since the last scan: leave it for the next one
+            stats['skipped'] += 1
+            if progress:
+                progress(f"{path}: {error or 'changed since the last scan'}")
+            continue
+        row['hashes'][slot] = digest
+        cursor.execute(
+            f"UPDATE media_files SET {kind} = ? WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (digest, path, size, mtime_ns)
+        )
+        stats['bytes_read'] += min(size, 2 * PREHASH_BLOCK) if kind == 'prehash' else size
+        stats[counter] += 1
+        pending += 1
+        if pending >= WRITE_BATCH_SIZE:
+            cursor.execute("COMMIT")
+            cursor.execute("BEGIN IMMEDIATE")
+            pending = 0
+            if progress:
+                progress(f"{done:,} of {len(missing):,} {kind} values computed")
+    cursor.execute("COMMIT")
+
+def find_duplicates(workers=None, db_path=None, progress=None):
+    """Hash what is needed and return (groups, stats).
+
+    Each group is a list of {'path', 'size', 'song_id'} dictionaries for
+    files with identical content, in path order.
+    """
+    from lib.db.engine import raw_connection
+
+    started = time.perf_counter()
+    stats = {'files': 0, 'candidates': 0, 'prehashed': 0, 'hashed': 0, 'skipped': 0, 'bytes_read': 0}
+
+    connection = raw_connection('bulk-load', db_path)
+    sqlite_connection = connection.driver_connection
+    isolation_level = sqlite_connection.isolation_level
+    # Transactions are managed explicitly, one per write batch
+    sqlite_connection.isolation_level = None
+    try:
+        cursor = sqlite_connection.cursor()
+        rows = [
+            {'path': path, 'size': size, 'mtime_ns': mtime_ns, 'song_id': song_id, 'hashes': [prehash, content]}
+            for path, size, mtime_ns, song_id, prehash, content in cursor.execute(
+                "SELECT path, size, mtime_ns, song_id, prehash, content_hash FROM media_files ORDER BY path"
+            )
+        ]
+        stats['files'] = len(rows)
+
+        same_size = [row for group in _group(rows, lambda row: row['size']) for row in group]
+        stats['candidates'] = len(same_size)
+        _hash_missing(cursor, same_size, 'prehash', workers, stats, progress)
+
+        same_prehash = [
+            row for group in _group(same_size, lambda row: row['hashes'][0] and (row['size'], row['hashes'][0]))
+            for row in group
+        ]
+        _hash_missing(cursor, same_prehash, 'content_hash', workers, stats, progress)
+        cursor.close()
+    except Exception:
+        if sqlite_connection.in_transaction:
+            sqlite_connection.execute("ROLLBACK")
+        raise
+    finally:
+        sqlite_connection.isolation_level = isolation_level
+        connection.close()
+
+    groups = [
+        [{'path': row['path'], 'size': row['size'], 'song_id': row['song_id']} for row in group]
+        for group in _group(same_prehash, lambda row: row['hashes'][1])
+    ]
+    stats['groups'] = len(groups)
+    stats['redundant_files'] = sum(len(group) - 1 for group in groups)
+    stats['redundant_bytes'] = sum(group[0]['size'] * (len(group) - 1) for group in groups)
+    stats['seconds'] = time.perf_counter() - started
+    return groups, stats
+
+def merge_duplicates(groups, db_path=None):
+    """Fold the songs of each duplicate group into its lowest song id.
+
+    Playlist entries move to the kept song (a playlist holding both keeps
+    one entry), the manifest rows point at it, and the other songs and their
+    seek tables are deleted. Files on disk are left alone. Returns the
+    number of songs removed.
+    """
+    from lib.db.engine import raw_connection
+    from lib.helpers import invalidate_catalog_cache
+    from lib.seek import seek_cache
+
+    removed = []
+    connection = raw_connection('bulk-load', db_path)
+    try:
+        cursor = connection.cursor()
+        for group in groups:
+            song_ids = sorted({file['song_id'] for file in group if file['song_id'] is not None})
+            keep = song_ids[0] if song_ids else None
+            for song_id in song_ids[1:]:
+                cursor.execute("UPDATE OR IGNORE playlist_songs SET song_id = ? WHERE song_id = ?", (keep, song_id))
+                cursor.execute("DELETE FROM playlist_songs WHERE song_id = ?", (song_id,))
+                cursor.execute("UPDATE media_files SET song_id = ? WHERE song_id = ?", (keep, song_id))
+                cursor.execute("DELETE FROM seek_indexes WHERE song_id = ?", (song_id,))
+                cursor.execute("DELETE FROM songs WHERE id = ?", (song_id,))
+                removed.append(song_id)
+        connection.commit()
+        cursor.close()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    if removed:
+        invalidate_catalog_cache()
+    for song_id in removed:
+        seek_cache.invalidate('seek_table', song_id)
+    return len(removed)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find media files with identical content")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--merge", action="store_true", help="merge the songs of duplicate files into one")
+    args = parser.parse_args()
+
+    groups, stats = find_duplicates(args.workers, progress=print)
+    print(f"{stats['files']:,} files, {stats['candidates']:,} sharing a size; computed "
+          f"{stats['prehashed']:,} prehashes and {stats['hashed']:,} full hashes "
+          f"({stats['bytes_read'] / 1e6:,.1f} MB read) in {stats['seconds']:.2f}s")
+
+    for group in groups:
+        print(f"\n{len(group)} copies, {group[0]['size'] / 1e6:.1f} MB each:")
+        for file in group:
+            print(f"  {file['path']}  (song {file['song_id']})")
+    print(f"\n{stats['groups']:,} duplicate groups; {stats['redundant_files']:,} redundant files "
+          f"use {stats['redundant_bytes'] / 1e6:,.1f} MB")
+
+    if args.merge:
+        print(f"Merged {merge_duplicates(groups):,} duplicate songs")
@@ -1,21 +1,200 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import and_, bindparam, or_, text
 from sqlalchemy.orm import sessionmaker
-from lib.models.models import User, Song, Artist, Album, Genre, Playlist, PlaylistSong
+from lib.models.models import User, Song, Artist, Album, Genre, Playlist, PlaylistSong, POSITION_GAP
 from lib.models.base import Base
+from lib.records import (
+    SongRecord, PlaylistSongRecord, ArtistRecord, GenreRecord, PlaylistRecord, SongBatch
+)
+from lib.cache import cached, cached_first_page, catalog_cache
+from lib.db.engine import DB_PATH, DATABASE_URL, get_engine
+from lib.db.instrumentation import instrument, query_profile, uninstrument
+from lib.search import (
+    SEARCH_SONGS_SQL, SEARCH_SONGS_FIRST_PAGE_SQL, SEARCH_SONGS_NEXT_PAGE_SQL,
+    build_match_query, ensure_search_index
+)
 import hashlib
 import os
 
-# Database setup
-DB_PATH = os.path.join(os.path.dirname(__file__), 'db', 'music_streaming.db')
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+# Database setup. The session factory is bound to the shared engine on
+# first use rather than at import, so importing the helpers stays cheap;
+# benchmarks and tools may bind it to another engine first.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Rows per page for the *_page listing helpers
+DEFAULT_PAGE_SIZE = 20
+
+# Rows fetched per round trip by the iter_* streaming helpers
+DEFAULT_BATCH_SIZE = 1000
+
+NEXT_PLAYLIST_POSITION_SQL = """
+SELECT COALESCE(MAX(position), 0) + :gap FROM playlist_songs WHERE playlist_id = :playlist_id
+"""
+
+# Positions of the two songs around a 0-based index, skipping songs being moved
+NEIGHBOR_POSITIONS_SQL = """
+SELECT position FROM playlist_songs
+WHERE playlist_id = :playlist_id AND song_id NOT IN :exclude
+ORDER BY position, id
+LIMIT 2 OFFSET :offset
+"""
+
+LAST_POSITION_SQL = """
+SELECT MAX(position) FROM playlist_songs
+WHERE playlist_id = :playlist_id AND song_id NOT IN :exclude
+"""
+
+# Selecting from songs skips unknown song IDs; OR IGNORE skips songs that
+# are already in the playlist (unique playlist_id, song_id index)
+ADD_PLAYLIST_SONG_SQL = """
+INSERT OR IGNORE INTO playlist_songs (playlist_id, song_id, position)
+SELECT :playlist_id, id, :position FROM songs WHERE id = :song_id
+"""
+
+REMOVE_PLAYLIST_SONG_SQL = """
+DELETE FROM playlist_songs WHERE playlist_id = :playlist_id AND song_id = :song_id
+"""
+
+MOVE_PLAYLIST_SONG_SQL = """
+UPDATE playlist_songs SET position = :position
+WHERE playlist_id = :playlist_id AND song_id = :song_id
+"""
+
+REBALANCE_POSITION_SQL = """
+UPDATE playlist_songs SET position = :position WHERE id = :id
+"""
+
+def _engine():
+    """The engine the helpers run on, creating the shared one on first use"""
+    bind = SessionLocal.kw.get('bind')
+    if bind is None:
+        bind = get_engine()
+        SessionLocal.configure(bind=bind)
+    return bind
+
+def __getattr__(name):
+    # helpers.engine, for tools that hook the helpers' engine
+    if name == 'engine':
+        return _engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_db_session():
     """Create and return a new database session"""
+    if SessionLocal.kw.get('bind') is None:
+        _engine()
     return SessionLocal()
 
+def _song_projection(session, *extra_columns):
+    """Query exactly the columns shown in song listings, in a single round trip.
+
+    Artist and album are inner joins (every song has both); genre is optional,
+    so it comes in through an outer join instead of a lazy load per row.
+    """
+    return session.query(
+        Song.id,
+        Song.title,
+        Artist.name.label('artist'),
+        Album.title.label('album'),
+        Genre.name.label('genre'),
+        Song.duration,
+        Song.file_path,
+        *extra_columns
+    ).select_from(Song).join(
+        Artist, Song.artist_id == Artist.id
+    ).join(
+        Album, Song.album_id == Album.id
+    ).outerjoin(
+        Genre, Song.genre_id == Genre.id
+    )
+
+def _song_record(row):
+    """Convert a song projection row to the SongRecord the CLI renders"""
+    return SongRecord(
+        row.id,
+        row.title,
+        row.artist,
+        row.album,
+        row.genre if row.genre else 'Unknown',
+        row.duration,
+        row.file_path
+    )
+
+def _playlist_song_record(row):
+    """Convert a playlist projection row to a PlaylistSongRecord"""
+    return PlaylistSongRecord(
+        row.id,
+        row.title,
+        row.artist,
+        row.album,
+        row.genre if row.genre else 'Unknown',
+        row.duration,
+        row.file_path,
+        row.position
+    )
+
+def _keyset_page(query, key_column, key_name, after, limit, tiebreak=None):
+    """Fetch one page of rows ordered by key_column, starting after a cursor.
+
+    Filtering on the key instead of using OFFSET keeps every page as cheap as
+    the first one, however deep the caller has paged. A key that can repeat
+    needs a unique tiebreak (column, name) pair; the cursor is then a
+    (key, tiebreak) tuple, as for search pages. Returns a (rows, next_cursor)
+    tuple; next_cursor is None on the last page.
+    """
+    order = [key_column]
+    if tiebreak is not None:
+        order.append(tiebreak[0])
+    if after is not None and tiebreak is None:
+        query = query.filter(key_column > after)
+    elif after is not None:
+        after_key, after_tiebreak = after
+        query = query.filter(or_(
+            key_column > after_key, and_(key_column == after_key, tiebreak[0] > after_tiebreak)
+        ))
+    
+    # Fetch one extra row to learn whether another page follows
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if tiebreak is None:
+            return rows, getattr(rows[-1], key_name)
+        return rows, (getattr(rows[-1], key_name), getattr(rows[-1], tiebreak[1]))
+    return rows, None
+
+def _iter_song_records(query, batch_size, convert=_song_record):
+    """Stream records from a projection query, batch_size rows at a time"""
+    for row in query.yield_per(batch_size):
+        yield convert(row)
+
+def invalidate_catalog_cache():
+    """Drop cached catalog listings after songs, artists, albums or genres change.
+
+    Admin edits and bulk imports call this once they commit. Playlist
+    listings are included because they show song, artist and genre names.
+    """
+    for name in ('artists', 'genres', 'artist_songs', 'genre_songs', 'playlist_songs',
+                 'songs_page', 'search_page', 'artist_songs_page', 'genre_songs_page', 'playlist_songs_page'):
+        catalog_cache.invalidate_all(name)
+
+def _playlist_changed(playlist_id):
+    """Drop the cached song list and first pages of one playlist after a write"""
+    catalog_cache.invalidate('playlist_songs', playlist_id)
+    catalog_cache.invalidate_all('playlist_songs_page', playlist_id)
+
+def start_query_profile(reset=True):
+    """Time every statement the helpers run, by helper; returns the profile.
+
+    See lib/db/instrumentation.py. Call query_profile.report() or .dump()
+    for the results.
+    """
+    if reset:
+        query_profile.reset()
+    return instrument(_engine())
+
+def stop_query_profile():
+    """Stop timing helper statements; the profile so far is kept"""
+    uninstrument(_engine())
+    return query_profile
+
 def hash_password(password):
     """Hash a password using SHA-256"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -98,30 +277,66 @@ def get_user_by_id(user_id):
         session.close()
 
 def search_songs(query):
-    """Search for songs by title, artist, or album"""
+    """Search for songs by title, artist, or album, best matches first"""
+    match = build_match_query(query)
+    if not match:
+        return []
+    
+    ensure_search_index(_engine())
     session = get_db_session()
     try:
-        songs = session.query(Song).join(Artist).join(Album).filter(
-            (Song.title.ilike(f'%{query}%')) |
-            (Artist.name.ilike(f'%{query}%')) |
-            (Album.title.ilike(f'%{query}%'))
-        ).all()
-        
-        # Convert to dictionaries
-        song_list = []
-        for song in songs:
-            song_data = {
-                'id': song.id,
-                'title': song.title,
-                'artist': song.artist.name,
-                'album': song.album.title,
-                'genre': song.genre.name if song.genre else 'Unknown',
-                'duration': song.duration,
-                'file_path': song.file_path
-            }
-            song_list.append(song_data)
+        rows = session.execute(text(SEARCH_SONGS_SQL), {'match': match}).all()
         
-        return song_list
+        return [_song_record(row) for row in rows]
+    finally:
+        session.close()
+
+@cached_first_page('search_page')
+def search_songs_page(query, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Get one page of search results, best matches first.
+
+    Pages are keyed on (relevance rank, song ID). Returns a
+    (songs, next_cursor) tuple; next_cursor is None on the last page.
+    """
+    match = build_match_query(query)
+    if not match:
+        return [], None
+    
+    ensure_search_index(_engine())
+    session = get_db_session()
+    try:
+        params = {'match': match, 'limit': limit + 1}
+        if after is None:
+            statement = SEARCH_SONGS_FIRST_PAGE_SQL
+        else:
+            statement = SEARCH_SONGS_NEXT_PAGE_SQL
+            params['after_rank'], params['after_id'] = after
+        rows = session.execute(text(statement), params).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1].rank, rows[-1].id)
+        
+        return [_song_record(row) for row in rows], next_cursor
+    finally:
+        session.close()
+
+def iter_search_songs(query, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every search result, best matches first, fetched in batches"""
+    match = build_match_query(query)
+    if not match:
+        return
+    
+    ensure_search_index(_engine())
+    session = get_db_session()
+    try:
+        result = session.execute(
+            text(SEARCH_SONGS_SQL), {'match': match},
+            execution_options={'yield_per': batch_size}
+        )
+        for row in result:
+            yield _song_record(row)
     finally:
         session.close()
 
@@ -129,84 +344,127 @@ def get_all_songs():
     """Get all songs"""
     session = get_db_session()
     try:
-        songs = session.query(Song).join(Artist).join(Album).all()
-        
-        song_list = []
-        for song in songs:
-            song_data = {
-                'id': song.id,
-                'title': song.title,
-                'artist': song.artist.name,
-                'album': song.album.title,
-                'genre': song.genre.name if song.genre else 'Unknown',
-                'duration': song.duration,
-                'file_path': song.file_path
-            }
-            song_list.append(song_data)
+        rows = _song_projection(session).all()
+        
+        return [_song_record(row) for row in rows]
+    finally:
+        session.close()
+
+@cached_first_page('songs_page')
+def get_all_songs_page(after=None, limit=DEFAULT_PAGE_SIZE):
+    """Get one page of all songs, ordered by song ID.
+
+    Pass the cursor returned with the previous page as `after`. Returns a
+    (songs, next_cursor) tuple; next_cursor is None on the last page.
+    """
+    session = get_db_session()
+    try:
+        rows, next_cursor = _keyset_page(_song_projection(session), Song.id, 'id', after, limit)
         
-        return song_list
+        return [_song_record(row) for row in rows], next_cursor
     finally:
         session.close()
 
+def iter_all_songs(batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every song in the same shape as get_all_songs.
+
+    Rows are fetched from the database in batches, so memory use stays flat
+    however large the catalog is. Meant for exports and batch jobs.
+    """
+    session = get_db_session()
+    try:
+        query = _song_projection(session).order_by(Song.id)
+        yield from _iter_song_records(query, batch_size)
+    finally:
+        session.close()
+
+def iter_all_song_batches(batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every song as column-oriented SongBatch objects of batch_size rows"""
+    session = get_db_session()
+    try:
+        query = _song_projection(session).order_by(Song.id)
+        result = session.execute(query.statement, execution_options={'yield_per': batch_size})
+        for rows in result.partitions():
+            yield SongBatch.from_records(map(_song_record, rows))
+    finally:
+        session.close()
+
+def get_song_file_path(song_id):
+    """Get a song's file_path, or None if the song does not exist"""
+    session = get_db_session()
+    try:
+        return session.query(Song.file_path).filter(Song.id == song_id).scalar()
+    finally:
+        session.close()
+
+def get_song_covers(song_ids):
+    """Map song IDs to their cover_image paths, for songs that have one"""
+    song_ids = list(song_ids)
+    if not song_ids:
+        return {}
+    
+    session = get_db_session()
+    try:
+        rows = session.query(Song.id, Song.cover_image).filter(
+            Song.id.in_(song_ids), Song.cover_image.isnot(None)
+        )
+        return {row.id: row.cover_image for row in rows}
+    finally:
+        session.close()
+
+@cached('artists')
 def get_all_artists():
     """Get all artists"""
     session = get_db_session()
     try:
-        artists = session.query(Artist).all()
-        
-        artist_list = []
-        for artist in artists:
-            artist_data = {
-                'id': artist.id,
-                'name': artist.name,
-                'bio': artist.bio
-            }
-            artist_list.append(artist_data)
+        rows = session.query(Artist.id, Artist.name, Artist.bio).all()
         
-        return artist_list
+        return [ArtistRecord._make(row) for row in rows]
     finally:
         session.close()
 
+@cached('artist_songs')
 def get_artist_songs(artist_id):
     """Get all songs by an artist"""
     session = get_db_session()
     try:
-        songs = session.query(Song).join(Artist).filter(Artist.id == artist_id).all()
-        
-        song_list = []
-        for song in songs:
-            song_data = {
-                'id': song.id,
-                'title': song.title,
-                'artist': song.artist.name,
-                'album': song.album.title,
-                'genre': song.genre.name if song.genre else 'Unknown',
-                'duration': song.duration,
-                'file_path': song.file_path
-            }
-            song_list.append(song_data)
+        rows = _song_projection(session).filter(Song.artist_id == artist_id).all()
+        
+        return [_song_record(row) for row in rows]
+    finally:
+        session.close()
+
+@cached_first_page('artist_songs_page')
+def get_artist_songs_page(artist_id, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Get one page of songs by an artist, ordered by song ID"""
+    session = get_db_session()
+    try:
+        query = _song_projection(session).filter(Song.artist_id == artist_id)
+        rows, next_cursor = _keyset_page(query, Song.id, 'id', after, limit)
         
-        return song_list
+        return [_song_record(row) for row in rows], next_cursor
+    finally:
+        session.close()
+
+def iter_artist_songs(artist_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every song by an artist, fetched in batches"""
+    session = get_db_session()
+    try:
+        query = _song_projection(session).filter(Song.artist_id == artist_id).order_by(Song.id)
+        yield from _iter_song_records(query, batch_size)
     finally:
         session.close()
 
+@cached('user_playlists')
 def get_user_playlists(user_id):
     """Get all playlists for a user"""
     session = get_db_session()
     try:
-        playlists = session.query(Playlist).filter(Playlist.user_id == user_id).all()
-        
-        playlist_list = []
-        for playlist in playlists:
-            playlist_data = {
-                'id': playlist.id,
-                'name': playlist.name,
-                'description': playlist.description,
-                'created_at': playlist.created_at
-            }
-            playlist_list.append(playlist_data)
+        rows = session.query(
+            Playlist.id, Playlist.name, Playlist.description, Playlist.created_at
+        ).filter(Playlist.user_id == user_id).all()
         
-        return playlist_list
+        return [PlaylistRecord._make(row) for row in rows]
     finally:
         session.close()
 
@@ -222,6 +480,7 @@ def create_playlist(user_id, name, description=""):
         
         session.add(playlist)
         session.commit()
+        catalog_cache.invalidate('user_playlists', user_id)
         
         playlist_id = playlist.id
         return True, playlist_id
@@ -232,32 +491,198 @@ def create_playlist(user_id, name, description=""):
     finally:
         session.close()
 
+def _next_playlist_position(session, playlist_id):
+    """Return the position one gap after the last song in a playlist"""
+    return session.execute(
+        text(NEXT_PLAYLIST_POSITION_SQL), {'playlist_id': playlist_id, 'gap': POSITION_GAP}
+    ).scalar()
+
+def _neighbor_positions(session, playlist_id, index, exclude=()):
+    """Return the positions (before, after) of the slot at a 0-based index.
+
+    Songs in exclude are ignored, so a moved song does not count as its own
+    neighbour. Either side is None at the start or end of the playlist.
+    """
+    params = {'playlist_id': playlist_id, 'exclude': list(exclude) or [-1]}
+    if index <= 0:
+        params['offset'] = 0
+        row = session.execute(
+            text(NEIGHBOR_POSITIONS_SQL).bindparams(bindparam('exclude', expanding=True)), params
+        ).first()
+        return None, row[0] if row else None
+    
+    params['offset'] = index - 1
+    rows = session.execute(
+        text(NEIGHBOR_POSITIONS_SQL).bindparams(bindparam('exclude', expanding=True)), params
+    ).all()
+    if len(rows) == 2:
+        return rows[0][0], rows[1][0]
+    if len(rows) == 1:
+        return rows[0][0], None
+    
+    # Past the end of the playlist: append after the last song
+    last = session.execute(
+        text(LAST_POSITION_SQL).bindparams(bindparam('exclude', expanding=True)), params
+    ).scalar()
+    return last, None
+
+def _positions_between(before, after, count):
+    """Return count evenly spaced integer positions strictly between two neighbours.
+
+    Returns None when the gap is too narrow and the playlist needs rebalancing.
+    """
+    if before is None and after is None:
+        before = 0
+    if before is None:
+        before = after - (count + 1) * POSITION_GAP
+    if after is None:
+        after = before + (count + 1) * POSITION_GAP
+    
+    step = (after - before) // (count + 1)
+    if step < 1:
+        return None
+    return [before + step * (i + 1) for i in range(count)]
+
+def _rebalance_positions(session, playlist_id, gap=POSITION_GAP):
+    """Respace a playlist's positions gap apart, keeping the order"""
+    rows = session.query(PlaylistSong.id).filter(
+        PlaylistSong.playlist_id == playlist_id
+    ).order_by(PlaylistSong.position, PlaylistSong.id).all()
+    
+    session.execute(text(REBALANCE_POSITION_SQL), [
+        {'id': row.id, 'position': (i + 1) * gap} for i, row in enumerate(rows)
+    ])
+    return len(rows)
+
+def _slot_positions(session, playlist_id, index, count, exclude=()):
+    """Find positions for count songs at a 0-based index, rebalancing if needed.
+
+    Returns None if there is still no room after rebalancing, which should
+    not happen; callers report it rather than writing bad positions.
+    """
+    before, after = _neighbor_positions(session, playlist_id, index, exclude)
+    positions = _positions_between(before, after, count)
+    if positions is None:
+        # Neighbours are too close: spread the playlist out and retry. The
+        # gap widens in whole multiples of POSITION_GAP until count songs fit
+        # (moving POSITION_GAP or more songs into one slot needs more).
+        gap = POSITION_GAP * (count // POSITION_GAP + 1)
+        _rebalance_positions(session, playlist_id, gap)
+        before, after = _neighbor_positions(session, playlist_id, index, exclude)
+        positions = _positions_between(before, after, count)
+    return positions
+
 def add_song_to_playlist(playlist_id, song_id):
     """Add a song to a playlist"""
     session = get_db_session()
     try:
-        # Check if song is already in playlist
-        existing = session.query(PlaylistSong).filter(
-            PlaylistSong.playlist_id == playlist_id,
-            PlaylistSong.song_id == song_id
-        ).first()
+        # The unique (playlist_id, song_id) index rejects duplicates for us
+        result = session.execute(text(ADD_PLAYLIST_SONG_SQL), {
+            'playlist_id': playlist_id,
+            'song_id': song_id,
+            'position': _next_playlist_position(session, playlist_id)
+        })
         
-        if existing:
+        if result.rowcount == 0:
+            session.rollback()
+            if session.get(Song, song_id) is None:
+                return False, "Song not found"
             return False, "Song already in playlist"
         
-        # Get the next position
-        max_position = session.query(PlaylistSong).filter(
-            PlaylistSong.playlist_id == playlist_id
-        ).count()
+        session.commit()
+        _playlist_changed(playlist_id)
         
-        playlist_song = PlaylistSong(
-            playlist_id=playlist_id,
-            song_id=song_id,
-            position=max_position + 1
-        )
+        return True, "Song added to playlist"
+        
+    except Exception as e:
+        session.rollback()
+        return False, f"Failed to add song: {str(e)}"
+    finally:
+        session.close()
+
+def add_songs_to_playlist(playlist_id, song_ids):
+    """Append several songs to a playlist in one transaction.
+
+    Songs already in the playlist, unknown song IDs and repeats within
+    song_ids are skipped. Returns (success, message).
+    """
+    song_ids = list(dict.fromkeys(song_ids))
+    if not song_ids:
+        return False, "No songs selected"
+    
+    session = get_db_session()
+    try:
+        next_position = _next_playlist_position(session, playlist_id)
+        result = session.execute(text(ADD_PLAYLIST_SONG_SQL), [
+            {'playlist_id': playlist_id, 'song_id': song_id, 'position': next_position + i * POSITION_GAP}
+            for i, song_id in enumerate(song_ids)
+        ])
+        added = result.rowcount
+        session.commit()
+        _playlist_changed(playlist_id)
+        
+        skipped = len(song_ids) - added
+        message = f"Added {added} song{'s' if added != 1 else ''} to playlist"
+        if skipped:
+            message += f" ({skipped} already in playlist or not found)"
+        return added > 0, message
         
-        session.add(playlist_song)
+    except Exception as e:
+        session.rollback()
+        return False, f"Failed to add songs: {str(e)}"
+    finally:
+        session.close()
+
+def remove_songs_from_playlist(playlist_id, song_ids):
+    """Remove several songs from a playlist in one transaction"""
+    song_ids = list(dict.fromkeys(song_ids))
+    if not song_ids:
+        return False, "No songs selected"
+    
+    session = get_db_session()
+    try:
+        result = session.execute(text(REMOVE_PLAYLIST_SONG_SQL), [
+            {'playlist_id': playlist_id, 'song_id': song_id} for song_id in song_ids
+        ])
+        removed = result.rowcount
         session.commit()
+        _playlist_changed(playlist_id)
+        
+        return removed > 0, f"Removed {removed} song{'s' if removed != 1 else ''} from playlist"
+        
+    except Exception as e:
+        session.rollback()
+        return False, f"Failed to remove songs: {str(e)}"
+    finally:
+        session.close()
+
+def insert_song_at(playlist_id, song_id, index):
+    """Insert a song into a playlist at a 0-based index.
+
+    Only the new row is written: its position is picked between its two
+    neighbours (see POSITION_GAP).
+    """
+    session = get_db_session()
+    try:
+        positions = _slot_positions(session, playlist_id, index, 1)
+        if positions is None:
+            session.rollback()
+            return False, "No room to insert the song at that position"
+        
+        result = session.execute(text(ADD_PLAYLIST_SONG_SQL), {
+            'playlist_id': playlist_id,
+            'song_id': song_id,
+            'position': positions[0]
+        })
+        
+        if result.rowcount == 0:
+            session.rollback()
+            if session.get(Song, song_id) is None:
+                return False, "Song not found"
+            return False, "Song already in playlist"
+        
+        session.commit()
+        _playlist_changed(playlist_id)
         
         return True, "Song added to playlist"
         
@@ -267,70 +692,156 @@ def add_song_to_playlist(playlist_id, song_id):
     finally:
         session.close()
 
+def move_songs(playlist_id, song_ids, index):
+    """Move songs to a new place in a playlist, in one transaction.
+
+    The songs keep the order given in song_ids and land so that index
+    (0-based) other songs come before them. Only the moved rows are
+    written, unless the gap at the target has run out and the playlist
+    has to be rebalanced first.
+    """
+    session = get_db_session()
+    try:
+        song_ids = list(dict.fromkeys(song_ids))
+        moving = [
+            row.song_id for row in session.query(PlaylistSong.song_id).filter(
+                PlaylistSong.playlist_id == playlist_id,
+                PlaylistSong.song_id.in_(song_ids)
+            )
+        ] if song_ids else []
+        if not moving:
+            return False, "None of those songs are in the playlist"
+        
+        # Keep the caller's order for the songs that are actually present
+        present = set(moving)
+        moving = [song_id for song_id in song_ids if song_id in present]
+        
+        positions = _slot_positions(session, playlist_id, index, len(moving), exclude=moving)
+        if positions is None:
+            session.rollback()
+            return False, "No room to move the songs to that position"
+        
+        session.execute(text(MOVE_PLAYLIST_SONG_SQL), [
+            {'playlist_id': playlist_id, 'song_id': song_id, 'position': position}
+            for song_id, position in zip(moving, positions)
+        ])
+        session.commit()
+        _playlist_changed(playlist_id)
+        
+        return True, f"Moved {len(moving)} song{'s' if len(moving) != 1 else ''}"
+        
+    except Exception as e:
+        session.rollback()
+        return False, f"Failed to move songs: {str(e)}"
+    finally:
+        session.close()
+
+def rebalance_playlist(playlist_id):
+    """Respace a playlist's positions evenly, keeping the song order.
+
+    Inserts and moves rebalance automatically when a gap runs out; this is
+    for maintenance jobs that want to do it ahead of time.
+    """
+    session = get_db_session()
+    try:
+        count = _rebalance_positions(session, playlist_id)
+        session.commit()
+        _playlist_changed(playlist_id)
+        return True, f"Rebalanced {count} songs"
+    except Exception as e:
+        session.rollback()
+        return False, f"Failed to rebalance playlist: {str(e)}"
+    finally:
+        session.close()
+
+@cached('playlist_songs')
 def get_playlist_songs(playlist_id):
     """Get all songs in a playlist"""
     session = get_db_session()
     try:
-        playlist_songs = session.query(PlaylistSong).join(Song).join(Artist).join(Album).filter(
+        rows = _song_projection(session, PlaylistSong.position).join(
+            PlaylistSong, PlaylistSong.song_id == Song.id
+        ).filter(
             PlaylistSong.playlist_id == playlist_id
-        ).order_by(PlaylistSong.position).all()
-        
-        song_list = []
-        for ps in playlist_songs:
-            song = ps.song
-            song_data = {
-                'id': song.id,
-                'title': song.title,
-                'artist': song.artist.name,
-                'album': song.album.title,
-                'genre': song.genre.name if song.genre else 'Unknown',
-                'duration': song.duration,
-                'file_path': song.file_path,
-                'position': ps.position
-            }
-            song_list.append(song_data)
+        ).order_by(PlaylistSong.position, PlaylistSong.id).all()
+        
+        return [_playlist_song_record(row) for row in rows]
+    finally:
+        session.close()
+
+@cached_first_page('playlist_songs_page')
+def get_playlist_songs_page(playlist_id, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Get one page of songs in a playlist, keyed on (position, entry ID).
+
+    Positions are not unique, so the playlist_songs row ID breaks ties.
+    """
+    session = get_db_session()
+    try:
+        query = _song_projection(session, PlaylistSong.position, PlaylistSong.id.label('entry_id')).join(
+            PlaylistSong, PlaylistSong.song_id == Song.id
+        ).filter(
+            PlaylistSong.playlist_id == playlist_id
+        )
+        rows, next_cursor = _keyset_page(
+            query, PlaylistSong.position, 'position', after, limit, tiebreak=(PlaylistSong.id, 'entry_id')
+        )
         
-        return song_list
+        return [_playlist_song_record(row) for row in rows], next_cursor
+    finally:
+        session.close()
+
+def iter_playlist_songs(playlist_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every song in a playlist in position order, fetched in batches"""
+    session = get_db_session()
+    try:
+        query = _song_projection(session, PlaylistSong.position).join(
+            PlaylistSong, PlaylistSong.song_id == Song.id
+        ).filter(
+            PlaylistSong.playlist_id == playlist_id
+        ).order_by(PlaylistSong.position, PlaylistSong.id)
+        yield from _iter_song_records(query, batch_size, _playlist_song_record)
     finally:
         session.close()
 
+@cached('genres')
 def get_all_genres():
     """Get all genres"""
     session = get_db_session()
     try:
-        genres = session.query(Genre).all()
+        rows = session.query(Genre.id, Genre.name).all()
         
-        genre_list = []
-        for genre in genres:
-            genre_data = {
-                'id': genre.id,
-                'name': genre.name
-            }
-            genre_list.append(genre_data)
-        
-        return genre_list
+        return [GenreRecord._make(row) for row in rows]
     finally:
         session.close()
 
+@cached('genre_songs')
 def get_songs_by_genre(genre_id):
     """Get all songs in a genre"""
     session = get_db_session()
     try:
-        songs = session.query(Song).join(Artist).join(Album).filter(Song.genre_id == genre_id).all()
-        
-        song_list = []
-        for song in songs:
-            song_data = {
-                'id': song.id,
-                'title': song.title,
-                'artist': song.artist.name,
-                'album': song.album.title,
-                'genre': song.genre.name if song.genre else 'Unknown',
-                'duration': song.duration,
-                'file_path': song.file_path
-            }
-            song_list.append(song_data)
+        rows = _song_projection(session).filter(Song.genre_id == genre_id).all()
         
-        return song_list
+        return [_song_record(row) for row in rows]
+    finally:
+        session.close()
+
+@cached_first_page('genre_songs_page')
+def get_songs_by_genre_page(genre_id, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Get one page of songs in a genre, ordered by song ID"""
+    session = get_db_session()
+    try:
+        query = _song_projection(session).filter(Song.genre_id == genre_id)
+        rows, next_cursor = _keyset_page(query, Song.id, 'id', after, limit)
+        
+        return [_song_record(row) for row in rows], next_cursor
+    finally:
+        session.close()
+
+def iter_songs_by_genre(genre_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every song in a genre, fetched in batches"""
+    session = get_db_session()
+    try:
+        query = _song_projection(session).filter(Song.genre_id == genre_id).order_by(Song.id)
+        yield from _iter_song_records(query, batch_size)
     finally:
         session.close()
\ No newline at end of file
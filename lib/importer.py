@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""Bulk catalog importer.
+
+Loads tracks from a db.json-style JSON array, NDJSON (one object per line)
+or CSV into the songs/artists/albums/genres tables. Input is parsed as a
+stream, artists/albums/genres are resolved through in-memory maps, and rows
+are written with executemany in large transactions, so importing millions
+of tracks needs neither the whole file nor per-row round trips.
+
+    python lib/importer.py public/db.json
+    python lib/importer.py tracks.ndjson --batch-size 50000
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.search import INDEX_SONG_RANGE_SQL, SONG_INSERT_TRIGGER
+
+# Characters read from the input per refill of the JSON array parser
+CHUNK_SIZE = 1 << 16
+
+# Tracks written per transaction
+DEFAULT_BATCH_SIZE = 20000
+
+UNKNOWN_ALBUM = 'Unknown Album'
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+def parse_duration(value):
+    """Convert "3:47", "1:02:03", "227" or 227 to seconds; None if blank"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    value = str(value).strip()
+    if not value:
+        return None
+
+    seconds = 0.0
+    for part in value.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def detect_format(path):
+    """Guess the input format from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if extension == '.csv':
+        return 'csv'
+    return 'json'
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array without reading it all.
+
+    Only the current chunk and the element being decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+
+    def refill():
+        nonlocal buffer, position
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    def peek():
+        """Return the next non-whitespace character, or '' at end of input"""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not refill():
+                return ''
+
+    if peek() != '[':
+        raise ValueError("Expected a JSON array")
+    position += 1
+    if peek() == ']':
+        return
+
+    while True:
+        peek()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The element continues past the end of the buffer
+                if not refill():
+                    raise
+                continue
+            # A number at the very end of the buffer may still be cut short
+            if end == len(buffer) and refill():
+                continue
+            break
+
+        position = end
+        yield item
+
+        token = peek()
+        if token == ',':
+            position += 1
+        elif token == ']':
+            return
+        else:
+            raise ValueError(f"Unexpected {token!r} in JSON array")
+
+def iter_ndjson(stream):
+    """Yield one object per non-blank line; None for a line that is not JSON"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+def iter_tracks(path, format=None):
+    """Stream raw track dictionaries from a JSON, NDJSON or CSV file"""
+    format = format or detect_format(path)
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of {', '.join(FORMATS)}")
+
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        if format == 'json':
+            yield from iter_json_array(stream)
+        elif format == 'ndjson':
+            yield from iter_ndjson(stream)
+        else:
+            yield from csv.DictReader(stream)
+
+def normalize_track(raw):
+    """Map a raw record onto song fields; None if it lacks a title or artist.
+
+    Accepts the db.json field names (file, cover, duration as "3:47") as
+    well as the column names used in the database (file_path, cover_image,
+    duration in seconds).
+    Raises ValueError for a malformed duration or release year.
+    """
+    if not isinstance(raw, dict):
+        return None
+
+    title = (raw.get('title') or '').strip()
+    artist = (raw.get('artist') or '').strip()
+    if not title or not artist:
+        return None
+
+    release_year = raw.get('release_year') or raw.get('year')
+    return {
+        'title': title,
+        'artist': artist,
+        'album': (raw.get('album') or '').strip() or UNKNOWN_ALBUM,
+        'genre': (raw.get('genre') or '').strip() or None,
+        'duration': parse_duration(raw.get('duration')),
+        'file_path': raw.get('file_path') or raw.get('file') or None,
+        'cover_image': raw.get('cover_image') or raw.get('cover') or None,
+        'release_year': int(release_year) if release_year else None,
+    }
+
+class CatalogImporter:
+    """Batched writer that resolves and dedupes catalog entities in memory.
+
+    Artists are keyed by name, albums by (artist, title) and genres by name.
+    Songs already present with the same artist, album and title are skipped,
+    so re-running an import is safe.
+    """
+
+    def __init__(self, connection, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.progress = progress
+        self.stats = {
+            'read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0,
+            'artists': 0, 'albums': 0, 'genres': 0,
+        }
+        self._pending = []
+        self._started = time.perf_counter()
+        self._load_maps()
+
+    def _load_maps(self):
+        """Load the existing entities so new rows dedupe against them"""
+        cursor = self.connection.cursor()
+        self.artists = {name: id for id, name in cursor.execute("SELECT id, name FROM artists")}
+        self.genres = {name: id for id, name in cursor.execute("SELECT id, name FROM genres")}
+        self.albums = {
+            (artist_id, title): id
+            for id, artist_id, title in cursor.execute("SELECT id, artist_id, title FROM albums")
+        }
+        self.songs = set(cursor.execute("SELECT artist_id, album_id, title FROM songs"))
+        cursor.close()
+
+    def add(self, raw):
+        """Queue one raw track, writing a batch when the queue is full"""
+        self.stats['read'] += 1
+        try:
+            track = normalize_track(raw)
+        except (ValueError, TypeError, AttributeError):
+            # One malformed field, e.g. a duration of "3:xx", skips the row only
+            track = None
+        if track is None:
+            self.stats['invalid'] += 1
+            return
+        self._pending.append(track)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    @staticmethod
+    def _next_id(cursor, table):
+        """The first ID to give a new row: past every ID the table ever used.
+
+        The setup.py tables are AUTOINCREMENT, so sqlite_sequence remembers
+        IDs of deleted rows (songs merged away by lib/dedupe.py, say) that a
+        stale cache or client may still hold; those are never handed out
+        again. Inserting an explicit ID advances sqlite_sequence as well.
+        """
+        next_id = cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+        has_sequence = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'"
+        ).fetchone()
+        if has_sequence:
+            row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+            if row and row[0] is not None:
+                next_id = max(next_id, row[0] + 1)
+        return next_id
+
+    def flush(self):
+        """Write the queued tracks and any new entities in one transaction"""
+        if not self._pending:
+            return
+
+        cursor = self.connection.cursor()
+        try:
+            # Take the write lock up front so the IDs assigned below stay ours
+            cursor.execute("BEGIN IMMEDIATE")
+            next_ids = {table: self._next_id(cursor, table) for table in ('artists', 'albums', 'genres', 'songs')}
+            new_artists, new_albums, new_genres, new_songs = [], [], [], []
+
+            for track in self._pending:
+                artist_id = self.artists.get(track['artist'])
+                if artist_id is None:
+                    artist_id = self.artists[track['artist']] = next_ids['artists']
+                    next_ids['artists'] += 1
+                    new_artists.append((artist_id, track['artist']))
+
+                album_key = (artist_id, track['album'])
+                album_id = self.albums.get(album_key)
+                if album_id is None:
+                    album_id = self.albums[album_key] = next_ids['albums']
+                    next_ids['albums'] += 1
+                    new_albums.append((album_id, track['album'], track['release_year'], artist_id))
+
+                genre_id = None
+                if track['genre']:
+                    genre_id = self.genres.get(track['genre'])
+                    if genre_id is None:
+                        genre_id = self.genres[track['genre']] = next_ids['genres']
+                        next_ids['genres'] += 1
+                        new_genres.append((genre_id, track['genre']))
+
+                song_key = (artist_id, album_id, track['title'])
+                if song_key in self.songs:
+                    self.stats['duplicates'] += 1
+                    continue
+                self.songs.add(song_key)
+
+                new_songs.append((
+                    next_ids['songs'], track['title'], track['duration'], track['file_path'],
+                    track['cover_image'], artist_id, album_id, genre_id
+                ))
+                next_ids['songs'] += 1
+
+            # Index the batch with one statement instead of a trigger per row.
+            # DDL is transactional in SQLite, so no other connection ever sees
+            # the trigger missing.
+            trigger = cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (SONG_INSERT_TRIGGER,)
+            ).fetchone()
+            if trigger and new_songs:
+                cursor.execute(f"DROP TRIGGER {SONG_INSERT_TRIGGER}")
+
+            cursor.executemany("INSERT INTO artists (id, name) VALUES (?, ?)", new_artists)
+            cursor.executemany("INSERT INTO genres (id, name) VALUES (?, ?)", new_genres)
+            cursor.executemany(
+                "INSERT INTO albums (id, title, release_year, artist_id) VALUES (?, ?, ?, ?)", new_albums
+            )
+            cursor.executemany(
+                "INSERT INTO songs (id, title, duration, file_path, cover_image, artist_id, album_id, genre_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                new_songs
+            )
+
+            if trigger and new_songs:
+                cursor.execute(INDEX_SONG_RANGE_SQL, (new_songs[0][0], new_songs[-1][0]))
+                cursor.execute(trigger[0])
+            cursor.execute("COMMIT")
+        except Exception:
+            # Nothing to roll back if BEGIN IMMEDIATE itself failed (SQLITE_BUSY)
+            if self.connection.in_transaction:
+                cursor.execute("ROLLBACK")
+            # Forget entities from the failed batch so a retry re-inserts them
+            self._load_maps()
+            raise
+        finally:
+            cursor.close()
+
+        self.stats['artists'] += len(new_artists)
+        self.stats['albums'] += len(new_albums)
+        self.stats['genres'] += len(new_genres)
+        self.stats['imported'] += len(new_songs)
+        self._pending = []
+
+        if self.progress:
+            self.progress(self.stats, time.perf_counter() - self._started)
+
+def import_catalog(path, format=None, batch_size=DEFAULT_BATCH_SIZE, progress=None, db_path=None):
+    """Import every track in a catalog file and return the import statistics"""
+    from lib.db.engine import raw_connection
+    from lib.helpers import invalidate_catalog_cache
+
+    connection = raw_connection('bulk-load', db_path)
+    sqlite_connection = connection.driver_connection
+    isolation_level = sqlite_connection.isolation_level
+    # Transactions are managed explicitly, one per batch
+    sqlite_connection.isolation_level = None
+    try:
+        importer = CatalogImporter(sqlite_connection, batch_size, progress)
+        for raw in iter_tracks(path, format):
+            importer.add(raw)
+        importer.flush()
+    finally:
+        sqlite_connection.isolation_level = isolation_level
+        connection.close()
+
+    invalidate_catalog_cache()
+    return importer.stats
+
+def print_progress(stats, elapsed):
+    """Progress callback for the command line"""
+    rate = stats['imported'] / elapsed if elapsed else 0
+    print(f"  {stats['read']:,} read, {stats['imported']:,} imported "
+          f"({rate:,.0f} tracks/s, {elapsed:.1f}s)")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import tracks into the music catalog")
+    parser.add_argument("path", help="db.json-style JSON array, NDJSON or CSV file")
+    parser.add_argument("--format", choices=FORMATS, help="input format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="tracks per transaction")
+    args = parser.parse_args()
+
+    print(f"Importing {args.path}...")
+    stats = import_catalog(args.path, args.format, args.batch_size, print_progress)
+    print(f"\nImport complete: {stats['imported']:,} songs, {stats['artists']:,} new artists, "
+          f"{stats['albums']:,} new albums, {stats['genres']:,} new genres")
+    if stats['duplicates'] or stats['invalid']:
+        print(f"Skipped {stats['duplicates']:,} duplicates and {stats['invalid']:,} invalid records")
@@ -1,26 +1,25 @@
-import os
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
+from lib.db.engine import DB_PATH, get_engine
 
-# Get the directory where this file is located
-current_dir = os.path.dirname(os.path.abspath(__file__))
-# Go up two levels to get to the project root, then into lib/db
-db_path = os.path.join(current_dir, '..', 'db', 'music_streaming.db')
-db_path = os.path.abspath(db_path)
+db_path = DB_PATH
 
-# Ensure the db directory exists
-os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-# Create database engine
-engine = create_engine(f'sqlite:///{db_path}')
-
-# Create session factory
-session_factory = sessionmaker(bind=engine)
+# Create session factory; it is bound to the shared pooled engine
+# (lib/db/engine.py) on first use, so importing the models never opens or
+# migrates the database
+session_factory = sessionmaker()
 Session = scoped_session(session_factory)
 
 # Create base class for models
 Base = declarative_base()
 
+def __getattr__(name):
+    # base.engine is the shared engine, created on first access
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def get_session():
-    return Session()
\ No newline at end of file
+    if session_factory.kw.get('bind') is None:
+        session_factory.configure(bind=get_engine())
+    return Session()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from lib.models.base import Base
@@ -42,6 +42,10 @@ class Album(Base):
     artist = relationship("Artist", back_populates="albums")
     songs = relationship("Song", back_populates="album", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('ix_albums_artist_id', 'artist_id'),
+    )
+    
     def __repr__(self):
         return f"<Album(id={self.id}, title='{self.title}')>"
 
@@ -63,6 +67,7 @@ class Song(Base):
     title = Column(String(100), nullable=False)
     duration = Column(Float)  # in seconds
     file_path = Column(String(255))
+    cover_image = Column(String(255))  # under the web root, like file_path
     artist_id = Column(Integer, ForeignKey('artists.id'), nullable=False)
     album_id = Column(Integer, ForeignKey('albums.id'), nullable=False)
     genre_id = Column(Integer, ForeignKey('genres.id'))
@@ -72,6 +77,12 @@ class Song(Base):
     genre = relationship("Genre", back_populates="songs")
     playlist_songs = relationship("PlaylistSong", back_populates="song", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('ix_songs_artist_id', 'artist_id'),
+        Index('ix_songs_album_id', 'album_id'),
+        Index('ix_songs_genre_id', 'genre_id'),
+    )
+    
     def __repr__(self):
         return f"<Song(id={self.id}, title='{self.title}')>"
 
@@ -87,19 +98,70 @@ class Playlist(Base):
     user = relationship("User", back_populates="playlists")
     playlist_songs = relationship("PlaylistSong", back_populates="playlist", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('ix_playlists_user_id', 'user_id'),
+    )
+    
     def __repr__(self):
         return f"<Playlist(id={self.id}, name='{self.name}')>"
 
+# Playlist positions are sparse ordering keys spaced POSITION_GAP apart, so a
+# song can be inserted or moved between two neighbours by writing one row.
+POSITION_GAP = 65536
+
 class PlaylistSong(Base):
     __tablename__ = 'playlist_songs'
     
     id = Column(Integer, primary_key=True)
     playlist_id = Column(Integer, ForeignKey('playlists.id'), nullable=False)
     song_id = Column(Integer, ForeignKey('songs.id'), nullable=False)
-    position = Column(Integer, nullable=False)  # For ordering songs in playlist
+    position = Column(Integer, nullable=False)  # Sparse ordering key, see POSITION_GAP
     
     playlist = relationship("Playlist", back_populates="playlist_songs")
     song = relationship("Song", back_populates="playlist_songs")
     
+    __table_args__ = (
+        Index('ix_playlist_songs_playlist_position', 'playlist_id', 'position'),
+        Index('ix_playlist_songs_song_id', 'song_id'),
+        Index('ux_playlist_songs_playlist_song', 'playlist_id', 'song_id', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<PlaylistSong(playlist_id={self.playlist_id}, song_id={self.song_id}, position={self.position})>"
+
+# Scan manifest: the size and mtime each media file had when it was last
+# read, so a re-scan only re-reads files that changed (see lib/scanner.py).
+# The hashes are filled in by lib/dedupe.py and cleared when the file changes.
+class MediaFile(Base):
+    __tablename__ = 'media_files'
+    
+    path = Column(String(1024), primary_key=True)  # Absolute path on disk
+    size = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    song_id = Column(Integer, ForeignKey('songs.id'))
+    prehash = Column(String(32))  # Hash of the size, first and last block
+    content_hash = Column(String(64))  # Hash of the whole file, only computed on prehash collisions
+    
+    __table_args__ = (
+        Index('ix_media_files_content_hash', 'content_hash'),
+    )
+    
+    def __repr__(self):
+        return f"<MediaFile(path='{self.path}', song_id={self.song_id})>"
+
+# Precomputed time -> byte offset table for one song's audio file, so a seek
+# is a binary search instead of a scan from the start (see lib/seek.py)
+class SeekIndex(Base):
+    __tablename__ = 'seek_indexes'
+    
+    song_id = Column(Integer, ForeignKey('songs.id'), primary_key=True)
+    format = Column(String(8), nullable=False)
+    file_size = Column(Integer, nullable=False)  # Size of the file the table was built from
+    duration = Column(Float, nullable=False)  # in seconds
+    audio_end = Column(Integer, nullable=False)  # Byte offset just past the last audio frame
+    times = Column(LargeBinary, nullable=False)  # Packed uint32 milliseconds
+    offsets = Column(LargeBinary, nullable=False)  # Packed uint64 byte offsets
+    mtime_ns = Column(Integer)  # mtime of the file the table was built from
+    
     def __repr__(self):
-        return f"<PlaylistSong(playlist_id={self.playlist_id}, song_id={self.song_id}, position={self.position})>"
\ No newline at end of file
+        return f"<SeekIndex(song_id={self.song_id}, format='{self.format}')>"
\ No newline at end of file
@@ -0,0 +1,115 @@
+from collections import namedtuple
+
+SONG_FIELDS = ('id', 'title', 'artist', 'album', 'genre', 'duration', 'file_path')
+PLAYLIST_SONG_FIELDS = SONG_FIELDS + ('position',)
+ARTIST_FIELDS = ('id', 'name', 'bio')
+GENRE_FIELDS = ('id', 'name')
+PLAYLIST_FIELDS = ('id', 'name', 'description', 'created_at')
+
+class _RecordMixin:
+    """Dictionary-style access for tuple-backed records.
+
+    Records are namedtuples, so a row costs one tuple instead of a dict with
+    its own hash table. Code written against the old dict rows keeps working:
+    record['title'], record.get('genre'), 'title' in record, dict(record) and
+    record.keys() all behave like a dict. Attribute access (record.title) and
+    positional access (record[1]) work too. Iterating a record yields its
+    values, as for any tuple; use to_dict() where a real dict is needed.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._field_index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self._field_index
+
+    def get(self, key, default=None):
+        """Return the value for key, or default if the record has no such field"""
+        index = self._field_index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self):
+        """Return the field names, in column order"""
+        return self._fields
+
+    def values(self):
+        """Return the field values, in column order"""
+        return tuple(self)
+
+    def items(self):
+        """Return (field, value) pairs, in column order"""
+        return zip(self._fields, self)
+
+    def to_dict(self):
+        """Return the record as a plain dictionary"""
+        return dict(zip(self._fields, self))
+
+def _record_type(name, fields):
+    """Build a slotted, tuple-backed record class with dict-style access"""
+    base = namedtuple(name, fields)
+    return type(name, (_RecordMixin, base), {
+        '__slots__': (),
+        '_field_index': {field: i for i, field in enumerate(fields)},
+    })
+
+SongRecord = _record_type('SongRecord', SONG_FIELDS)
+PlaylistSongRecord = _record_type('PlaylistSongRecord', PLAYLIST_SONG_FIELDS)
+ArtistRecord = _record_type('ArtistRecord', ARTIST_FIELDS)
+GenreRecord = _record_type('GenreRecord', GENRE_FIELDS)
+PlaylistRecord = _record_type('PlaylistRecord', PLAYLIST_FIELDS)
+
+class SongBatch:
+    """A batch of songs stored column by column.
+
+    Bulk consumers (exports, reports, aggregations) usually read a few
+    fields across many rows; one list per field avoids building a record
+    per row at all. batch.column('duration') returns the raw column, and
+    batch[i] or iteration rebuild SongRecords on demand.
+    """
+    __slots__ = SONG_FIELDS
+
+    def __init__(self, *columns):
+        for field, column in zip(SONG_FIELDS, columns):
+            setattr(self, field, column)
+
+    @classmethod
+    def from_records(cls, records):
+        """Transpose a sequence of SongRecords into a batch"""
+        records = list(records)
+        if not records:
+            return cls(*([] for _ in SONG_FIELDS))
+        return cls(*(list(column) for column in zip(*records)))
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, index):
+        return SongRecord(*(getattr(self, field)[index] for field in SONG_FIELDS))
+
+    def __iter__(self):
+        return map(SongRecord, *(getattr(self, field) for field in SONG_FIELDS))
+
+    def column(self, field):
+        """Return the list of values for one field"""
+        if field not in SONG_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+def to_plain(value):
+    """A helper result as plain JSON values: records become dictionaries"""
+    if hasattr(value, 'to_dict'):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Timestamps and the like, as the HTTP API sends them
+    return str(value)
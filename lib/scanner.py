@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""Incremental media library scanner.
+
+Walks a media root (public/Files by default), reads tags and durations from
+new or changed audio files on a process pool, and upserts the matching
+songs, artists and albums. The media_files manifest records each file's
+size and mtime, so a re-scan of an unchanged library only stats the files.
+
+    python lib/scanner.py
+    python lib/scanner.py /path/to/music --workers 8
+"""
+
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.tags import TagError, read_tags
+
+# Song.file_path values are relative to the web root the frontend serves,
+# e.g. public/Files/Laho.m4a is stored as /Files/Laho.m4a like in db.json
+WEB_ROOT = os.path.join(project_root, 'public')
+MEDIA_ROOT = os.path.join(WEB_ROOT, 'Files')
+
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.mp4')
+
+UNKNOWN_ARTIST = 'Unknown Artist'
+UNKNOWN_ALBUM = 'Unknown Album'
+
+# Fewer changed files than this are read in-process; a pool costs more to start
+POOL_THRESHOLD = 32
+
+# Files handed to a worker at a time
+POOL_CHUNK_SIZE = 64
+
+# Changed files written per transaction; the write lock is held only while
+# a batch is written, not while it is parsed
+WRITE_BATCH_SIZE = 5000
+
+def walk_media(root):
+    """Yield (path, size, mtime_ns) for every audio file under root"""
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield os.path.abspath(entry.path), stat.st_size, stat.st_mtime_ns
+
+def library_path(path):
+    """The Song.file_path for a file on disk"""
+    relative = os.path.relpath(path, WEB_ROOT)
+    if relative.startswith(os.pardir):
+        return path
+    return '/' + relative.replace(os.sep, '/')
+
+def disk_path(file_path):
+    """The file on disk for a Song.file_path (the inverse of library_path).
+
+    None if the path would escape its root: a web path that resolves outside
+    the web root through '..' or a symlink, or an absolute path (a file
+    scanned from another media root) that is not a plain path to an audio file.
+    """
+    web_root = os.path.realpath(WEB_ROOT)
+    path = os.path.realpath(os.path.join(web_root, *file_path.lstrip('./').split('/')))
+    if path.startswith(web_root + os.sep) and (not os.path.isabs(file_path) or os.path.exists(path)):
+        return path
+    if (os.path.isabs(file_path) and os.path.normpath(file_path) == file_path
+            and file_path.lower().endswith(AUDIO_EXTENSIONS)):
+        return file_path  # a file outside the web root, stored as is
+    return None
+
+def read_metadata(path):
+    """Read a file's tags; runs in the worker processes.
+
+    Returns (path, tags, error); tags the file does not carry are None, and
+    tags is None when the file could not be parsed (see lib/tags.py).
+    """
+    try:
+        return path, read_tags(path), None
+    except (TagError, OSError, struct.error, ValueError, IndexError) as e:
+        # Any malformed file counts as unreadable; the scan goes on
+        return path, None, str(e) or type(e).__name__
+
+def title_from_filename(path):
+    """Fallback title for an untagged file, e.g. Lucky-Dube-One-Love.mp3 -> Lucky Dube One Love"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return ' '.join(stem.replace('_', ' ').replace('-', ' ').split()) or stem
+
+def read_all(paths, workers=None):
+    """Yield read_metadata() results, on a process pool for large batches"""
+    if len(paths) < POOL_THRESHOLD or workers == 1:
+        for path in paths:
+            yield read_metadata(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(read_metadata, paths, chunksize=POOL_CHUNK_SIZE)
+
+def _batches(items, size):
+    """Group an iterable into lists of up to size items, reading it lazily"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class LibraryWriter:
+    """Upserts scanned files into the catalog over one raw sqlite3 connection.
+
+    Songs are matched by file_path, artists by name, albums by (artist, title)
+    and genres by name; the lookups are loaded once and kept in memory.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        cursor = connection.cursor()
+        self.artists = {name: id for id, name in cursor.execute("SELECT id, name FROM artists")}
+        self.genres = {name: id for id, name in cursor.execute("SELECT id, name FROM genres")}
+        self.albums = {
+            (artist_id, title): id
+            for id, artist_id, title in cursor.execute("SELECT id, artist_id, title FROM albums")
+        }
+        self.songs = {
+            file_path: (id, artist_id)
+            for id, file_path, artist_id in cursor.execute(
+                "SELECT id, file_path, artist_id FROM songs WHERE file_path IS NOT NULL"
+            )
+        }
+        # Songs whose stored seek table was deleted, for the in-memory cache
+        self.stale_seek_tables = set()
+        cursor.close()
+
+    def _artist_id(self, cursor, name):
+        artist_id = self.artists.get(name)
+        if artist_id is None:
+            cursor.execute("INSERT INTO artists (name) VALUES (?)", (name,))
+            artist_id = self.artists[name] = cursor.lastrowid
+        return artist_id
+
+    def _album_id(self, cursor, artist_id, title, year=None):
+        album_id = self.albums.get((artist_id, title))
+        if album_id is None:
+            cursor.execute(
+                "INSERT INTO albums (title, release_year, artist_id) VALUES (?, ?, ?)", (title, year, artist_id)
+            )
+            album_id = self.albums[(artist_id, title)] = cursor.lastrowid
+        return album_id
+
+    def _genre_id(self, cursor, name):
+        genre_id = self.genres.get(name)
+        if genre_id is None:
+            cursor.execute("INSERT INTO genres (name) VALUES (?)", (name,))
+            genre_id = self.genres[name] = cursor.lastrowid
+        return genre_id
+
+    def upsert(self, cursor, path, size, mtime_ns, metadata):
+        """Create or update the song for one file and record it in the manifest.
+
+        Returns True when a new song was created. Tags that are missing leave
+        the existing song's values alone.
+        """
+        file_path = library_path(path)
+        existing = self.songs.get(file_path)
+        created = existing is None
+
+        if created:
+            artist_id = self._artist_id(cursor, metadata['artist'] or UNKNOWN_ARTIST)
+            album_id = self._album_id(cursor, artist_id, metadata['album'] or UNKNOWN_ALBUM, metadata['year'])
+            genre_id = self._genre_id(cursor, metadata['genre']) if metadata['genre'] else None
+            title = metadata['title'] or title_from_filename(path)
+            cursor.execute(
+                "INSERT INTO songs (title, duration, file_path, artist_id, album_id, genre_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (title, metadata['duration'], file_path, artist_id, album_id, genre_id)
+            )
+            song_id = cursor.lastrowid
+            self.songs[file_path] = (song_id, artist_id)
+        else:
+            song_id, artist_id = existing
+            changes = {}
+            if metadata['title']:
+                changes['title'] = metadata['title']
+            if metadata['duration'] is not None:
+                changes['duration'] = metadata['duration']
+            if metadata['artist']:
+                artist_id = changes['artist_id'] = self._artist_id(cursor, metadata['artist'])
+                self.songs[file_path] = (song_id, artist_id)
+            if metadata['album']:
+                changes['album_id'] = self._album_id(cursor, artist_id, metadata['album'], metadata['year'])
+            if metadata['genre']:
+                changes['genre_id'] = self._genre_id(cursor, metadata['genre'])
+            # The file changed, so its seek table (lib/seek.py) is stale
+            cursor.execute("DELETE FROM seek_indexes WHERE song_id = ?", (song_id,))
+            self.stale_seek_tables.add(song_id)
+            if changes:
+                assignments = ', '.join(f"{column} = ?" for column in changes)
+                cursor.execute(
+                    f"UPDATE songs SET {assignments} WHERE id = ?", (*changes.values(), song_id)
+                )
+
+        cursor.execute(
+            """
+            INSERT INTO media_files (path, size, mtime_ns, song_id) VALUES (?, ?, ?, ?)
+            ON CONFLICT (path) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns, song_id = excluded.song_id,
+                prehash = NULL, content_hash = NULL
+            """,
+            (path, size, mtime_ns, song_id)
+        )
+        return created
+
+def scan_library(root=MEDIA_ROOT, workers=None, db_path=None, progress=None):
+    """Bring the catalog in line with the audio files under root.
+
+    Only files whose size or mtime differ from the manifest are read.
+    Manifest entries for files that disappeared are dropped; their songs are
+    kept, since playlists may still reference them. Returns scan statistics.
+    """
+    from lib.db.engine import raw_connection
+    from lib.helpers import invalidate_catalog_cache
+    from lib.seek import seek_cache
+
+    started = time.perf_counter()
+    root = os.path.abspath(root)
+    stats = {'files': 0, 'unchanged': 0, 'added': 0, 'updated': 0, 'missing': 0, 'errors': 0}
+
+    connection = raw_connection('bulk-load', db_path)
+    sqlite_connection = connection.driver_connection
+    isolation_level = sqlite_connection.isolation_level
+    # Transactions are managed explicitly, one per write batch
+    sqlite_connection.isolation_level = None
+    try:
+        cursor = sqlite_connection.cursor()
+        manifest = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in cursor.execute(
+                "SELECT path, size, mtime_ns FROM media_files WHERE path >= ? AND path < ?",
+                (root + os.sep, root + chr(ord(os.sep) + 1))
+            )
+        }
+
+        changed = {}
+        for path, size, mtime_ns in walk_media(root):
+            stats['files'] += 1
+            if manifest.pop(path, None) == (size, mtime_ns):
+                stats['unchanged'] += 1
+            else:
+                changed[path] = (size, mtime_ns)
+
+        # Files are parsed with no transaction open; the write lock is taken
+        # only while a batch of parsed files is written, so CLI and server
+        # writers are never kept waiting for the whole scan
+        writer = LibraryWriter(sqlite_connection)
+        for batch in _batches(read_all(list(changed), workers), WRITE_BATCH_SIZE):
+            cursor.execute("BEGIN IMMEDIATE")
+            for path, metadata, error in batch:
+                if error:
+                    stats['errors'] += 1
+                    if progress:
+                        progress(f"{path}: {error}")
+                    continue
+                created = writer.upsert(cursor, path, *changed[path], metadata)
+                stats['added' if created else 'updated'] += 1
+            cursor.execute("COMMIT")
+            if progress and len(changed) > WRITE_BATCH_SIZE:
+                progress(f"{stats['added'] + stats['updated'] + stats['errors']:,} of {len(changed):,} changed files read")
+
+        # Whatever is left in the manifest was not found on disk
+        if manifest:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany("DELETE FROM media_files WHERE path = ?", [(path,) for path in manifest])
+            cursor.execute("COMMIT")
+        stats['missing'] = len(manifest)
+        cursor.close()
+    except Exception:
+        if sqlite_connection.in_transaction:
+            sqlite_connection.execute("ROLLBACK")
+        raise
+    finally:
+        sqlite_connection.isolation_level = isolation_level
+        connection.close()
+
+    if stats['added'] or stats['updated']:
+        invalidate_catalog_cache()
+    for song_id in writer.stale_seek_tables:
+        seek_cache.invalidate('seek_table', song_id)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scan a media folder into the music catalog")
+    parser.add_argument("root", nargs="?", default=MEDIA_ROOT, help="media folder (default: public/Files)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    print(f"Scanning {args.root}...")
+    stats = scan_library(args.root, args.workers, progress=print)
+    print(f"\n{stats['files']:,} files in {stats['seconds']:.2f}s: {stats['added']:,} added, "
+          f"{stats['updated']:,} updated, {stats['unchanged']:,} unchanged, "
+          f"{stats['missing']:,} missing, {stats['errors']:,} unreadable")
@@ -0,0 +1,163 @@
+import re
+
+# Full-text index over the searchable song fields. The rowid of every entry
+# is the song id, so results join straight back onto the songs table.
+FTS_TABLE = 'songs_fts'
+
+# bm25() column weights: a title hit outranks an artist hit, which outranks an album hit
+BM25_WEIGHTS = (10.0, 5.0, 2.0)
+
+SEARCH_INDEX_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, artist, album,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS songs_fts_after_insert AFTER INSERT ON songs BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, title, artist, album)
+        VALUES (
+            new.id,
+            new.title,
+            (SELECT name FROM artists WHERE id = new.artist_id),
+            (SELECT title FROM albums WHERE id = new.album_id)
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS songs_fts_after_update
+    AFTER UPDATE OF title, artist_id, album_id ON songs BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, title, artist, album)
+        VALUES (
+            new.id,
+            new.title,
+            (SELECT name FROM artists WHERE id = new.artist_id),
+            (SELECT title FROM albums WHERE id = new.album_id)
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS songs_fts_after_delete AFTER DELETE ON songs BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS artists_fts_after_update AFTER UPDATE OF name ON artists BEGIN
+        UPDATE {FTS_TABLE} SET artist = new.name
+        WHERE rowid IN (SELECT id FROM songs WHERE artist_id = new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS albums_fts_after_update AFTER UPDATE OF title ON albums BEGIN
+        UPDATE {FTS_TABLE} SET album = new.title
+        WHERE rowid IN (SELECT id FROM songs WHERE album_id = new.id);
+    END
+    """,
+    # Persist the column weights so "ORDER BY rank" uses them
+    f"""
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank)
+    VALUES ('rank', 'bm25({", ".join(str(w) for w in BM25_WEIGHTS)})')
+    """,
+]
+
+# Same statements as one script, for raw sqlite3 executescript() callers such as setup.py
+SEARCH_INDEX_SCHEMA = ";\n".join(SEARCH_INDEX_STATEMENTS) + ";\n"
+
+REBUILD_SEARCH_INDEX_SQL = f"""
+INSERT INTO {FTS_TABLE} (rowid, title, artist, album)
+SELECT s.id, s.title, a.name, al.title
+FROM songs s
+JOIN artists a ON a.id = s.artist_id
+JOIN albums al ON al.id = s.album_id
+"""
+
+# Name of the trigger that indexes one song per INSERT; bulk loaders suspend
+# it and index a whole batch with INDEX_SONG_RANGE_SQL instead
+SONG_INSERT_TRIGGER = 'songs_fts_after_insert'
+
+INDEX_SONG_RANGE_SQL = REBUILD_SEARCH_INDEX_SQL + "WHERE s.id BETWEEN ? AND ?\n"
+
+_SEARCH_SONGS_TEMPLATE = f"""
+SELECT s.id, s.title, a.name AS artist, al.title AS album, g.name AS genre,
+       s.duration, s.file_path, {FTS_TABLE}.rank AS rank
+FROM {FTS_TABLE}
+JOIN songs s ON s.id = {FTS_TABLE}.rowid
+JOIN artists a ON a.id = s.artist_id
+JOIN albums al ON al.id = s.album_id
+LEFT JOIN genres g ON g.id = s.genre_id
+WHERE {FTS_TABLE} MATCH :match{{keyset}}
+ORDER BY {FTS_TABLE}.rank, s.id{{limit}}
+"""
+
+SEARCH_SONGS_SQL = _SEARCH_SONGS_TEMPLATE.format(keyset='', limit='')
+
+# Keyset pages continue after the (rank, id) of the previous page's last row
+SEARCH_SONGS_FIRST_PAGE_SQL = _SEARCH_SONGS_TEMPLATE.format(keyset='', limit='\nLIMIT :limit')
+
+SEARCH_SONGS_NEXT_PAGE_SQL = _SEARCH_SONGS_TEMPLATE.format(
+    keyset=f"""
+  AND ({FTS_TABLE}.rank > :after_rank
+       OR ({FTS_TABLE}.rank = :after_rank AND s.id > :after_id))""",
+    limit='\nLIMIT :limit'
+)
+
+# The table and triggers SEARCH_INDEX_STATEMENTS create
+SEARCH_INDEX_OBJECTS = {
+    name for statement in SEARCH_INDEX_STATEMENTS for name in re.findall(r'IF NOT EXISTS (\w+)', statement)
+}
+
+# Engines whose database is known to carry an up-to-date search index
+_ready_databases = set()
+
+def build_match_query(query):
+    """Turn free-form user input into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so "kend lam" matches
+    "Kendrick Lamar" and user input can never inject FTS5 query syntax.
+    Returns an empty string when the input has no searchable words.
+    """
+    terms = re.findall(r'\w+', query or '', re.UNICODE)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_index_exists(connection):
+    """Check whether the full-text index table exists"""
+    row = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    return row is not None
+
+def rebuild_search_index(connection):
+    """Repopulate the full-text index from the catalog tables"""
+    connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+    connection.exec_driver_sql(REBUILD_SEARCH_INDEX_SQL)
+
+def ensure_search_index(engine):
+    """Create the full-text index and its sync triggers if they are missing.
+
+    Databases created before the index existed get it built from the current
+    catalog on first use; after that the triggers keep it in sync.
+    """
+    key = str(engine.url)
+    if key in _ready_databases:
+        return
+
+    # Most databases already have it; checking first keeps read-only
+    # engines, which cannot run even CREATE ... IF NOT EXISTS, working
+    with engine.connect() as connection:
+        names = {row[0] for row in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    if SEARCH_INDEX_OBJECTS <= names:
+        _ready_databases.add(key)
+        return
+
+    with engine.begin() as connection:
+        existed = search_index_exists(connection)
+        for statement in SEARCH_INDEX_STATEMENTS:
+            connection.exec_driver_sql(statement)
+        if not existed:
+            rebuild_search_index(connection)
+
+    _ready_databases.add(key)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""Seek tables: precomputed time -> byte offset indexes for audio files.
+
+Without one, seeking inside a VBR MP3 means walking frame headers from the
+start of the file, and inside an M4A means expanding the stts/stsc/stsz/stco
+sample tables. Both are done once here, thinned to one entry per
+SEEK_RESOLUTION_MS and stored in the seek_indexes table keyed by song id.
+A seek is then one row read (cached afterwards) and a binary search.
+
+    python lib/seek.py            # index every song that has no table yet
+    python lib/seek.py --rebuild  # re-index everything
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.cache import TTLCache
+from lib.tags import (
+    TagError, find_atom, find_first_frame, frame_header, id3v1_size, id3v2_size, iter_atoms, vbr_header
+)
+
+# Keep at most one entry per this many milliseconds of audio. MP3 frames
+# and AAC samples last ~23-26 ms, so this shrinks the table ~10x while a
+# seek still lands within a quarter second of the requested time.
+SEEK_RESOLUTION_MS = 250
+
+# Seek tables kept in memory, by song id
+SEEK_CACHE_SIZE = 256
+SEEK_CACHE_TTL = 3600  # seconds
+
+seek_cache = TTLCache(SEEK_CACHE_SIZE, SEEK_CACHE_TTL)
+
+class SeekTable:
+    """Sorted entry times (ms) and the byte offset each entry starts at"""
+
+    __slots__ = ('format', 'file_size', 'mtime_ns', 'duration', 'audio_end', 'times', 'offsets')
+
+    def __init__(self, format, file_size, mtime_ns, duration, audio_end, times, offsets):
+        self.format = format
+        self.file_size = file_size
+        self.mtime_ns = mtime_ns
+        self.duration = duration
+        self.audio_end = audio_end
+        self.times = times
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.times)
+
+    def locate(self, seconds):
+        """Index of the last entry at or before a time, clamped to the table"""
+        return max(bisect_right(self.times, int(seconds * 1000)) - 1, 0)
+
+    def byte_range(self, seconds):
+        """(start, end) of the bytes holding the audio at a time, end inclusive.
+
+        start is where a player should resume reading; the range runs to the
+        next entry, so one read covers at least SEEK_RESOLUTION_MS of audio.
+        """
+        index = self.locate(seconds)
+        start = self.offsets[index]
+        if index + 1 < len(self.offsets):
+            return start, self.offsets[index + 1] - 1
+        return start, self.audio_end - 1
+
+def _mp3_frames(data):
+    """Yield (byte offset, seconds) for every audio frame in MP3 data.
+
+    Files that are several MP3s joined together carry an ID3 tag and a
+    Xing/Info frame at each seam; both are skipped, and the walk re-syncs
+    after any other garbage.
+    """
+    audio_end = len(data) - id3v1_size(data)
+    offset, header = find_first_frame(data, id3v2_size(data))
+    if header is None:
+        raise TagError("No MPEG audio frames found")
+
+    seconds = 0.0
+    end = offset
+    while header is not None and offset + 4 <= audio_end:
+        if not vbr_header(data, offset, header)[0]:  # a Xing/Info frame carries no audio
+            yield offset, seconds
+            seconds += header['samples'] / header['sample_rate']
+        offset += header['length']
+        end = offset
+
+        header = frame_header(data, offset)
+        if header is None:
+            offset, header = find_first_frame(data, offset + (id3v2_size(data, offset) or 1))
+
+    yield min(end, audio_end), seconds  # end marker: where the audio stops
+
+def _unpack_table(data, start, fields):
+    """Read a sample-table atom body: version/flags, entry count, entries"""
+    count = struct.unpack_from('>I', data, start + 4)[0]
+    values = struct.unpack_from(f'>{count * fields}I', data, start + 8)
+    return [values[i:i + fields] for i in range(0, len(values), fields)] if fields > 1 else list(values)
+
+def _mp4_samples(data):
+    """Yield (byte offset, seconds) for every sample of the first audio track"""
+    moov = find_atom(data, 0, len(data), b'moov')
+    if moov is None:
+        raise TagError("No moov atom found")
+
+    for kind, trak_start, trak_end in iter_atoms(data, moov[0], moov[1]):
+        if kind != b'trak':
+            continue
+        mdia = find_atom(data, trak_start, trak_end, b'mdia')
+        hdlr = mdia and find_atom(data, mdia[0], mdia[1], b'hdlr')
+        if not hdlr or data[hdlr[0] + 8:hdlr[0] + 12] != b'soun':
+            continue
+
+        mdhd = find_atom(data, mdia[0], mdia[1], b'mdhd')
+        if data[mdhd[0]] == 1:
+            timescale = struct.unpack_from('>I', data, mdhd[0] + 20)[0]
+        else:
+            timescale = struct.unpack_from('>I', data, mdhd[0] + 12)[0]
+        minf = find_atom(data, mdia[0], mdia[1], b'minf')
+        stbl = find_atom(data, minf[0], minf[1], b'stbl')
+        boxes = {kind: body for kind, body, _ in iter_atoms(data, stbl[0], stbl[1])}
+
+        time_to_sample = _unpack_table(data, boxes[b'stts'], 2)        # (count, delta)
+        sample_to_chunk = _unpack_table(data, boxes[b'stsc'], 3)       # (first chunk, samples, desc)
+        uniform_size, sample_count = struct.unpack_from('>II', data, boxes[b'stsz'] + 4)
+        if uniform_size:
+            sizes = [uniform_size] * sample_count
+        else:
+            sizes = struct.unpack_from(f'>{sample_count}I', data, boxes[b'stsz'] + 12)
+        if b'co64' in boxes:
+            count = struct.unpack_from('>I', data, boxes[b'co64'] + 4)[0]
+            chunk_offsets = struct.unpack_from(f'>{count}Q', data, boxes[b'co64'] + 8)
+        else:
+            chunk_offsets = _unpack_table(data, boxes[b'stco'], 1)
+
+        deltas = (delta for count, delta in time_to_sample for _ in range(count))
+        sample, ticks, rule = 0, 0, 0
+        offset = 0
+        for chunk, chunk_offset in enumerate(chunk_offsets, 1):
+            while rule + 1 < len(sample_to_chunk) and sample_to_chunk[rule + 1][0] <= chunk:
+                rule += 1
+            offset = chunk_offset
+            for _ in range(sample_to_chunk[rule][1]):
+                if sample >= sample_count:
+                    break
+                yield offset, ticks / timescale
+                offset += sizes[sample]
+                ticks += next(deltas, 0)
+                sample += 1
+
+        yield offset, ticks / timescale  # end marker: where the last sample stops
+        return
+
+    raise TagError("No audio track found")
+
+def build_seek_table(path, resolution_ms=SEEK_RESOLUTION_MS):
+    """Walk an MP3 or M4A file once and return its SeekTable"""
+    with open(path, 'rb') as file:
+        mtime_ns = os.fstat(file.fileno()).st_mtime_ns
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise TagError("File is empty")
+        try:
+            format = 'm4a' if data[4:8] == b'ftyp' else 'mp3'
+            entries = _mp4_samples(data) if format == 'm4a' else _mp3_frames(data)
+
+            times, offsets = array('I'), array('Q')
+            next_time = 0
+            audio_end, duration = 0, 0.0
+            for offset, seconds in entries:
+                audio_end, duration = offset, seconds
+                milliseconds = int(seconds * 1000)
+                if milliseconds >= next_time:
+                    times.append(milliseconds)
+                    offsets.append(offset)
+                    next_time = milliseconds + resolution_ms
+            file_size = len(data)
+        finally:
+            data.close()
+
+    # The end marker is not a seek target
+    if len(times) > 1 and offsets[-1] == audio_end:
+        times.pop()
+        offsets.pop()
+    if not times:
+        raise TagError("No audio frames found")
+    return SeekTable(format, file_size, mtime_ns, duration, audio_end, times, offsets)
+
+def _pack(values):
+    """Serialise an array little-endian, whatever the host byte order"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _unpack(typecode, blob):
+    values = array(typecode)
+    values.frombytes(blob)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def save_seek_table(connection, song_id, table):
+    """Store a song's seek table through a SQLAlchemy connection"""
+    connection.exec_driver_sql(
+        """
+        INSERT OR REPLACE INTO seek_indexes
+            (song_id, format, file_size, mtime_ns, duration, audio_end, times, offsets)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (song_id, table.format, table.file_size, table.mtime_ns, table.duration, table.audio_end,
+         _pack(table.times), _pack(table.offsets))
+    )
+    seek_cache.invalidate('seek_table', song_id)
+
+def index_song(song_id, engine=None):
+    """Build and store the seek table for one song; None if it has no file"""
+    from lib.db.engine import get_engine
+    from lib.scanner import disk_path
+
+    engine = engine or get_engine()
+    with engine.begin() as connection:
+        row = connection.exec_driver_sql("SELECT file_path FROM songs WHERE id = ?", (song_id,)).first()
+        if row is None or not row[0]:
+            return None
+        path = disk_path(row[0])
+        if path is None or not os.path.exists(path):
+            return None
+        table = build_seek_table(path)
+        save_seek_table(connection, song_id, table)
+    return table
+
+def get_seek_table(song_id, engine=None):
+    """Return a song's seek table from memory, the database, or by indexing the file.
+
+    A stored table is rebuilt when the file's size or mtime no longer match
+    the ones it was built from, as the scan manifest decides what to re-read.
+    Returns None for songs without a readable audio file.
+    """
+    table = seek_cache.get(('seek_table', song_id))
+    if table is not None:
+        return table
+
+    from lib.db.engine import get_engine
+    from lib.scanner import disk_path
+
+    engine = engine or get_engine()
+    with engine.connect() as connection:
+        row = connection.exec_driver_sql(
+            """
+            SELECT si.format, si.file_size, si.mtime_ns, si.duration, si.audio_end, si.times, si.offsets,
+                   s.file_path
+            FROM seek_indexes si JOIN songs s ON s.id = si.song_id
+            WHERE si.song_id = ?
+            """,
+            (song_id,)
+        ).first()
+
+    if row is not None:
+        path = disk_path(row[7]) if row[7] else None
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            stat = None
+        if stat is not None and (stat.st_size, stat.st_mtime_ns) == (row[1], row[2]):
+            table = SeekTable(row[0], row[1], row[2], row[3], row[4], _unpack('I', row[5]), _unpack('Q', row[6]))
+    if table is None:
+        try:
+            table = index_song(song_id, engine)
+        except (TagError, OSError, struct.error, KeyError, TypeError):
+            return None
+    if table is not None:
+        seek_cache.set(('seek_table', song_id), table)
+    return table
+
+def seek(song_id, seconds):
+    """Map a time in a song to the (start, end) byte range to read, or None"""
+    table = get_seek_table(song_id)
+    if table is None:
+        return None
+    return table.byte_range(seconds)
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from lib.db.engine import get_engine
+
+    parser = argparse.ArgumentParser(description="Build seek tables for the songs in the catalog")
+    parser.add_argument("--rebuild", action="store_true", help="re-index songs that already have a table")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    with engine.connect() as connection:
+        query = "SELECT id FROM songs WHERE file_path IS NOT NULL"
+        if not args.rebuild:
+            query += " AND id NOT IN (SELECT song_id FROM seek_indexes)"
+        song_ids = [row[0] for row in connection.exec_driver_sql(query)]
+
+    started = time.perf_counter()
+    indexed = 0
+    for song_id in song_ids:
+        try:
+            table = index_song(song_id, engine)
+        except (TagError, OSError, struct.error, KeyError, TypeError) as e:
+            print(f"Song {song_id}: {e}")
+            continue
+        if table is not None:
+            indexed += 1
+            print(f"Song {song_id}: {table.format}, {table.duration:.1f}s, {len(table)} entries, "
+                  f"{len(table) * 12:,} bytes")
+    print(f"\nIndexed {indexed} of {len(song_ids)} songs in {time.perf_counter() - started:.2f}s")
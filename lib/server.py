@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+"""Local HTTP API serving the catalog to the React frontend.
+
+One asyncio event loop holds every client connection; the blocking
+lib.helpers calls behind each route run on a fixed-size thread pool, so a
+slow query ties up a worker, never the loop. Listings are paged with
+opaque keyset cursors, responses carry an ETag, and clients that send it
+back in If-None-Match get an empty 304.
+
+    python lib/server.py                 # http://127.0.0.1:8000/api/songs
+    python lib/server.py --port 9000 --workers 16
+
+Routes (all GET/HEAD; JSON unless noted):
+    /api/songs                 ?limit=&after=
+    /api/songs/search          ?q=&limit=&after=
+    /api/tracks                ?q=&limit=&after=  db.json-shaped songs for the
+                               player, search results when q is given
+    /api/artists
+    /api/artists/<id>/songs    ?limit=&after=
+    /api/genres
+    /api/genres/<id>/songs     ?limit=&after=
+    /api/users/<id>/playlists
+    /api/playlists/<id>/songs  ?limit=&after=
+    /api/songs/<id>/stream     the audio file; supports Range requests
+    /api/covers/<size>/<path>  redirect to a square JPEG thumbnail of a cover
+                               under public/, e.g. /api/covers/256/Files/Boyz.jpg
+    /api/thumbnails/<name>     a thumbnail by content-hash name; immutable
+    /api/stats                 cache hit ratios and memory use
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib import helpers
+from lib.cache import ChunkCache, TTLCache, catalog_cache
+from lib.scanner import WEB_ROOT, disk_path
+from lib.thumbnails import IMAGE_EXTENSIONS, THUMBNAIL_SIZES, ThumbnailCache, ThumbnailError
+
+API_HOST = os.environ.get('MUSIC_API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('MUSIC_API_PORT', '8000'))
+
+# Threads running blocking helper calls; SQLite readers scale to a few per core
+API_WORKERS = 8
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Thumbnail size /api/tracks links covers at; one of THUMBNAIL_SIZES
+TRACK_COVER_SIZE = 256
+
+# Encoded responses are reused for this long, so a burst of listeners
+# opening the app costs one query and one json.dumps per page
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 5  # seconds
+
+# Bodies smaller than this are sent uncompressed
+GZIP_MIN_SIZE = 1024
+
+# Audio files kept open between requests, so a stream costs no open()/stat()
+FILE_CACHE_SIZE = 256
+FILE_REVALIDATE_AFTER = 30  # seconds before an open file is checked against the disk
+
+# A file is served from the in-memory chunk cache instead of sendfile once
+# this many distinct listeners streamed it within HOT_FILE_WINDOW. A
+# listener's own Range and seek requests count once, so the cache holds
+# genuinely popular tracks rather than every file played twice.
+HOT_FILE_LISTENERS = 8
+HOT_FILE_WINDOW = 300  # seconds
+CHUNK_CACHE_BUDGET = int(os.environ.get('MUSIC_CHUNK_CACHE_MB', '64')) * 1024 * 1024
+
+# Audio is immutable per ETag, so browsers and proxies may keep it a day
+AUDIO_CACHE_CONTROL = 'public, max-age=86400'
+
+# Thumbnail names change with the cover's content, so they never go stale
+THUMBNAIL_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+MAX_HEADER_SIZE = 16384
+KEEP_ALIVE_TIMEOUT = 15  # seconds a client may idle between requests
+
+STATUS_TEXT = {
+    200: 'OK', 206: 'Partial Content', 302: 'Found', 304: 'Not Modified', 400: 'Bad Request',
+    404: 'Not Found', 405: 'Method Not Allowed', 416: 'Range Not Satisfiable',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+
+response_cache = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# Shared by the event loop and the worker threads that fill it
+chunk_cache = ChunkCache(CHUNK_CACHE_BUDGET)
+
+thumbnail_cache = ThumbnailCache()
+
+class HTTPError(Exception):
+    """Raised by a route to answer with an error status and message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# --- Routes ------------------------------------------------------------------
+
+ROUTES = []
+
+def route(pattern):
+    """Register a blocking handler for GET requests whose path matches pattern.
+
+    The handler is called on the worker pool with the parsed query string and
+    the pattern's groups, and returns a JSON-serialisable value.
+    """
+    def decorator(func):
+        ROUTES.append((re.compile(pattern + '$'), func))
+        return func
+    return decorator
+
+def encode_cursor(cursor):
+    """Turn a helper's next_cursor into an opaque URL-safe token"""
+    if cursor is None:
+        return None
+    raw = json.dumps(cursor, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; lists come back as the tuples helpers expect"""
+    if not token:
+        return None
+    try:
+        value = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        raise HTTPError(400, "Invalid cursor")
+    return tuple(value) if isinstance(value, list) else value
+
+def page_args(params):
+    """(after, limit) from ?after=&limit=, with limit clamped to MAX_PAGE_SIZE"""
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise HTTPError(400, "limit must be a number")
+    return decode_cursor(params.get('after')), max(1, min(limit, MAX_PAGE_SIZE))
+
+def page_body(page, convert=None):
+    """JSON body for a (records, next_cursor) page"""
+    records, next_cursor = page
+    convert = convert or (lambda record: record.to_dict())
+    return {'items': [convert(record) for record in records], 'next': encode_cursor(next_cursor)}
+
+def format_duration(seconds):
+    """227.0 -> "3:47", the format db.json uses"""
+    if seconds is None:
+        return None
+    seconds = int(round(seconds))
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def cover_url(cover_image, size=TRACK_COVER_SIZE):
+    """The /api/covers URL of a cover stored under the web root, or None"""
+    if not cover_image:
+        return None
+    return f"/api/covers/{size}/{quote(cover_image.lstrip('./'))}"
+
+def track_dict(song, covers):
+    """A song in the shape of a public/db.json entry, for the player.
+
+    file and cover are API URLs the browser can load: the audio stream and
+    the cover thumbnail. covers maps song IDs to cover_image paths.
+    """
+    return {
+        'id': song.id,
+        'file': f"/api/songs/{song.id}/stream",
+        'cover': cover_url(covers.get(song.id)),
+        'title': song.title,
+        'artist': song.artist,
+        'album': song.album,
+        'genre': song.genre,
+        'duration': format_duration(song.duration),
+    }
+
+@route(r'/api/songs')
+def songs_route(params):
+    return page_body(helpers.get_all_songs_page(*page_args(params)))
+
+@route(r'/api/songs/search')
+def search_route(params):
+    query = params.get('q', '').strip()
+    if not query:
+        raise HTTPError(400, "Missing search query ?q=")
+    return page_body(helpers.search_songs_page(query, *page_args(params)))
+
+@route(r'/api/tracks')
+def tracks_route(params):
+    query = params.get('q', '').strip()
+    if query:
+        songs, next_cursor = helpers.search_songs_page(query, *page_args(params))
+    else:
+        songs, next_cursor = helpers.get_all_songs_page(*page_args(params))
+    covers = helpers.get_song_covers(song.id for song in songs)
+    return page_body((songs, next_cursor), lambda song: track_dict(song, covers))
+
+@route(r'/api/artists')
+def artists_route(params):
+    return {'items': [artist.to_dict() for artist in helpers.get_all_artists()]}
+
+@route(r'/api/artists/(\d+)/songs')
+def artist_songs_route(params, artist_id):
+    return page_body(helpers.get_artist_songs_page(int(artist_id), *page_args(params)))
+
+@route(r'/api/genres')
+def genres_route(params):
+    return {'items': [genre.to_dict() for genre in helpers.get_all_genres()]}
+
+@route(r'/api/genres/(\d+)/songs')
+def genre_songs_route(params, genre_id):
+    return page_body(helpers.get_songs_by_genre_page(int(genre_id), *page_args(params)))
+
+@route(r'/api/users/(\d+)/playlists')
+def user_playlists_route(params, user_id):
+    return {'items': [playlist.to_dict() for playlist in helpers.get_user_playlists(int(user_id))]}
+
+@route(r'/api/playlists/(\d+)/songs')
+def playlist_songs_route(params, playlist_id):
+    return page_body(helpers.get_playlist_songs_page(int(playlist_id), *page_args(params)))
+
+@route(r'/api/stats')
+def stats_route(params):
+    return {
+        'catalog_cache': catalog_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'chunk_cache': chunk_cache.stats(),
+        'thumbnail_cache': thumbnail_cache.stats(),
+    }
+
+def render(path, query):
+    """Run the route for a path and return (etag, body, gzipped body or None).
+
+    Runs on the worker pool. Results are kept for RESPONSE_CACHE_TTL seconds.
+    """
+    key = ('response', path, query)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    for pattern, handler in ROUTES:
+        match = pattern.match(path)
+        if match:
+            break
+    else:
+        raise HTTPError(404, f"No route for {path}")
+
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    value = handler(params, *match.groups())
+    body = json.dumps(value, separators=(',', ':'), default=str).encode()
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    compressed = gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_SIZE else None
+
+    result = (etag, body, compressed)
+    response_cache.set(key, result)
+    return result
+
+# --- Audio -------------------------------------------------------------------
+
+STREAM_ROUTE = re.compile(r'/api/songs/(\d+)/stream$')
+
+class OpenFile:
+    """An open audio file and the response headers that describe it"""
+
+    __slots__ = ('path', 'file', 'size', 'mtime_ns', 'etag', 'last_modified',
+                 'content_type', 'checked_at', 'users', 'evicted')
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb', buffering=0)
+        stat = os.fstat(self.file.fileno())
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        # Sniff the container; some .mp3 files in public/Files are M4A
+        magic = os.pread(self.file.fileno(), 8, 0)
+        self.content_type = 'audio/mp4' if magic[4:8] == b'ftyp' else 'audio/mpeg'
+        self.checked_at = time.monotonic()
+        self.users = 0
+        self.evicted = False
+
+    def is_current(self):
+        """Whether the file on disk is still the one that is open"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+class FileCache:
+    """LRU cache of open audio files keyed by song id.
+
+    Used from the event loop thread only. A file evicted while a stream is
+    still sending from it is closed when that stream releases it.
+    """
+
+    def __init__(self, maxsize=FILE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._files = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, song_id):
+        """Return the cached, still-current file for a song and mark it in use"""
+        entry = self._files.get(song_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry.checked_at > FILE_REVALIDATE_AFTER:
+            if not entry.is_current():
+                self._evict(song_id)
+                self.misses += 1
+                return None
+            entry.checked_at = time.monotonic()
+        self._files.move_to_end(song_id)
+        self.hits += 1
+        entry.users += 1
+        return entry
+
+    def add(self, song_id, entry):
+        """Cache a newly opened file, already marked in use"""
+        if song_id in self._files:
+            self._evict(song_id)
+        self._files[song_id] = entry
+        entry.users += 1
+        while len(self._files) > self.maxsize:
+            self._evict(next(iter(self._files)))
+
+    def release(self, entry):
+        entry.users -= 1
+        if entry.evicted and entry.users == 0:
+            entry.file.close()
+
+    def _evict(self, song_id):
+        entry = self._files.pop(song_id)
+        entry.evicted = True
+        if entry.users == 0:
+            entry.file.close()
+
+    def close(self):
+        for song_id in list(self._files):
+            self._evict(song_id)
+
+class Popularity:
+    """Distinct listeners per song over a sliding time window.
+
+    Used from the event loop thread only. Songs nobody asked for within the
+    window are forgotten, so memory follows what is being played now.
+    """
+
+    def __init__(self, window=HOT_FILE_WINDOW):
+        self.window = window
+        # song id -> OrderedDict(listener -> last request time), both least recent first
+        self._songs = OrderedDict()
+
+    def record(self, song_id, listener, now=None):
+        """Note a request and return how many listeners asked within the window"""
+        now = time.monotonic() if now is None else now
+        while self._songs:
+            oldest = next(iter(self._songs.values()))
+            if now - next(reversed(oldest.values())) <= self.window:
+                break
+            self._songs.popitem(last=False)
+
+        listeners = self._songs.pop(song_id, None) or OrderedDict()
+        listeners.pop(listener, None)
+        listeners[listener] = now
+        while now - next(iter(listeners.values())) > self.window:
+            listeners.popitem(last=False)
+        self._songs[song_id] = listeners
+        return len(listeners)
+
+def listener_id(writer, headers):
+    """Who is asking: the peer's host and user agent, so one player's range
+    requests over several connections count as one listener"""
+    peer = writer.get_extra_info('peername')
+    host = peer[0] if isinstance(peer, tuple) else peer
+    return host, headers.get('user-agent', '')
+
+def open_song_file(song_id):
+    """Open a song's audio file; runs on the worker pool. None if there is none"""
+    path = disk_path(helpers.get_song_file_path(song_id) or '')
+    if path is None:
+        return None
+    try:
+        return OpenFile(path)
+    except OSError:
+        return None
+
+def parse_range(header, size):
+    """Resolve a Range header to an inclusive (start, end) byte range.
+
+    Returns None to send the whole file (no header, a unit other than bytes,
+    or several ranges) and raises HTTPError(416) for an unsatisfiable range.
+    """
+    match = re.fullmatch(r'\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*', header or '')
+    if not match or not any(match.groups()):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise HTTPError(416, "Range not satisfiable")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise HTTPError(416, "Range not satisfiable")
+    return start, end
+
+# --- Covers ------------------------------------------------------------------
+
+COVER_ROUTE = re.compile(r'/api/covers/(\d+)(/.+)$')
+THUMBNAIL_ROUTE = re.compile(r'/api/thumbnails/([0-9a-f]{32}-\d+\.jpg)$')
+
+def resolve_cover(size, path):
+    """Thumbnail name for an image under the web root; runs on the worker pool.
+
+    Generates the thumbnails on a cold miss. Paths outside the web root and
+    files that are not images are reported as missing.
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPError(400, f"Thumbnail size must be one of {', '.join(map(str, THUMBNAIL_SIZES))}")
+    web_root = os.path.realpath(WEB_ROOT)
+    source = os.path.realpath(os.path.join(web_root, path.lstrip('/')))
+    if (not source.startswith(web_root + os.sep) or not source.lower().endswith(IMAGE_EXTENSIONS)
+            or not os.path.isfile(source)):
+        raise HTTPError(404, f"No cover image at {path}")
+    try:
+        return thumbnail_cache.get(source, size)
+    except ThumbnailError as e:
+        raise HTTPError(500, str(e))
+
+# --- HTTP --------------------------------------------------------------------
+
+def response_head(status, headers):
+    """Serialise a status line and headers"""
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+def error_response(status, message, keep_alive):
+    body = json.dumps({'error': message}).encode()
+    headers = {
+        'Content-Type': 'application/json',
+        'Content-Length': len(body),
+        'Connection': 'keep-alive' if keep_alive else 'close',
+        'Access-Control-Allow-Origin': '*',
+    }
+    return response_head(status, headers) + body
+
+async def read_request(reader):
+    """Read one request head; returns (method, target, version, headers) or None on EOF"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Request headers too large")
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+class APIServer:
+    """Accepts connections and dispatches requests to the route handlers"""
+
+    def __init__(self, workers=API_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self.files = FileCache()
+        self.popularity = Popularity()
+        self.requests = 0
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    writer.write(error_response(e.status, e.message, False))
+                    break
+                if request is None:
+                    break
+
+                method, target, version, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                path = unquote(urlsplit(target).path)
+                stream = STREAM_ROUTE.match(path)
+                if stream and method in ('GET', 'HEAD'):
+                    await self.stream(writer, method, int(stream.group(1)), headers, keep_alive)
+                elif path.startswith(('/api/covers/', '/api/thumbnails/')) and method in ('GET', 'HEAD'):
+                    writer.write(await self.cover(method, path, headers, keep_alive))
+                else:
+                    writer.write(await self.respond(method, target, headers, keep_alive))
+                await writer.drain()
+                self.requests += 1
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, headers, keep_alive):
+        """Build the full response bytes for one request"""
+        if method not in ('GET', 'HEAD'):
+            return error_response(405, f"Method {method} not allowed", keep_alive)
+
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip('/') or '/'
+        loop = asyncio.get_running_loop()
+        try:
+            etag, body, compressed = await loop.run_in_executor(self.executor, render, path, url.query)
+        except HTTPError as e:
+            return error_response(e.status, e.message, keep_alive)
+        except Exception as e:
+            print(f"Error serving {target}: {e}", file=sys.stderr)
+            return error_response(500, "Internal server error", keep_alive)
+
+        response_headers = {
+            'ETag': etag,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            'Access-Control-Allow-Origin': '*',
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }
+        if etag in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+            return response_head(304, response_headers)
+
+        if compressed is not None and 'gzip' in headers.get('accept-encoding', ''):
+            body = compressed
+            response_headers['Content-Encoding'] = 'gzip'
+        response_headers['Content-Type'] = 'application/json'
+        response_headers['Content-Length'] = len(body)
+        head = response_head(200, response_headers)
+        return head if method == 'HEAD' else head + body
+
+    async def stream(self, writer, method, song_id, headers, keep_alive):
+        """Send a song's audio file, or the requested byte range of it.
+
+        Cold files go from the page cache to the socket with os.sendfile (via
+        loop.sendfile), never through Python buffers; files that
+        HOT_FILE_LISTENERS listeners streamed within HOT_FILE_WINDOW are
+        served from the shared chunk cache.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self.files.get(song_id)
+        if entry is None:
+            entry = await loop.run_in_executor(self.executor, open_song_file, song_id)
+            if entry is None:
+                writer.write(error_response(404, f"No audio file for song {song_id}", keep_alive))
+                return
+            self.files.add(song_id, entry)
+        hot = self.popularity.record(song_id, listener_id(writer, headers)) >= HOT_FILE_LISTENERS
+
+        try:
+            response_headers = {
+                'Accept-Ranges': 'bytes',
+                'ETag': entry.etag,
+                'Last-Modified': entry.last_modified,
+                'Cache-Control': AUDIO_CACHE_CONTROL,
+                'Access-Control-Allow-Origin': '*',
+                'Connection': 'keep-alive' if keep_alive else 'close',
+            }
+            if entry.etag in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+                writer.write(response_head(304, response_headers))
+                return
+
+            # If-Range: only honour the range if the client's copy is current
+            byte_range = None
+            if headers.get('if-range', entry.etag) == entry.etag:
+                try:
+                    byte_range = parse_range(headers.get('range'), entry.size)
+                except HTTPError as e:
+                    response_headers['Content-Range'] = f"bytes */{entry.size}"
+                    response_headers['Content-Length'] = 0
+                    writer.write(response_head(e.status, response_headers))
+                    return
+
+            status, (start, end) = (206, byte_range) if byte_range else (200, (0, entry.size - 1))
+            if status == 206:
+                response_headers['Content-Range'] = f"bytes {start}-{end}/{entry.size}"
+            response_headers['Content-Type'] = entry.content_type
+            response_headers['Content-Length'] = end - start + 1
+            writer.write(response_head(status, response_headers))
+
+            if method == 'GET' and end >= start:
+                if hot:
+                    await self.send_chunks(writer, entry, start, end)
+                else:
+                    await loop.sendfile(writer.transport, entry.file, start, end - start + 1)
+        finally:
+            self.files.release(entry)
+
+    async def send_chunks(self, writer, entry, start, end):
+        """Send bytes start..end of a hot file from chunk_cache.
+
+        Cached chunks are written straight from the event loop; misses are
+        read on the worker pool into chunk_cache's probation segment, and
+        only a later request reading them again promotes them.
+        """
+        loop = asyncio.get_running_loop()
+        key = (entry.path, entry.etag)
+        fd = entry.file.fileno()
+        for index in chunk_cache.chunk_range(start, end):
+            data = chunk_cache.get(key, index)
+            if data is None:
+                data = await loop.run_in_executor(self.executor, chunk_cache.load, key, fd, index)
+            offset = index * chunk_cache.chunk_size
+            writer.write(memoryview(data)[max(start - offset, 0):end - offset + 1])
+            await writer.drain()
+
+    async def cover(self, method, path, headers, keep_alive):
+        """Redirect a cover path to its thumbnail, or send a thumbnail by name"""
+        loop = asyncio.get_running_loop()
+        response_headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }
+        cover = COVER_ROUTE.match(path)
+        if cover:
+            try:
+                name = await loop.run_in_executor(self.executor, resolve_cover, int(cover.group(1)), cover.group(2))
+            except HTTPError as e:
+                return error_response(e.status, e.message, keep_alive)
+            response_headers['Location'] = f"/api/thumbnails/{name}"
+            response_headers['Cache-Control'] = 'no-cache'
+            response_headers['Content-Length'] = 0
+            return response_head(302, response_headers)
+
+        thumbnail = THUMBNAIL_ROUTE.match(path)
+        if not thumbnail:
+            return error_response(404, f"No route for {path}", keep_alive)
+        name = thumbnail.group(1)
+        response_headers['ETag'] = f'"{name}"'
+        response_headers['Cache-Control'] = THUMBNAIL_CACHE_CONTROL
+        if response_headers['ETag'] in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+            return response_head(304, response_headers)
+
+        body = await loop.run_in_executor(self.executor, thumbnail_cache.open, name)
+        if body is None:
+            return error_response(404, f"No thumbnail {name}", keep_alive)
+        response_headers['Content-Type'] = 'image/jpeg'
+        response_headers['Content-Length'] = len(body)
+        head = response_head(200, response_headers)
+        return head if method == 'HEAD' else head + body
+
+    async def serve(self, host=API_HOST, port=API_PORT):
+        server = await asyncio.start_server(
+            self.handle_connection, host, port, limit=MAX_HEADER_SIZE, backlog=4096
+        )
+        print(f"Serving the music catalog on http://{host}:{port}/api/songs")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the music catalog over HTTP")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="threads for database calls")
+    parser.add_argument("--chunk-cache-mb", type=int, default=CHUNK_CACHE_BUDGET // (1024 * 1024),
+                        help="memory for hot audio chunks")
+    args = parser.parse_args()
+
+    chunk_cache.resize(args.chunk_cache_mb * 1024 * 1024)
+
+    server = APIServer(args.workers)
+    started = time.perf_counter()
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        elapsed = time.perf_counter() - started
+        print(f"\nServed {server.requests:,} requests in {elapsed:.0f}s")
+    finally:
+        server.files.close()
+        server.executor.shutdown(wait=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""Header-only tag and duration reader for MP3 and M4A files.
+
+Files are memory-mapped and only the metadata regions are touched: the
+ID3v2 tag, the first MPEG frame and its Xing/VBRI header (plus the ID3v1
+trailer) for MP3, and the moov/mvhd and ilst atoms for M4A. The audio
+payload is never read, so parsing cost does not grow with file length.
+
+The container is detected from the file contents rather than the
+extension; several files in public/Files named .mp3 are really M4A.
+"""
+
+import mmap
+import re
+import struct
+
+class TagError(Exception):
+    """Raised when a file is not a readable MP3 or M4A"""
+
+def empty_tags():
+    """Every field read_tags() returns, unset"""
+    return {
+        'format': None, 'title': None, 'artist': None, 'album': None,
+        'genre': None, 'year': None, 'duration': None,
+    }
+
+def read_tags(path):
+    """Read title, artist, album, genre, year and duration (seconds) from a file.
+
+    Fields the file does not carry are None. Raises TagError for files that
+    are neither MP3 nor M4A, and OSError if the file cannot be opened.
+    """
+    with open(path, 'rb') as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise TagError("File is empty")
+        try:
+            if data[4:8] == b'ftyp':
+                tags = read_mp4(data)
+            else:
+                tags = read_mp3(data)
+        finally:
+            data.close()
+
+    # "2019", "2019-05-01" and "2019-05-01T00:00:00Z" all become 2019
+    year = re.match(r'\d{4}', tags['year'] or '')
+    tags['year'] = int(year.group()) if year else None
+    return tags
+
+# --- MP3 ---------------------------------------------------------------------
+
+# ID3v2 frame IDs for each field; v2.2 uses three-character IDs
+ID3_FRAMES = {
+    'TIT2': 'title', 'TT2': 'title',
+    'TPE1': 'artist', 'TP1': 'artist',
+    'TALB': 'album', 'TAL': 'album',
+    'TCON': 'genre', 'TCO': 'genre',
+    'TYER': 'year', 'TYE': 'year', 'TDRC': 'year',
+    'TLEN': 'length', 'TLE': 'length',
+}
+
+ID3_ENCODINGS = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be', 3: 'utf-8'}
+
+# Bitrates in kbit/s by [MPEG-1?][layer][index]
+MPEG_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Sample rates by MPEG version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# How far past the ID3 tag to look for the first frame before giving up
+FRAME_SEARCH_LIMIT = 65536
+
+def _syncsafe(data):
+    """Decode a 28-bit "syncsafe" integer (7 bits per byte)"""
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+def _decode_text(payload):
+    """Decode an ID3v2 text frame, keeping the first of several values"""
+    if not payload:
+        return None
+    encoding = ID3_ENCODINGS.get(payload[0], 'latin-1')
+    body = payload[1:]
+    try:
+        text = body.decode(encoding)
+    except UnicodeDecodeError:
+        text = body.decode('latin-1')
+    text = text.split('\x00')[0].strip()
+    return text or None
+
+def id3v2_size(data, offset=0):
+    """Size of the ID3v2 tag starting at offset, or 0 if there is none"""
+    if data[offset:offset + 3] != b'ID3' or offset + 10 > len(data):
+        return 0
+    size = 10 + _syncsafe(data[offset + 6:offset + 10])
+    if data[offset + 5] & 0x10:
+        size += 10  # footer
+    return size
+
+def _read_id3v2(data, tags):
+    """Fill tags from an ID3v2 tag at the start of data; return where audio starts"""
+    end = id3v2_size(data)
+    if not end:
+        return 0
+
+    major, flags = data[3], data[5]
+    body = data[10:min(end, len(data))]
+
+    if flags & 0x80 and major < 4:
+        body = body.replace(b'\xff\x00', b'\xff')  # undo tag-wide unsynchronisation
+    if flags & 0x40:
+        if major == 4:
+            body = body[_syncsafe(body[:4]):]
+        else:
+            body = body[4 + struct.unpack('>I', body[:4])[0]:]
+
+    if major == 2:
+        id_size, header_size = 3, 6
+    else:
+        id_size, header_size = 4, 10
+
+    offset = 0
+    while offset + header_size <= len(body):
+        frame_id = body[offset:offset + id_size]
+        if not frame_id.strip(b'\x00') or not frame_id.isalnum():
+            break  # padding
+        if major == 2:
+            size = int.from_bytes(body[offset + 3:offset + 6], 'big')
+        elif major == 4:
+            size = _syncsafe(body[offset + 4:offset + 8])
+        else:
+            size = struct.unpack('>I', body[offset + 4:offset + 8])[0]
+
+        field = ID3_FRAMES.get(frame_id.decode('latin-1'))
+        if field and not tags.get(field):
+            tags[field] = _decode_text(body[offset + header_size:offset + header_size + size])
+        offset += header_size + size
+
+    return end
+
+def id3v1_size(data):
+    """Size of the ID3v1 trailer at the end of data (0 or 128)"""
+    return 128 if len(data) >= 128 and data[-128:-125] == b'TAG' else 0
+
+def _read_id3v1(data, tags):
+    """Fill missing fields from an ID3v1 trailer; return its size (0 or 128)"""
+    if not id3v1_size(data):
+        return 0
+
+    trailer = data[-128:]
+    for field, start, length in (('title', 3, 30), ('artist', 33, 30), ('album', 63, 30), ('year', 93, 4)):
+        if not tags.get(field):
+            value = trailer[start:start + length].split(b'\x00')[0].decode('latin-1').strip()
+            tags[field] = value or None
+    return 128
+
+def frame_header(data, offset):
+    """Parse the MPEG audio frame header at offset, or return None"""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = MPEG_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or mpeg1 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+
+    return {
+        'mpeg1': mpeg1,
+        'mono': (b3 >> 6) == 3,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'samples': samples,
+        'length': length,
+    }
+
+def find_first_frame(data, start):
+    """Find the first frame header after start that is followed by another"""
+    limit = min(len(data), start + FRAME_SEARCH_LIMIT)
+    offset = data.find(b'\xff', start, limit)
+    while offset != -1:
+        header = frame_header(data, offset)
+        if header and header['length'] > 0:
+            following = offset + header['length']
+            if following + 4 > len(data) or frame_header(data, following):
+                return offset, header
+        offset = data.find(b'\xff', offset + 1, limit)
+    return None, None
+
+def vbr_header(data, offset, header):
+    """Look for a Xing/Info or VBRI header in the frame at offset.
+
+    Returns (found, frames): whether the frame is such a header (it then
+    carries no audio) and the stream's frame count, if the header has one.
+    """
+    if header['mpeg1']:
+        side_info = 17 if header['mono'] else 32
+    else:
+        side_info = 9 if header['mono'] else 17
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        if struct.unpack('>I', data[xing + 4:xing + 8])[0] & 0x01:
+            return True, struct.unpack('>I', data[xing + 8:xing + 12])[0]
+        return True, None
+    if data[offset + 36:offset + 40] == b'VBRI':
+        return True, struct.unpack('>I', data[offset + 50:offset + 54])[0]
+    return False, None
+
+def _tlen_seconds(value):
+    """A TLEN frame (milliseconds) in seconds; None if missing or not a positive number"""
+    try:
+        milliseconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not 0 < milliseconds < float('inf'):
+        return None
+    return milliseconds / 1000
+
+def read_mp3(data):
+    """Read tags and duration from MPEG audio (MP3) data"""
+    tags = empty_tags()
+    audio_start = _read_id3v2(data, tags)
+    audio_end = len(data) - _read_id3v1(data, tags)
+
+    offset, header = find_first_frame(data, audio_start)
+    if header is None:
+        raise TagError("No MPEG audio frames found")
+    tags['format'] = 'mp3'
+
+    _, frames = vbr_header(data, offset, header)
+    length = _tlen_seconds(tags.get('length'))
+    if frames:
+        tags['duration'] = frames * header['samples'] / header['sample_rate']
+    elif length:
+        tags['duration'] = length
+    else:
+        # Constant bitrate: the audio size gives the duration directly
+        tags['duration'] = (audio_end - offset) * 8 / header['bitrate']
+
+    tags.pop('length', None)
+    if tags['genre']:
+        # "(17)Rock" or a bare numeric ID3v1 reference; keep only the text
+        tags['genre'] = re.sub(r'^(\(\d+\))+', '', tags['genre']).strip() or None
+    return tags
+
+# --- M4A / MP4 ---------------------------------------------------------------
+
+# iTunes-style metadata item atoms inside moov/udta/meta/ilst
+MP4_ITEMS = {
+    b'\xa9nam': 'title',
+    b'\xa9ART': 'artist',
+    b'\xa9alb': 'album',
+    b'\xa9gen': 'genre',
+    b'\xa9day': 'year',
+}
+
+def iter_atoms(data, start, end):
+    """Yield (type, body_start, atom_end) for the atoms between start and end"""
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack('>I4s', data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            break
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+def find_atom(data, start, end, kind):
+    """Return (body_start, atom_end) of the first child atom of a type, or None"""
+    for child, body, child_end in iter_atoms(data, start, end):
+        if child == kind:
+            return body, child_end
+    return None
+
+def _read_ilst(data, start, end, tags):
+    """Fill tags from the items of an ilst atom"""
+    for kind, body, item_end in iter_atoms(data, start, end):
+        field = MP4_ITEMS.get(kind)
+        if field is None:
+            continue
+        found = find_atom(data, body, item_end, b'data')
+        if found is None:
+            continue
+        # data atom: 4-byte type indicator, 4-byte locale, then the value
+        value_start, value_end = found[0] + 8, found[1]
+        value = bytes(data[value_start:value_end]).decode('utf-8', 'replace').strip('\x00 ')
+        tags[field] = value or None
+
+def read_mp4(data):
+    """Read tags and duration from MPEG-4 audio (M4A) data"""
+    tags = empty_tags()
+    moov = find_atom(data, 0, len(data), b'moov')
+    if moov is None:
+        raise TagError("No moov atom found")
+    tags['format'] = 'm4a'
+
+    mvhd = find_atom(data, moov[0], moov[1], b'mvhd')
+    if mvhd:
+        start = mvhd[0]
+        if data[start] == 1:
+            timescale, duration = struct.unpack('>IQ', data[start + 20:start + 32])
+        else:
+            timescale, duration = struct.unpack('>II', data[start + 12:start + 20])
+        if timescale:
+            tags['duration'] = duration / timescale
+
+    udta = find_atom(data, moov[0], moov[1], b'udta')
+    meta = udta and find_atom(data, udta[0], udta[1], b'meta')
+    if meta:
+        # meta is a full box: skip its version and flags
+        ilst = find_atom(data, meta[0] + 4, meta[1], b'ilst')
+        if ilst:
+            _read_ilst(data, ilst[0], ilst[1], tags)
+    return tags
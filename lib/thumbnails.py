@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""Cover-art thumbnails cached on disk under content-hash names.
+
+Each cover image is scaled and centre-cropped to square JPEGs of the
+THUMBNAIL_SIZES once, on a process pool for large batches, and written to
+THUMBNAIL_ROOT as <hash of the source bytes>-<size>.jpg. Identical covers
+share one set of thumbnails, and a changed cover gets new names, so the
+files can be served as immutable. An index maps each source path (with its
+size and mtime) to its hash, so a warm lookup is a stat and two dict reads.
+The directory is capped at THUMBNAIL_CACHE_MAX_BYTES; least recently used
+thumbnails are deleted first.
+
+Needs Pillow (pip install pillow).
+
+    python lib/thumbnails.py              # every image in public/Files
+    python lib/thumbnails.py cover.jpg --sizes 64 256
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.scanner import MEDIA_ROOT, POOL_THRESHOLD
+
+THUMBNAIL_SIZES = (64, 256, 512)
+THUMBNAIL_QUALITY = 82
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.jfif', '.png', '.webp', '.gif')
+
+THUMBNAIL_ROOT = os.environ.get('MUSIC_THUMBNAIL_DIR', os.path.join(project_root, 'lib', 'db', 'thumbnails'))
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Source images handed to a worker at a time
+POOL_CHUNK_SIZE = 8
+
+INDEX_FILE = 'index.json'
+
+class ThumbnailError(Exception):
+    """Raised when a thumbnail cannot be produced"""
+
+def content_hash(path):
+    """Hex digest naming the thumbnails of an image file"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def thumbnail_name(digest, size):
+    return f"{digest}-{size}.jpg"
+
+def _replace_file(target, write, mode='wb', encoding=None):
+    """Write target through a temporary file beside it, then rename it in place.
+
+    The temporary name is unique per call, so worker threads of one process
+    writing the same thumbnail never share a file, and readers only ever see
+    a complete one.
+    """
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as file:
+            write(file)
+        os.replace(temporary, target)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+
+def render_thumbnails(job):
+    """Write every requested size of one source image; runs in a worker.
+
+    job is (source path, digest, sizes, root). Returns (digest, [(name,
+    bytes written)], error message or None).
+    """
+    path, digest, sizes, root = job
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return digest, [], "Pillow is not installed (pip install pillow)"
+
+    written = []
+    try:
+        with Image.open(path) as image:
+            # Let the JPEG decoder skip detail the largest thumbnail cannot use
+            image.draft('RGB', (max(sizes), max(sizes)))
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            # Largest first, each smaller size scaled from the one before
+            for size in sorted(sizes, reverse=True):
+                name = thumbnail_name(digest, size)
+                target = os.path.join(root, name)
+                image = thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+                _replace_file(target, lambda file: thumbnail.save(
+                    file, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=size >= 256))
+                written.append((name, os.path.getsize(target)))
+    except (OSError, ValueError) as e:
+        return digest, written, str(e)
+    return digest, written, None
+
+def render_all(jobs, workers=None):
+    """Yield render_thumbnails() results, on a process pool for large batches"""
+    if len(jobs) < POOL_THRESHOLD or workers == 1:
+        for job in jobs:
+            yield render_thumbnails(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(render_thumbnails, jobs, chunksize=POOL_CHUNK_SIZE)
+
+class ThumbnailCache:
+    """Thumbnail files under root, the source index, and their LRU order.
+
+    Thread-safe, so the HTTP server's workers can share one instance. The
+    LRU order starts from the files' mtimes and is kept in memory after.
+    """
+
+    def __init__(self, root=THUMBNAIL_ROOT, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files = OrderedDict()  # thumbnail name -> bytes, least recently used first
+        self._sources = {}  # source path -> (size, mtime_ns, digest)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.evictions = 0
+
+        entries = []
+        if os.path.isdir(root):
+            for entry in os.scandir(root):
+                if entry.name.endswith('.jpg'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self.size += size
+
+        try:
+            with open(os.path.join(root, INDEX_FILE), encoding='utf-8') as file:
+                self._sources = {path: tuple(value) for path, value in json.load(file).items()}
+        except (OSError, ValueError):
+            pass
+
+    def digest(self, path):
+        """Content hash of a source image, rehashed only when it changed"""
+        stat = os.stat(path)
+        known = self._sources.get(path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        digest = content_hash(path)
+        with self._lock:
+            self._sources[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def lookup(self, path, size):
+        """Name of a cached thumbnail of path, or None if it has to be made"""
+        name = thumbnail_name(self.digest(path), size)
+        with self._lock:
+            if name not in self._files:
+                self.misses += 1
+                return None
+            self._files.move_to_end(name)
+            self.hits += 1
+        return name
+
+    def get(self, path, size):
+        """Name of a thumbnail of path, generating every size on a miss"""
+        if size not in THUMBNAIL_SIZES:
+            raise ThumbnailError(f"Thumbnail size must be one of {THUMBNAIL_SIZES}")
+        name = self.lookup(path, size)
+        if name is None:
+            errors = self.generate([path])
+            name = thumbnail_name(self.digest(path), size)
+            if not self.contains(name):
+                raise ThumbnailError(errors[0][1] if errors else f"No thumbnail could be made for {path}")
+        return name
+
+    def contains(self, name):
+        with self._lock:
+            return name in self._files
+
+    def open(self, name):
+        """Bytes of a cached thumbnail by name, or None"""
+        with self._lock:
+            if name not in self._files:
+                return None
+            self._files.move_to_end(name)
+        try:
+            with open(os.path.join(self.root, name), 'rb') as file:
+                return file.read()
+        except OSError:
+            with self._lock:
+                self.size -= self._files.pop(name, 0)
+            return None
+
+    def generate(self, paths, sizes=THUMBNAIL_SIZES, workers=None, progress=None):
+        """Make every missing thumbnail of paths, batched on a process pool.
+
+        Sources with the same content are rendered once. Returns a list of
+        (path, error) for images that could not be read.
+        """
+        jobs = {}
+        by_digest = {}
+        errors = []
+        for path in paths:
+            try:
+                digest = self.digest(path)
+            except OSError as e:
+                errors.append((path, str(e)))
+                continue
+            by_digest.setdefault(digest, []).append(path)
+            missing = [size for size in sizes if not self.contains(thumbnail_name(digest, size))]
+            if missing and digest not in jobs:
+                jobs[digest] = (path, digest, tuple(missing), self.root)
+
+        os.makedirs(self.root, exist_ok=True)
+        made = set()
+        for done, (digest, written, error) in enumerate(render_all(list(jobs.values()), workers), 1):
+            with self._lock:
+                for name, size in written:
+                    made.add(name)
+                    self.size += size - self._files.pop(name, 0)
+                    self._files[name] = size
+                    self.generated += 1
+            if error:
+                errors.extend((path, error) for path in by_digest[digest])
+            if progress:
+                progress(done, len(jobs))
+
+        # The caller is about to use what was just made; a batch bigger than
+        # the whole budget leaves the cache over it until the next one
+        self._evict(keep=made)
+        self.save_index()
+        return errors
+
+    def _evict(self, keep=()):
+        """Drop least recently used thumbnails, except keep, until within max_bytes"""
+        with self._lock:
+            victims = []
+            for name, size in self._files.items():
+                if self.size <= self.max_bytes:
+                    break
+                if name not in keep:
+                    victims.append(name)
+                    self.size -= size
+            for name in victims:
+                del self._files[name]
+                self.evictions += 1
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
+
+    def save_index(self):
+        """Persist the source path -> hash index next to the thumbnails"""
+        with self._lock:
+            sources = dict(self._sources)
+        _replace_file(os.path.join(self.root, INDEX_FILE), lambda file: json.dump(sources, file),
+                      mode='w', encoding='utf-8')
+
+    def stats(self):
+        """Return hit/miss counters and disk use as a dictionary"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'files': len(self._files),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'sources': len(self._sources),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'generated': self.generated,
+                'evictions': self.evictions
+            }
+
+def walk_images(root):
+    """Every cover image under root"""
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(directory, name)
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate cover-art thumbnails")
+    parser.add_argument("paths", nargs="*", help=f"images (default: every image in {MEDIA_ROOT})")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(THUMBNAIL_SIZES))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    paths = [os.path.abspath(path) for path in args.paths] or sorted(walk_images(MEDIA_ROOT))
+    cache = ThumbnailCache()
+    started = time.perf_counter()
+    errors = cache.generate(paths, tuple(args.sizes), args.workers)
+    elapsed = time.perf_counter() - started
+    for path, error in errors:
+        print(f"{path}: {error}")
+
+    started = time.perf_counter()
+    for path in paths:
+        for size in args.sizes:
+            cache.lookup(path, size)
+    lookup_us = (time.perf_counter() - started) * 1e6 / max(1, len(paths) * len(args.sizes))
+
+    stats = cache.stats()
+    print(f"{len(paths)} images -> {stats['generated']} new thumbnails in {elapsed:.2f}s; "
+          f"{stats['files']} cached ({stats['bytes'] / 1024:.0f} KB) in {cache.root}")
+    print(f"Warm lookup: {lookup_us:.1f} us")
@@ -2,7 +2,6 @@
 
 import os
 import sys
-import sqlite3
 import hashlib
 import time
 from pathlib import Path
@@ -10,10 +9,19 @@ from pathlib import Path
 # Add the current directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Database setup
-DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib', 'db')
-DB_PATH = os.path.join(DB_DIR, 'music_streaming.db')
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+from lib.db.engine import DB_PATH, DATABASE_URL, dispose_engines, raw_connection
+from lib.db.migrations import SCHEMA_VERSION
+from lib.models.models import POSITION_GAP
+from lib.search import SEARCH_INDEX_SCHEMA
+
+DB_DIR = os.path.dirname(DB_PATH)
+
+def remove_database():
+    """Close pooled connections and delete the database with its WAL files"""
+    dispose_engines(DB_PATH)
+    for path in (DB_PATH, DB_PATH + '-wal', DB_PATH + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
 
 def hash_password(password):
     """Hash a password using SHA-256"""
@@ -29,7 +37,7 @@ def setup_database():
     # Remove existing database if it exists
     if os.path.exists(DB_PATH):
         try:
-            os.remove(DB_PATH)
+            remove_database()
             print("Removed existing database.")
         except PermissionError:
             print(" Could not remove existing database (file in use).")
@@ -39,7 +47,7 @@ def setup_database():
     print("1. Initializing database...")
     
     # Create a new database
-    conn = sqlite3.connect(DB_PATH)
+    conn = raw_connection('bulk-load', DB_PATH)
     cursor = conn.cursor()
     
     # Create tables
@@ -82,6 +90,7 @@ def setup_database():
         title VARCHAR(100) NOT NULL,
         duration FLOAT,
         file_path VARCHAR(255),
+        cover_image VARCHAR(255),
         artist_id INTEGER NOT NULL,
         album_id INTEGER NOT NULL,
         genre_id INTEGER,
@@ -109,7 +118,46 @@ def setup_database():
         FOREIGN KEY (playlist_id) REFERENCES playlists (id),
         FOREIGN KEY (song_id) REFERENCES songs (id)
     );
+    
+    -- Media scan manifest (see lib/scanner.py)
+    CREATE TABLE media_files (
+        path VARCHAR(1024) NOT NULL PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        song_id INTEGER,
+        prehash VARCHAR(32),
+        content_hash VARCHAR(64),
+        FOREIGN KEY (song_id) REFERENCES songs (id)
+    );
+    
+    -- Audio seek tables (see lib/seek.py)
+    CREATE TABLE seek_indexes (
+        song_id INTEGER NOT NULL PRIMARY KEY,
+        format VARCHAR(8) NOT NULL,
+        file_size INTEGER NOT NULL,
+        duration FLOAT NOT NULL,
+        audio_end INTEGER NOT NULL,
+        times BLOB NOT NULL,
+        offsets BLOB NOT NULL,
+        mtime_ns INTEGER,
+        FOREIGN KEY (song_id) REFERENCES songs (id)
+    );
+    
+    -- Foreign-key and ordering indexes
+    CREATE INDEX ix_songs_artist_id ON songs (artist_id);
+    CREATE INDEX ix_songs_album_id ON songs (album_id);
+    CREATE INDEX ix_songs_genre_id ON songs (genre_id);
+    CREATE INDEX ix_albums_artist_id ON albums (artist_id);
+    CREATE INDEX ix_playlists_user_id ON playlists (user_id);
+    CREATE INDEX ix_playlist_songs_playlist_position ON playlist_songs (playlist_id, position);
+    CREATE INDEX ix_playlist_songs_song_id ON playlist_songs (song_id);
+    CREATE UNIQUE INDEX ux_playlist_songs_playlist_song ON playlist_songs (playlist_id, song_id);
+    CREATE INDEX ix_media_files_content_hash ON media_files (content_hash);
     ''')
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    # Full-text search index, kept in sync with songs/artists/albums by triggers
+    cursor.executescript(SEARCH_INDEX_SCHEMA)
     
     print("Database initialized successfully.")
     print(f"Database location: {DATABASE_URL}")
@@ -180,17 +228,17 @@ def setup_database():
     # Create songs
     print("Creating songs...")
     songs = [
-        ("Survivor's Guilt", 180, "/music/survivors_guilt.mp3", 3, 2, 5),  # Satan Dave, Satanic Sessions, Hip Hop
-        ("Minister of Enjoyment", 210, "/music/minister_of_enjoyment.mp3", 5, 5, 1),  # Laho, Joyful Hymns, Rumba
-        ("Piga Lean", 195, "/music/piga_lean.mp3", 4, 4, 4),  # BURUKLYN BOYZ, Street Anthems, Kenyan Hip Hop
-        ("One-Love", 240, "/music/one_love.mp3", 6, 9, 3),  # Lucky Dube, City Lights, Reggae
-        ("Soko", 185, "/music/soko.mp3", 1, 1, 4)  # Wakadinali, National Splendour, Kenyan Hip Hop
+        ("Survivor's Guilt", 180, "/music/survivors_guilt.mp3", "/Files/Survivor.jfif", 3, 2, 5),  # Satan Dave, Satanic Sessions, Hip Hop
+        ("Minister of Enjoyment", 210, "/music/minister_of_enjoyment.mp3", "/Files/enjoyment.jfif", 5, 5, 1),  # Laho, Joyful Hymns, Rumba
+        ("Piga Lean", 195, "/music/piga_lean.mp3", "/Files/Boyz.jpg", 4, 4, 4),  # BURUKLYN BOYZ, Street Anthems, Kenyan Hip Hop
+        ("One-Love", 240, "/music/one_love.mp3", "/Files/lucky.jpg", 6, 9, 3),  # Lucky Dube, City Lights, Reggae
+        ("Soko", 185, "/music/soko.mp3", "/Files/soko.jfif", 1, 1, 4)  # Wakadinali, National Splendour, Kenyan Hip Hop
     ]
-    for title, duration, file_path, artist_id, album_id, genre_id in songs:
+    for title, duration, file_path, cover_image, artist_id, album_id, genre_id in songs:
         cursor.execute('''
-        INSERT INTO songs (title, duration, file_path, artist_id, album_id, genre_id)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', (title, duration, file_path, artist_id, album_id, genre_id))
+        INSERT INTO songs (title, duration, file_path, cover_image, artist_id, album_id, genre_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (title, duration, file_path, cover_image, artist_id, album_id, genre_id))
     
     # Create sample playlists
     cursor.execute('''
@@ -207,22 +255,22 @@ def setup_database():
     cursor.execute('''
     INSERT INTO playlist_songs (playlist_id, song_id, position)
     VALUES (?, ?, ?)
-    ''', (1, 1, 1))
+    ''', (1, 1, 1 * POSITION_GAP))
     
     cursor.execute('''
     INSERT INTO playlist_songs (playlist_id, song_id, position)
     VALUES (?, ?, ?)
-    ''', (1, 3, 2))
+    ''', (1, 3, 2 * POSITION_GAP))
     
     cursor.execute('''
     INSERT INTO playlist_songs (playlist_id, song_id, position)
     VALUES (?, ?, ?)
-    ''', (2, 2, 1))
+    ''', (2, 2, 1 * POSITION_GAP))
     
     cursor.execute('''
     INSERT INTO playlist_songs (playlist_id, song_id, position)
     VALUES (?, ?, ?)
-    ''', (2, 4, 2))
+    ''', (2, 4, 2 * POSITION_GAP))
     
     # Commit changes and close connection
     conn.commit()
@@ -251,8 +299,7 @@ if __name__ == "__main__":
         try:
             # Wait a moment in case of file locks
             time.sleep(1)
-            if os.path.exists(DB_PATH):
-                os.remove(DB_PATH)
+            remove_database()
             setup_database()
         except Exception as cleanup_error:
             print(f" Setup failed even on retry: {str(cleanup_error)}")
@@ -1,5 +1,5 @@
 /* src/components/Library.jsx */
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useMusic } from '../context/MusicContext';
 import './Library.css';
@@ -7,6 +7,11 @@ import './Library.css';
 export default function Library() {
   const {
     tracks,
+    trackQuery,
+    hasMoreTracks,
+    loadingTracks,
+    loadMoreTracks,
+    searchTracks,
     currentTrackIndex,
     isPlaying,
     playTrack,
@@ -16,6 +21,26 @@ export default function Library() {
   } = useMusic();
   const [selectedTrack, setSelectedTrack] = useState(null);
   const navigate = useNavigate();
+  const [search, setSearch] = useState(trackQuery);
+  const listEnd = useRef(null);
+
+  // Fetch the next page once the end of the list scrolls into view
+  useEffect(() => {
+    const end = listEnd.current;
+    if (!end || !hasMoreTracks) return;
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) loadMoreTracks();
+    });
+    observer.observe(end);
+    return () => observer.disconnect();
+  }, [hasMoreTracks, loadMoreTracks]);
+
+  // Search once typing pauses, not on every keystroke
+  useEffect(() => {
+    if (search === trackQuery) return;
+    const timer = setTimeout(() => searchTracks(search), 300);
+    return () => clearTimeout(timer);
+  }, [search]);
 
   const handleTrackSelect = track => setSelectedTrack(track);
   const handlePlayButton = idx => {
@@ -40,7 +65,14 @@ export default function Library() {
       <h1>Music Library</h1>
       <div className="library-content">
         <div className="tracks-list">
-          <h3>All Tracks</h3>
+          <h3>{trackQuery.trim() ? 'Search Results' : 'All Tracks'}</h3>
+          <input
+            type="search"
+            className="track-search"
+            placeholder="Search songs, artists, albums"
+            value={search}
+            onChange={e => setSearch(e.target.value)}
+          />
           <div className="tracks">
             {tracks.map((track, index) => {
               const isLiked = likedTracks.includes(track.id);
@@ -77,6 +109,11 @@ export default function Library() {
                 </div>
               );
             })}
+            <div ref={listEnd} />
+            {loadingTracks && <div className="tracks-status">Loading...</div>}
+            {!loadingTracks && !tracks.length && (
+              <div className="tracks-status">No tracks found</div>
+            )}
           </div>
         </div>
 
@@ -2,6 +2,9 @@ import React, { createContext, useContext, useState, useEffect, useRef } from 'r
 
 const MusicContext = createContext();
 
+// Tracks fetched per /api/tracks request
+const TRACK_PAGE_SIZE = 100;
+
 export function MusicProvider({ children }) {
   const [tracks, setTracks] = useState([]);
   const [currentTrackIndex, setCurrentTrackIndex] = useState(0);
@@ -14,20 +17,99 @@ export function MusicProvider({ children }) {
   const [showLibrary, setShowLibrary] = useState(false);
   const [likedTracks, setLikedTracks] = useState([]);
   const audioRef = useRef(new Audio());
+  const audioFile = useRef(null);
+
+  // The track list comes from the catalog API (lib/server.py) one page at a
+  // time: the first page on load, the next when the library scrolls to the
+  // end (loadMoreTracks) or a new one when the user searches (searchTracks).
+  // Without the API it falls back to the static db.json, filtered locally.
+  const [trackQuery, setTrackQuery] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingTracks, setLoadingTracks] = useState(false);
+  const offline = useRef(false);
+  const pageRequest = useRef(0);
+
+  const fetchTrackPage = async (query, after) => {
+    if (offline.current) {
+      const res = await fetch('/db.json');
+      const all = await res.json();
+      const words = query.toLowerCase().split(/\s+/).filter(Boolean);
+      const items = all.filter(track =>
+        words.every(word =>
+          `${track.title} ${track.artist} ${track.album}`.toLowerCase().includes(word)
+        )
+      );
+      return { items, next: null };
+    }
+    const params = new URLSearchParams({ limit: TRACK_PAGE_SIZE });
+    if (query) params.set('q', query);
+    if (after) params.set('after', after);
+    const res = await fetch(`/api/tracks?${params}`);
+    if (!res.ok) throw new Error(`Catalog API returned ${res.status}`);
+    return res.json();
+  };
+
+  const loadTracks = async (query, after) => {
+    // Only the latest request may update the list; a search typed while
+    // an older page is in flight wins over it
+    const request = ++pageRequest.current;
+    setLoadingTracks(true);
+    try {
+      let page;
+      try {
+        page = await fetchTrackPage(query, after);
+      } catch (err) {
+        // Fall back only when a first page fails, not midway through a list
+        if (offline.current || after) throw err;
+        offline.current = true;
+        page = await fetchTrackPage(query, null);
+      }
+      if (request !== pageRequest.current) return null;
+      setNextCursor(page.next);
+      return page.items;
+    } finally {
+      if (request === pageRequest.current) setLoadingTracks(false);
+    }
+  };
 
-  // Load track list once
   useEffect(() => {
-    fetch('/db.json')
-      .then(res => res.json())
-      .then(data => setTracks(data))
+    loadTracks('', null)
+      .then(items => items && setTracks(items))
       .catch(console.error);
   }, []);
 
+  const loadMoreTracks = () => {
+    if (!nextCursor || loadingTracks) return;
+    loadTracks(trackQuery, nextCursor)
+      .then(items => items && setTracks(prev => prev.concat(items)))
+      .catch(console.error);
+  };
+
+  const searchTracks = query => {
+    setTrackQuery(query);
+    loadTracks(query.trim(), null)
+      .then(items => {
+        if (!items) return;
+        // Keep the playing track selected if it is among the results
+        const playing = tracks[currentTrackIndex];
+        const idx = playing ? items.findIndex(t => t.id === playing.id) : -1;
+        if (idx === -1) setIsPlaying(false);
+        setCurrentTrackIndex(Math.max(idx, 0));
+        setTracks(items);
+      })
+      .catch(console.error);
+  };
+
   // Sync audio element on change
   useEffect(() => {
     if (!tracks.length) return;
     const audio = audioRef.current;
-    audio.src = tracks[currentTrackIndex].file;
+    // Appending a page must not restart the playing track
+    const file = tracks[currentTrackIndex].file;
+    if (audioFile.current !== file) {
+      audioFile.current = file;
+      audio.src = file;
+    }
 
     const onTime = () => {
       if (!isNaN(audio.duration)) {
@@ -134,6 +216,11 @@ export function MusicProvider({ children }) {
   return (
     <MusicContext.Provider value={{
       tracks,
+      trackQuery,
+      hasMoreTracks: nextCursor !== null,
+      loadingTracks,
+      loadMoreTracks,
+      searchTracks,
       currentTrackIndex,
       isPlaying,
       isRepeating,
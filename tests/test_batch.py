@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.daemon import connect_to_daemon
+from lib.db.engine import dispose_engines, get_engine
+from lib.db.migrations import SCHEMA_VERSION
+from lib.importer import import_catalog
+from lib.models.base import Base
+
+RUN_PY = os.path.join(project_root, 'run.py')
+DB_JSON = os.path.join(project_root, 'public', 'db.json')
+
+class BatchWritesThroughDaemonTest(unittest.TestCase):
+    """Playlist writes from run.py show up in a running daemon's answers"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.directory.name, 'catalog.db')
+        cls.socket_path = os.path.join(cls.directory.name, 'daemon.sock')
+        engine = get_engine(db_path=cls.db_path)
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.exec_driver_sql(
+                "INSERT INTO users (id, username, email, password_hash) "
+                "VALUES (1, 'batch', 'batch@example.com', 'x'), (2, 'local', 'local@example.com', 'x')"
+            )
+        import_catalog(DB_JSON, db_path=cls.db_path)
+        dispose_engines(cls.db_path)
+
+        cls.env = dict(os.environ, MUSIC_DB_PATH=cls.db_path)
+        cls.daemon = subprocess.Popen(
+            [sys.executable, RUN_PY, 'daemon', '--socket', cls.socket_path],
+            env=cls.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 30
+        cls.client = None
+        while cls.client is None and time.monotonic() < deadline:
+            time.sleep(0.1)
+            cls.client = connect_to_daemon(cls.socket_path)
+        if cls.client is None:
+            cls.daemon.kill()
+            raise RuntimeError("The music daemon did not start")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.shutdown()
+        cls.client.close()
+        cls.daemon.wait(30)
+        cls.directory.cleanup()
+
+    def run_py(self, *args):
+        result = subprocess.run([sys.executable, RUN_PY, '--socket', self.socket_path, *args],
+                                env=self.env, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout)
+
+    def test_playlist_writes_reach_the_daemon_cache(self):
+        # Cache the user's playlists and the empty playlist in the daemon first
+        self.assertEqual(self.client.get_user_playlists(1), [])
+        created = self.run_py('playlist', 'create', '--user', '1', 'Batch PL')[0]
+        playlists = self.client.get_user_playlists(1)
+        self.assertEqual([playlist['name'] for playlist in playlists], ['Batch PL'])
+
+        self.assertEqual(self.client.get_playlist_songs(created['id']), [])
+        song_ids = [str(song['id']) for song in self.client.get_all_songs()[:3]]
+        self.run_py('playlist', 'add', str(created['id']), *song_ids)
+        self.assertEqual([str(song['id']) for song in self.client.get_playlist_songs(created['id'])], song_ids)
+
+        self.run_py('playlist', 'remove', str(created['id']), song_ids[0])
+        self.assertEqual([str(song['id']) for song in self.client.get_playlist_songs(created['id'])], song_ids[1:])
+
+    def test_writes_made_outside_the_daemon_reach_its_cache(self):
+        self.assertEqual(self.client.get_user_playlists(2), [])
+        self.assertEqual(self.client.search_songs('Outsider'), [])
+
+        self.run_py('--local', 'playlist', 'create', '--user', '2', 'Local PL')
+        self.assertEqual([playlist['name'] for playlist in self.client.get_user_playlists(2)], ['Local PL'])
+
+        catalog = os.path.join(self.directory.name, 'extra.ndjson')
+        with open(catalog, 'w', encoding='utf-8') as file:
+            file.write('{"title": "Outsider", "artist": "New Band", "duration": 180}\n')
+        import_catalog(catalog, db_path=self.db_path)
+        dispose_engines(self.db_path)
+        self.assertEqual([song['title'] for song in self.client.search_songs('Outsider')], ['Outsider'])
+
+class DaemonSocketArgumentTest(unittest.TestCase):
+    """--socket works before or after the daemon subcommand"""
+
+    def socket_for(self, *argv):
+        from lib import cli
+
+        parsed = []
+        with mock.patch('lib.daemon.daemon_main', side_effect=lambda args: parsed.append(args) or 0):
+            with self.assertRaises(SystemExit):
+                cli.main(list(argv))
+        return parsed[0].socket
+
+    def test_socket_position(self):
+        self.assertEqual(self.socket_for('--socket', '/tmp/x.sock', 'daemon', '--stop'), '/tmp/x.sock')
+        self.assertEqual(self.socket_for('daemon', '--socket', '/tmp/y.sock', '--stop'), '/tmp/y.sock')
+        self.assertIsNone(self.socket_for('daemon', '--status'))
+
+if __name__ == "__main__":
+    unittest.main()
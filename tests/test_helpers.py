@@ -0,0 +1,171 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib import helpers
+from lib.cache import catalog_cache
+from lib.db.engine import dispose_engines, get_engine
+from lib.db.migrations import SCHEMA_VERSION
+from lib.models.base import Base
+from lib.models.models import POSITION_GAP
+
+SONG_COUNT = 40
+
+class HelpersTestCase(unittest.TestCase):
+    """Binds lib.helpers to a fresh catalog of SONG_COUNT songs and one playlist"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, 'catalog.db')
+        self.engine = get_engine(db_path=self.db_path)
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.exec_driver_sql(
+                "INSERT INTO users (id, username, email, password_hash) VALUES (1, 'test', 'test@example.com', 'x')"
+            )
+            connection.exec_driver_sql("INSERT INTO artists (id, name) VALUES (1, 'Artist')")
+            connection.exec_driver_sql("INSERT INTO albums (id, title, artist_id) VALUES (1, 'Album', 1)")
+            connection.exec_driver_sql(
+                "INSERT INTO songs (id, title, duration, artist_id, album_id) VALUES (?, ?, 180, 1, 1)",
+                [(song_id, f"Song {song_id}") for song_id in range(1, SONG_COUNT + 1)]
+            )
+
+        self.previous_engine = helpers.SessionLocal.kw.get('bind')
+        helpers.SessionLocal.configure(bind=self.engine)
+        catalog_cache.clear()
+        created, self.playlist_id = helpers.create_playlist(1, "Test")
+        self.assertTrue(created)
+
+    def tearDown(self):
+        helpers.SessionLocal.configure(bind=self.previous_engine)
+        catalog_cache.clear()
+        dispose_engines(self.db_path)
+        self.directory.cleanup()
+
+    def playlist(self):
+        """(song IDs, positions) of the playlist in listing order"""
+        songs = helpers.get_playlist_songs(self.playlist_id)
+        return [song.id for song in songs], [song.position for song in songs]
+
+class PlaylistOrderTest(HelpersTestCase):
+    """insert_song_at and move_songs keep the order a plain list would have"""
+
+    def assertPlaylist(self, expected):
+        song_ids, positions = self.playlist()
+        self.assertEqual(song_ids, expected)
+        self.assertEqual(positions, sorted(set(positions)), "positions must be distinct and increasing")
+
+    def test_repeated_inserts_into_one_gap_rebalance(self):
+        helpers.add_songs_to_playlist(self.playlist_id, [1, 2])
+        expected = [1, 2]
+
+        # Each insert halves the gap after song 1, so it runs out after
+        # log2(POSITION_GAP) inserts and the playlist has to be respaced
+        inserts = POSITION_GAP.bit_length() + 4
+        for song_id in range(3, 3 + inserts):
+            added, message = helpers.insert_song_at(self.playlist_id, song_id, 1)
+            self.assertTrue(added, message)
+            expected.insert(1, song_id)
+            self.assertPlaylist(expected)
+
+        _, positions = self.playlist()
+        self.assertGreater(positions[-1], 2 * POSITION_GAP, "the playlist was never rebalanced")
+
+    def test_repeated_moves_into_one_gap_rebalance(self):
+        expected = list(range(1, 21))
+        helpers.add_songs_to_playlist(self.playlist_id, expected)
+
+        for _ in range(POSITION_GAP.bit_length() + 4):
+            song_id = expected.pop()
+            moved, message = helpers.move_songs(self.playlist_id, [song_id], 1)
+            self.assertTrue(moved, message)
+            expected.insert(1, song_id)
+            self.assertPlaylist(expected)
+
+    def test_multi_song_moves(self):
+        expected = list(range(1, 31))
+        helpers.add_songs_to_playlist(self.playlist_id, expected)
+
+        moves = [
+            ([5, 3, 9], 0),         # to the front, in the order given
+            ([1, 2], 100),          # past the end appends
+            ([30, 10, 20, 15], 7),  # into the middle, from both sides of it
+            ([8, 12], 9),           # next to where they already are
+            ([4, 99, 4], 2),        # repeats and songs not in the playlist are dropped
+        ]
+        rng = random.Random(7)
+        for _ in range(60):
+            moves.append((rng.sample(expected, rng.randint(2, 6)), rng.randint(0, len(expected))))
+
+        for song_ids, index in moves:
+            moved, message = helpers.move_songs(self.playlist_id, song_ids, index)
+            self.assertTrue(moved, message)
+            moving = [song_id for song_id in dict.fromkeys(song_ids) if song_id in expected]
+            rest = [song_id for song_id in expected if song_id not in moving]
+            expected = rest[:index] + moving + rest[index:]
+            self.assertPlaylist(expected)
+
+    def test_moving_songs_that_are_not_in_the_playlist_fails(self):
+        helpers.add_songs_to_playlist(self.playlist_id, [1, 2, 3])
+
+        moved, _ = helpers.move_songs(self.playlist_id, [7, 8], 0)
+
+        self.assertFalse(moved)
+        self.assertPlaylist([1, 2, 3])
+
+class KeysetPageTest(HelpersTestCase):
+    """Paging through a listing returns each row once, in listing order"""
+
+    def pages(self, fetch_page, limit):
+        """Follow next cursors from the first page to the last"""
+        rows, after, pages = [], None, 0
+        while True:
+            page, after = fetch_page(after, limit)
+            self.assertLessEqual(len(page), limit)
+            rows.extend(page)
+            pages += 1
+            if after is None:
+                return rows, pages
+            self.assertEqual(len(page), limit, "only the last page may be short")
+
+    def test_song_pages_meet_exactly_at_the_end(self):
+        for limit in (1, 7, 8, SONG_COUNT - 1, SONG_COUNT, SONG_COUNT + 1):
+            rows, pages = self.pages(helpers.get_all_songs_page, limit)
+            self.assertEqual([song.id for song in rows], list(range(1, SONG_COUNT + 1)))
+            self.assertEqual(pages, max(1, -(-SONG_COUNT // limit)))
+
+    def test_playlist_pages_with_tied_positions(self):
+        song_ids = list(range(1, 21))
+        helpers.add_songs_to_playlist(self.playlist_id, song_ids)
+        # Runs of equal positions, as left by databases from before sparse
+        # positions or by writers that raced for the same slot
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "UPDATE playlist_songs SET position = (song_id + 4) / 5 WHERE playlist_id = ?",
+                (self.playlist_id,)
+            )
+        catalog_cache.clear()
+        listed, positions = self.playlist()
+        self.assertEqual(len(set(positions)), 4)
+
+        for limit in (1, 2, 3, 4, 5, 6, 20, 21):
+            rows, _ = self.pages(
+                lambda after, limit: helpers.get_playlist_songs_page(self.playlist_id, after, limit), limit
+            )
+            self.assertEqual([song.id for song in rows], listed, f"limit {limit}")
+            self.assertEqual(list(helpers.iter_playlist_songs(self.playlist_id, batch_size=limit)),
+                             helpers.get_playlist_songs(self.playlist_id))
+
+        # A rebalance keeps that order
+        helpers.rebalance_playlist(self.playlist_id)
+        self.assertEqual(self.playlist()[0], listed)
+
+if __name__ == '__main__':
+    unittest.main()
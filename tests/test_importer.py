@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.importer import CatalogImporter, iter_tracks
+
+CATALOG_SCHEMA = """
+CREATE TABLE artists (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL);
+CREATE TABLE genres (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL);
+CREATE TABLE albums (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, release_year INTEGER, artist_id INTEGER);
+CREATE TABLE songs (
+    id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, duration FLOAT, file_path VARCHAR(255),
+    cover_image VARCHAR(255), artist_id INTEGER, album_id INTEGER, genre_id INTEGER
+);
+"""
+
+class ImporterBadRowTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(':memory:', isolation_level=None)
+        self.connection.executescript(CATALOG_SCHEMA)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def import_file(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        importer = CatalogImporter(self.connection, batch_size=2)
+        for raw in iter_tracks(path):
+            importer.add(raw)
+        importer.flush()
+        titles = [row[0] for row in self.connection.execute("SELECT title FROM songs ORDER BY id")]
+        return importer.stats, titles
+
+    def test_csv_rows_after_a_malformed_row_are_imported(self):
+        stats, titles = self.import_file('tracks.csv', (
+            "title,artist,album,genre,duration,year\n"
+            "First,Band,Debut,Rock,3:47,1999\n"
+            "Bad Duration,Band,Debut,Rock,3:xx,1999\n"
+            "Bad Year,Band,Debut,Rock,4:00,19x9\n"
+            "Last,Band,Debut,Rock,2:30,2001\n"
+        ))
+        self.assertEqual(titles, ['First', 'Last'])
+        self.assertEqual(stats['read'], 4)
+        self.assertEqual(stats['imported'], 2)
+        self.assertEqual(stats['invalid'], 2)
+
+    def test_ndjson_lines_after_a_malformed_line_are_imported(self):
+        stats, titles = self.import_file('tracks.ndjson', (
+            '{"title": "First", "artist": "Band", "duration": 227}\n'
+            '{"title": "Broken", "artist": \n'
+            '["not", "an", "object"]\n'
+            '{"title": "Last", "artist": "Band", "duration": "1:02:03"}\n'
+        ))
+        self.assertEqual(titles, ['First', 'Last'])
+        self.assertEqual(stats['invalid'], 2)
+
+class ImporterIdTest(unittest.TestCase):
+    """New rows never take the ID of a deleted one"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, 'catalog.db')
+        self.connection = sqlite3.connect(self.db_path, isolation_level=None, timeout=0)
+        # AUTOINCREMENT, as setup.py creates the tables
+        self.connection.executescript(CATALOG_SCHEMA.replace('PRIMARY KEY', 'PRIMARY KEY AUTOINCREMENT'))
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def import_tracks(self, *titles):
+        importer = CatalogImporter(self.connection)
+        for title in titles:
+            importer.add({'title': title, 'artist': 'Band', 'album': 'Debut'})
+        importer.flush()
+
+    def test_deleted_song_ids_are_not_reused(self):
+        self.import_tracks('One', 'Two', 'Three')
+        self.connection.execute("DELETE FROM songs WHERE title = 'Three'")
+        self.import_tracks('Four')
+        self.assertEqual(self.connection.execute("SELECT id FROM songs WHERE title = 'Four'").fetchone()[0], 4)
+
+        self.import_tracks('Five')
+        self.assertEqual(self.connection.execute("SELECT id FROM songs WHERE title = 'Five'").fetchone()[0], 5)
+
+    def test_a_busy_database_reports_the_lock_error(self):
+        other = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            other.execute("BEGIN IMMEDIATE")
+            with self.assertRaisesRegex(sqlite3.OperationalError, "locked"):
+                self.import_tracks('One')
+        finally:
+            other.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.db.engine import dispose_engines, get_engine
+from lib.db.migrations import SCHEMA_VERSION
+from lib.models.base import Base
+from lib.scanner import scan_library
+from lib.seek import get_seek_table, seek_cache
+
+SOURCE_FILE = os.path.join(project_root, 'public', 'Files', 'pekaboo.mp3')
+
+class SeekTableFreshnessTest(unittest.TestCase):
+    """Stored and cached seek tables are dropped once their file changes"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.media = os.path.join(self.directory.name, 'media')
+        os.mkdir(self.media)
+        self.path = os.path.join(self.media, 'pekaboo.mp3')
+        shutil.copyfile(SOURCE_FILE, self.path)
+
+        self.db_path = os.path.join(self.directory.name, 'catalog.db')
+        self.engine = get_engine(db_path=self.db_path)
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        scan_library(self.media, workers=1, db_path=self.db_path)
+        with self.engine.connect() as connection:
+            self.song_id = connection.exec_driver_sql("SELECT id FROM songs").scalar()
+        seek_cache.clear()
+
+    def tearDown(self):
+        seek_cache.clear()
+        dispose_engines(self.db_path)
+        self.directory.cleanup()
+
+    def stored_mtime(self):
+        with self.engine.connect() as connection:
+            return connection.exec_driver_sql(
+                "SELECT mtime_ns FROM seek_indexes WHERE song_id = ?", (self.song_id,)
+            ).scalar()
+
+    def test_a_file_rewritten_at_the_same_size_is_reindexed(self):
+        table = get_seek_table(self.song_id, self.engine)
+        self.assertEqual(self.stored_mtime(), os.stat(self.path).st_mtime_ns)
+
+        mtime_ns = table.mtime_ns + 5 * 10 ** 9
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+        seek_cache.clear()
+
+        rebuilt = get_seek_table(self.song_id, self.engine)
+        self.assertEqual(rebuilt.file_size, table.file_size)
+        self.assertEqual(rebuilt.mtime_ns, mtime_ns)
+        self.assertEqual(self.stored_mtime(), mtime_ns)
+
+    def test_a_rescan_drops_the_cached_table_of_a_changed_file(self):
+        table = get_seek_table(self.song_id, self.engine)
+        self.assertIs(seek_cache.get(('seek_table', self.song_id)), table)
+
+        with open(self.path, 'ab') as file:
+            file.write(b'\0' * 128)
+        stats = scan_library(self.media, workers=1, db_path=self.db_path)
+
+        self.assertEqual(stats['updated'], 1)
+        self.assertIsNone(seek_cache.get(('seek_table', self.song_id)))
+        self.assertEqual(get_seek_table(self.song_id, self.engine).file_size, table.file_size + 128)
+
+if __name__ == '__main__':
+    unittest.main()
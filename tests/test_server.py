@@ -0,0 +1,177 @@
+import asyncio
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from urllib.parse import urlencode
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib import helpers, server
+from lib.db.engine import dispose_engines, get_engine
+from lib.db.migrations import SCHEMA_VERSION
+from lib.importer import import_catalog
+from lib.models.base import Base
+from lib.scanner import disk_path
+from lib.thumbnails import ThumbnailCache
+
+DB_JSON = os.path.join(project_root, 'public', 'db.json')
+
+class TracksRouteTest(unittest.TestCase):
+    """Every file and cover URL in /api/tracks leads to a working route"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.directory.name, 'catalog.db')
+        engine = get_engine(db_path=cls.db_path)
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        import_catalog(DB_JSON, db_path=cls.db_path)
+
+        cls.previous_engine = helpers.SessionLocal.kw.get('bind')
+        helpers.SessionLocal.configure(bind=engine)
+        cls.previous_thumbnails = server.thumbnail_cache
+        server.thumbnail_cache = ThumbnailCache(os.path.join(cls.directory.name, 'thumbnails'))
+        server.response_cache.clear()
+
+        cls.loop = asyncio.new_event_loop()
+        cls.api = server.APIServer(workers=2)
+        started = threading.Event()
+
+        async def listen():
+            cls.listener = await asyncio.start_server(cls.api.handle_connection, '127.0.0.1', 0)
+            cls.port = cls.listener.sockets[0].getsockname()[1]
+            started.set()
+
+        cls.thread = threading.Thread(target=lambda: (cls.loop.run_until_complete(listen()), cls.loop.run_forever()))
+        cls.thread.start()
+        started.wait(10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.listener.close)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join(10)
+        cls.loop.close()
+        cls.api.files.close()
+        cls.api.executor.shutdown(wait=True)
+        server.thumbnail_cache = cls.previous_thumbnails
+        server.response_cache.clear()
+        helpers.SessionLocal.configure(bind=cls.previous_engine)
+        dispose_engines(cls.db_path)
+        cls.directory.cleanup()
+
+    def request(self, path, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        try:
+            connection.request('GET', path, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def tracks(self):
+        status, _, body = self.request('/api/tracks?limit=500')
+        self.assertEqual(status, 200)
+        return json.loads(body)['items']
+
+    def test_file_urls_stream_the_audio(self):
+        with open(DB_JSON, encoding='utf-8') as file:
+            on_disk = {entry['title'] for entry in json.load(file) if os.path.isfile(disk_path(entry['file']))}
+        streamed = 0
+        for track in self.tracks():
+            self.assertEqual(track['file'], f"/api/songs/{track['id']}/stream")
+            if track['title'] not in on_disk:
+                continue
+            status, headers, body = self.request(track['file'], {'Range': 'bytes=0-15'})
+            self.assertEqual(status, 206, track['file'])
+            self.assertIn(headers['Content-Type'], ('audio/mpeg', 'audio/mp4'))
+            self.assertEqual(len(body), 16)
+            streamed += 1
+        self.assertEqual(streamed, len(on_disk))
+        self.assertGreater(streamed, 0)
+
+    def test_search_pages_use_the_track_shape(self):
+        title = self.tracks()[0]['title']
+        status, _, body = self.request('/api/tracks?' + urlencode({'q': title, 'limit': 1}))
+        self.assertEqual(status, 200)
+        page = json.loads(body)
+        self.assertEqual(len(page['items']), 1)
+        track = page['items'][0]
+        self.assertEqual(track['title'], title)
+        self.assertEqual(track['file'], f"/api/songs/{track['id']}/stream")
+
+    def test_paths_outside_the_web_root_are_not_streamed(self):
+        engine = get_engine(db_path=self.db_path)
+        escapes = ('/Files/../../setup.py', 'Files/../../lib/server.py', '/etc/passwd',
+                   '/Files/../../public/../README.md')
+        with engine.begin() as connection:
+            artist_id, album_id = connection.exec_driver_sql("SELECT artist_id, album_id FROM songs LIMIT 1").first()
+            song_ids = [
+                connection.exec_driver_sql(
+                    "INSERT INTO songs (title, file_path, artist_id, album_id) VALUES (?, ?, ?, ?)",
+                    ('Escape', file_path, artist_id, album_id)
+                ).lastrowid
+                for file_path in escapes
+            ]
+        try:
+            for file_path, song_id in zip(escapes, song_ids):
+                self.assertIsNone(disk_path(file_path), file_path)
+                status, _, _ = self.request(f'/api/songs/{song_id}/stream')
+                self.assertEqual(status, 404, file_path)
+        finally:
+            with engine.begin() as connection:
+                connection.exec_driver_sql(f"DELETE FROM songs WHERE id IN ({','.join('?' * len(song_ids))})", tuple(song_ids))
+
+    def test_only_files_many_listeners_stream_use_the_chunk_cache(self):
+        track = next(track for track in self.tracks() if self.request(track['file'], {'Range': 'bytes=0-0'})[0] == 206)
+        server.chunk_cache.clear()
+        misses = server.chunk_cache.stats()['misses']
+
+        # One listener seeking around is still served with sendfile
+        for start in range(0, 10 * 4096, 4096):
+            status, _, _ = self.request(track['file'], {'Range': f'bytes={start}-{start + 15}', 'User-Agent': 'one'})
+            self.assertEqual(status, 206)
+        self.assertEqual(server.chunk_cache.stats()['misses'], misses)
+
+        for listener in range(server.HOT_FILE_LISTENERS):
+            status, _, body = self.request(track['file'], {'Range': 'bytes=0-15', 'User-Agent': f'player/{listener}'})
+            self.assertEqual((status, len(body)), (206, 16))
+        self.assertEqual(server.chunk_cache.stats()['misses'], misses + 1)
+
+    def test_cover_urls_resolve_to_thumbnails(self):
+        tracks = self.tracks()
+        self.assertTrue(all(track['cover'] for track in tracks))
+        for track in tracks:
+            status, headers, _ = self.request(track['cover'])
+            self.assertEqual(status, 302, track['cover'])
+            status, headers, body = self.request(headers['Location'])
+            self.assertEqual(status, 200, headers)
+            self.assertEqual(headers['Content-Type'], 'image/jpeg')
+            self.assertTrue(body.startswith(b'\xff\xd8'))
+
+class PopularityTest(unittest.TestCase):
+    def test_a_listener_counts_once(self):
+        popularity = server.Popularity(window=60)
+        counts = [popularity.record(1, 'a', now=second) for second in range(20)]
+        self.assertEqual(counts, [1] * 20)
+        self.assertEqual(popularity.record(1, 'b', now=20), 2)
+        self.assertEqual(popularity.record(2, 'a', now=20), 1)
+
+    def test_listeners_outside_the_window_are_forgotten(self):
+        popularity = server.Popularity(window=60)
+        for listener in range(5):
+            popularity.record(1, listener, now=listener)
+        self.assertEqual(popularity.record(1, 'late', now=62), 4)
+        popularity.record(2, 'other', now=200)
+        self.assertNotIn(1, popularity._songs)
+
+if __name__ == "__main__":
+    unittest.main()
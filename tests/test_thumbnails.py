@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.thumbnails import THUMBNAIL_SIZES, ThumbnailCache, content_hash, render_thumbnails, thumbnail_name
+
+COVER = os.path.join(project_root, 'public', 'Files', 'Boyz.jpg')
+OTHER_COVER = os.path.join(project_root, 'public', 'Files', 'lucky.jpg')
+
+class RenderThumbnailsTest(unittest.TestCase):
+    """Server worker threads may render the same cover at the same time"""
+
+    def test_concurrent_renders_of_one_cover(self):
+        with tempfile.TemporaryDirectory() as root:
+            digest = content_hash(COVER)
+            job = (COVER, digest, THUMBNAIL_SIZES, root)
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(render_thumbnails, [job] * 32))
+
+            for _, written, error in results:
+                self.assertIsNone(error)
+                self.assertEqual(len(written), len(THUMBNAIL_SIZES))
+            self.assertEqual(sorted(os.listdir(root)), sorted(thumbnail_name(digest, size) for size in THUMBNAIL_SIZES))
+
+class ThumbnailCacheEvictionTest(unittest.TestCase):
+    def test_a_full_cache_keeps_the_thumbnails_it_just_made(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = ThumbnailCache(root, max_bytes=5000)
+            first = cache.get(COVER, 256)
+            self.assertTrue(os.path.exists(os.path.join(root, first)))
+
+            # Making the next cover's thumbnails evicts the older ones only
+            second = cache.get(OTHER_COVER, 256)
+            self.assertTrue(os.path.exists(os.path.join(root, second)))
+            self.assertFalse(cache.contains(first))
+            self.assertEqual(cache.open(second)[:2], b'\xff\xd8')
+
+if __name__ == "__main__":
+    unittest.main()